@@ -12,6 +12,9 @@ from app.services.user_service import UserService
 from app.services.message_service import MessageService
 from app.services.noti_service import NotificationService
 from app.services.search_service import SearchService
+from app.services.sync_service import SyncService
+from app.services.duplicate_service import DuplicateService
+from app.services.image_search_service import ImageSearchService
 from app.repositories.auth_repository import AuthRepo
 from app.repositories.claim_repository import ClaimRepo
 from app.repositories.image_repository import ImageRepo
@@ -19,61 +22,135 @@ from app.repositories.item_repository import ItemRepo
 from app.repositories.match_repository import MatchRepo
 from app.repositories.user_repository import UserRepo
 from app.repositories.message_repository import MessageRepository
+from app.repositories.change_repository import ChangeRepo
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.database import get_db
+from app.core.storage import R2StorageClient
+from app.core.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+class Container:
+    """
+    Repositories, services and clients shared by every request of this
+    worker. They keep no per-request state, so they are built once, at
+    startup, after the database connection, and the dependencies below
+    only hand out references.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.change_repo = ChangeRepo(db)
+        self.auth_repo = AuthRepo(db)
+        self.claim_repo = ClaimRepo(self.change_repo, db)
+        self.image_repo = ImageRepo(db)
+        self.item_repo = ItemRepo(self.change_repo, db)
+        self.match_repo = MatchRepo(self.change_repo, db)
+        self.user_repo = UserRepo(db)
+        self.message_repo = MessageRepository(db, self.change_repo)
+
+        self.storage_client = R2StorageClient()
+        self.notification_service = NotificationService(self.user_repo)
+        self.image_service = ImageService(storage_client=self.storage_client, image_repo=self.image_repo)
+        self.duplicate_service = DuplicateService(image_repo=self.image_repo, item_repo=self.item_repo)
+        self.item_service = ItemService(image_service=self.image_service, item_repo=self.item_repo,
+                                        image_repo=self.image_repo, duplicate_service=self.duplicate_service)
+        self.auth_service = AuthService(user_repo=self.user_repo, auth_repo=self.auth_repo)
+        self.claim_service = ClaimService(item_service=self.item_service, noti_service=self.notification_service,
+                                          claim_repo=self.claim_repo, user_repo=self.user_repo)
+        self.match_service = MatchService(item_service=self.item_service, match_repo=self.match_repo,
+                                          notification_service=self.notification_service, item_repo=self.item_repo,
+                                          change_repo=self.change_repo, image_repo=self.image_repo)
+        self.user_service = UserService(user_repo=self.user_repo)
+        self.message_service = MessageService(self.message_repo)
+        self.search_service = SearchService(item_service=self.item_service, item_repo=self.item_repo,
+                                            change_repo=self.change_repo)
+        self.image_search_service = ImageSearchService(image_repo=self.image_repo, item_repo=self.item_repo)
+        self.sync_service = SyncService(change_repo=self.change_repo, item_repo=self.item_repo,
+                                        image_repo=self.image_repo, claim_repo=self.claim_repo,
+                                        match_repo=self.match_repo, message_repo=self.message_repo)
+
+
+_container: Container = None
+
+
+def init_container():
+    """Build the container (call on startup, after connect_to_mongo)."""
+    global _container
+    _container = Container(get_db())
+
+
+def close_container():
+    global _container
+    _container = None
+
+
+def get_container() -> Container:
+    if _container is None:
+        raise RuntimeError("Service container not initialized. Call init_container() on startup.")
+    return _container
+
+
+# Dependencies are async so FastAPI resolves them inline rather than in the threadpool
+
 #repos 
-def get_auth_repo():
-    return AuthRepo()
+async def get_auth_repo():
+    return get_container().auth_repo
+
+async def get_claim_repo():
+    return get_container().claim_repo
 
-def get_claim_repo():
-    return ClaimRepo()
+async def get_item_repo():
+    return get_container().item_repo
 
-def get_item_repo():
-    return ItemRepo()
+async def get_image_repo():
+    return get_container().image_repo
 
-def get_image_repo():
-    return ImageRepo()
+async def get_match_repo():
+    return get_container().match_repo
 
-def get_match_repo():
-    return MatchRepo()
+async def get_user_repo():
+    return get_container().user_repo
 
-def get_user_repo():
-    return UserRepo()
+async def get_message_repo():
+    return get_container().message_repo
 
-def get_message_repo():
-    return MessageRepository()
+async def get_change_repo():
+    return get_container().change_repo
 
 
 #services
-def get_auth_service():
-    return AuthService(user_repo=get_user_repo(), auth_repo=get_auth_repo())
+async def get_auth_service():
+    return get_container().auth_service
+
+async def get_item_service():
+    return get_container().item_service
 
-def get_item_service():
-    return ItemService(image_service= get_image_service(), item_repo=get_item_repo(), image_repo=get_image_repo())
+async def get_duplicate_service():
+    return get_container().duplicate_service
 
-def get_claim_service():
-    return ClaimService(item_service=get_item_service(), noti_service=NotificationService(get_user_repo()),claim_repo=get_claim_repo(), user_repo=get_user_repo())
+async def get_claim_service():
+    return get_container().claim_service
 
-def get_match_service():
-    return MatchService(item_service=get_item_service(), match_repo=get_match_repo(), notification_service=NotificationService(get_user_repo()))
+async def get_match_service():
+    return get_container().match_service
 
-def get_image_service():
-    return ImageService()
+async def get_image_service():
+    return get_container().image_service
 
-def get_user_service():
-    return UserService(user_repo=get_user_repo())
+async def get_user_service():
+    return get_container().user_service
 
-def get_message_service() -> MessageService:
-   
-    db = get_db()
-    message_repo = MessageRepository(db)
-    return MessageService(message_repo)
+async def get_message_service() -> MessageService:
+    return get_container().message_service
 
+async def get_search_service():
+    return get_container().search_service
 
-def get_search_service():
-    return SearchService(item_service=get_item_service())
+async def get_image_search_service():
+    return get_container().image_search_service
+
+async def get_sync_service():
+    return get_container().sync_service
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], 
                            user_service: Annotated[UserService, Depends(get_user_service)]) -> UserResponse:
@@ -104,3 +181,11 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
     
         return user_entry 
 
+
+
+async def get_current_admin(current_user: Annotated[UserResponse, Depends(get_current_user)]) -> UserResponse:
+    # Admins are the user ids listed in ADMIN_USER_IDS
+    admins = {user_id.strip() for user_id in settings.ADMIN_USER_IDS.split(",") if user_id.strip()}
+    if current_user.user_id not in admins:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from typing import Annotated
+import asyncio
+from app.core.loop_monitor import recent_stalls
+from app.core.profiler import ProfilerBusy, profile
+from app.core.query_monitor import query_summary
+from app.models.user import UserResponse
+from app.api.dependencies import get_current_admin
+
+
+debug_router = APIRouter()
+
+
+@debug_router.get("/queries")
+async def get_query_summary(current_user: Annotated[UserResponse, Depends(get_current_admin)]):
+    # MongoDB commands per route over its last requests on this worker
+    return query_summary.summary()
+
+
+@debug_router.get("/stalls")
+async def get_loop_stalls(current_user: Annotated[UserResponse, Depends(get_current_admin)]):
+    # Event loop stalls on this worker with the blocking stack (empty unless LOOP_MONITOR is on)
+    return recent_stalls()
+
+
+@debug_router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    current_user: Annotated[UserResponse, Depends(get_current_admin)],
+    seconds: float = Query(10, gt=0, le=60),
+    interval_ms: int = Query(10, ge=1, le=1000),
+    idle: bool = Query(False, description="Keep samples of threads waiting in select or on a lock")
+):
+    # Samples the worker that serves this request; pipe the result into flamegraph.pl or speedscope
+    try:
+        return await asyncio.to_thread(profile, seconds, interval_ms / 1000.0, idle)
+    except ProfilerBusy:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running on this worker")
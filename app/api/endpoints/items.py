@@ -1,10 +1,12 @@
 from typing import Optional, Annotated, List
-from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, File, UploadFile, Form, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, File, UploadFile, Form, BackgroundTasks, Header, Response
 from app.models.item import ItemCreation, ItemList, ItemResponse
 from app.models.user import UserResponse
 from app.api.dependencies import get_item_service, get_current_user, get_match_service
 from app.services.item_service import ItemService
 from app.services.match_service import MatchService
+from app.core.etag import make_etag, list_etag, latest_modified, etag_matches, set_cache_headers, not_modified
+from app.core.tracing import background
 import json
 import logging
 
@@ -34,7 +36,7 @@ async def item_create(
     
     try:
         item_md = await item_service.create_item(item_cr, image_files)
-        background_tasks.add_task(match_service.run_automated_matching, item_md.item_id)
+        background_tasks.add_task(background(match_service.run_automated_matching), item_md.item_id)
         return item_md
     except Exception as e:
         raise HTTPException(
@@ -44,17 +46,28 @@ async def item_create(
 
 @item_router.get("/", response_model=ItemList)
 async def list_all_items(
+    response: Response,
     service: Annotated[ItemService, Depends(get_item_service)],
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    if_none_match: Annotated[Optional[str], Header()] = None
 ):
+    versions = await service.get_items_versions(limit, offset)
+    etag = list_etag("items", versions, "item_id", limit, offset)
+    last_modified = latest_modified(versions)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, last_modified)
+
     res = await service.get_all_items(limit, offset)
+    set_cache_headers(response, etag, last_modified)
     return res
 
 @item_router.get("/{item_id}", response_model=ItemResponse)
 async def get_specific_item(
     item_id: str,
-    service: Annotated[ItemService, Depends(get_item_service)]
+    response: Response,
+    service: Annotated[ItemService, Depends(get_item_service)],
+    if_none_match: Annotated[Optional[str], Header()] = None
 ):
     if item_id is None:
         raise HTTPException(
@@ -62,6 +75,18 @@ async def get_specific_item(
             detail="NULL id value"
         )
     
+    version_doc = await service.get_item_version(item_id)
+    if version_doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No item found"
+        )
+    
+    etag = make_etag("item", item_id, version_doc.get("version", 0))
+    last_modified = version_doc.get("updated_at")
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, last_modified)
+    
     item_res = await service.get_item_id(item_id)
     if item_res is None:
         raise HTTPException(
@@ -69,6 +94,7 @@ async def get_specific_item(
             detail="No item found"
         )
     
+    set_cache_headers(response, etag, last_modified)
     return item_res
 
 
@@ -76,8 +102,10 @@ async def get_specific_item(
 async def item_update(
     item_id: str,
     item_json: Annotated[str, Form(description="Item details in JSON format")],
+    background_tasks: BackgroundTasks,
     service: Annotated[ItemService, Depends(get_item_service)],
     current_user: Annotated[UserResponse, Depends(get_current_user)],
+    match_service: Annotated[MatchService, Depends(get_match_service)],
     image_files: Annotated[List[UploadFile] | None, File(description="Optional new images")] = None,  # ✅ At the end
 ):
     """Update an existing item"""
@@ -125,6 +153,8 @@ async def item_update(
                 detail="Failed to update item"
             )
         
+        # Only pairs touched by the edit are re-scored
+        background_tasks.add_task(background(match_service.rematch_item), item_id, existing_item, bool(image_files))
         return item_res
     except Exception as e:
         logger.error(f"Error updating item: {e}")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, status, HTTPException
 from typing import Annotated, List
 from app.models.match import MatchSearchRequest, MatchList, MatchResponse
 from app.models.user import UserResponse
@@ -14,7 +14,13 @@ async def all_matches(
     service: Annotated[MatchService, Depends(get_match_service)],
     current_user: Annotated[UserResponse, Depends(get_current_user)] 
 ):
-    matches= await service.find_potential_matches(search_request)
+    try:
+        matches= await service.find_potential_matches(search_request)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     return matches
 
 @match_router.get("/saved/{item_id}")
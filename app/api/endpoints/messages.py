@@ -1,5 +1,6 @@
 """Messages API Endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response, status
 import logging
 
 from app.models.message import (
@@ -11,6 +12,7 @@ from app.models.message import (
 )
 from app.services.message_service import MessageService
 from app.core.exceptions import ValidationException
+from app.core.etag import make_etag, list_etag, latest_modified, etag_matches, set_cache_headers, not_modified
 from app.api.dependencies import get_current_user, get_message_service
 from app.schemas.user import UserModel
 
@@ -39,19 +41,32 @@ async def send_message(
 
 @router.get("/conversations", response_model=ConversationListResponse)
 async def get_conversations(
+    response: Response,
     include_archived: bool = Query(False),
     limit: int = Query(20, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None),
     current_user: UserModel = Depends(get_current_user),
     message_service: MessageService = Depends(get_message_service)
 ) -> ConversationListResponse:
     """Get all conversations"""
     try:
+        versions = await message_service.get_user_conversation_versions(
+            user_id=current_user.user_id,
+            include_archived=include_archived,
+            limit=limit
+        )
+        etag = list_etag("conversations", versions, "conversation_id", current_user.user_id, include_archived, limit)
+        last_modified = latest_modified(versions)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, last_modified)
+        
         # Direct await - NO asyncio.to_thread
         conversations = await message_service.get_user_conversations(
             user_id=current_user.user_id,
             include_archived=include_archived,
             limit=limit
         )
+        set_cache_headers(response, etag, last_modified)
         return ConversationListResponse(
             conversations=[ConversationResponse.from_domain(conv) for conv in conversations],
             total=len(conversations)
@@ -64,12 +79,22 @@ async def get_conversations(
 @router.get("/conversations/{conversation_id}", response_model=MessageListResponse)
 async def get_conversation_messages(
     conversation_id: str,
+    response: Response,
     limit: int = Query(50, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
     current_user: UserModel = Depends(get_current_user),
     message_service: MessageService = Depends(get_message_service)
 ) -> MessageListResponse:
     """Get messages in conversation"""
     try:
+        # Every new message bumps the conversation version, so polling clients
+        # can be answered from the version alone
+        version_doc = await message_service.get_conversation_version(conversation_id, current_user.user_id)
+        if version_doc is not None:
+            etag = make_etag("conversation", conversation_id, version_doc.get("version", 0), limit)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag, version_doc.get("updated_at"))
+        
         # Direct await - NO asyncio.to_thread
         conversation = await message_service.get_conversation(conversation_id)
         
@@ -83,11 +108,13 @@ async def get_conversation_messages(
         )
         
         #  Direct await
-        await message_service.mark_conversation_as_read(
+        conversation = await message_service.mark_conversation_as_read(
             conversation_id=conversation_id,
             user_id=current_user.user_id
         )
         
+        etag = make_etag("conversation", conversation_id, conversation.version, limit)
+        set_cache_headers(response, etag, conversation.updated_at)
         return MessageListResponse(
             messages=[MessageResponse.from_domain(msg) for msg in messages],
             total=len(messages)
@@ -1,11 +1,13 @@
 
-from fastapi import APIRouter, Depends, status
-from typing import Annotated
-from app.models.search import SearchRequest
+from fastapi import APIRouter, Depends, status, File, Form, UploadFile, HTTPException
+from typing import Annotated, List
+from app.models.search import SearchRequest, CategoryFacet
 from app.models.user import UserResponse
 from app.models.item import ItemList
-from app.api.dependencies import get_current_user, get_search_service
+from app.models.match import MatchList
+from app.api.dependencies import get_current_user, get_search_service, get_image_search_service
 from app.services.search_service import SearchService 
+from app.services.image_search_service import ImageSearchService
 
 search_router = APIRouter()
 
@@ -19,4 +21,35 @@ async def advanced_search_endpoint(
    
     
     results = await service.search_items(search_request)
-    return results
\ No newline at end of file
+    return results
+
+
+@search_router.get("/categories", response_model=List[CategoryFacet])
+async def category_facets_endpoint(
+    service: Annotated[SearchService, Depends(get_search_service)],
+    current_user: Annotated[UserResponse, Depends(get_current_user)],
+    include_claimed: bool = False
+):
+    return await service.category_facets(include_claimed)
+
+
+@search_router.post("/by-image", response_model=MatchList)
+async def search_by_image_endpoint(
+    image_file: Annotated[UploadFile, File(description="Photo of the item to look for")],
+    service: Annotated[ImageSearchService, Depends(get_image_search_service)],
+    current_user: Annotated[UserResponse, Depends(get_current_user)],
+    limit: Annotated[int, Form(ge=1, le=50)] = 10
+):
+    content = await image_file.read()
+    if not content:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is empty"
+        )
+    try:
+        return await service.search_by_image(content, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Annotated, Optional
+from app.models.sync import SyncResponse
+from app.models.user import UserResponse
+from app.services.sync_service import SyncService
+from app.api.dependencies import get_current_user, get_sync_service
+
+
+sync_router = APIRouter()
+
+
+@sync_router.get("/", response_model=SyncResponse)
+async def get_changes(
+    service: Annotated[SyncService, Depends(get_sync_service)],
+    current_user: Annotated[UserResponse, Depends(get_current_user)],
+    since: Optional[int] = Query(None, ge=0, description="Cursor returned by the previous sync call"),
+    limit: int = Query(500, ge=1, le=500)
+):
+    # Without a cursor only the current one is returned; fetch the full lists once, then poll with it
+    return await service.get_changes(current_user.user_id, since, limit)
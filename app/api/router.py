@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from .endpoints import auth, items, users, claims, matches, search, messages
+from .endpoints import auth, items, users, claims, matches, search, messages, sync, debug
 
 api_router = APIRouter()
 
@@ -10,4 +10,6 @@ api_router.include_router(users.user_router, tags=["Users"], prefix="/users")
 api_router.include_router(claims.claim_router, tags=["Claims"], prefix="/claims")
 api_router.include_router(matches.match_router, tags=["Matches"], prefix="/matches")
 api_router.include_router(search.search_router, tags=["Search"], prefix="/search")
-api_router.include_router(messages.router)
\ No newline at end of file
+api_router.include_router(messages.router)
+api_router.include_router(sync.sync_router, tags=["Sync"], prefix="/sync")
+api_router.include_router(debug.debug_router, tags=["Debug"], prefix="/debug")
\ No newline at end of file
@@ -6,6 +6,10 @@ class Settings(BaseSettings):
     APP_NAME: str = "Lost and Found"
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # Records below WARNING each logging call may emit per window; past that one in LOG_SAMPLE_EVERY is kept
+    LOG_BURST: int = int(os.getenv("LOG_BURST", 20))
+    LOG_WINDOW_SECONDS: float = float(os.getenv("LOG_WINDOW_SECONDS", 10))
+    LOG_SAMPLE_EVERY: int = int(os.getenv("LOG_SAMPLE_EVERY", 100))
     
     # Database - MongoDB
     MONGO_URI: str = os.getenv(
@@ -17,6 +21,8 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1
+    # Comma-separated user ids allowed on the /debug endpoints
+    ADMIN_USER_IDS: str = os.getenv("ADMIN_USER_IDS", "")
     
     # R2 Storage (for both dev and production)
     R2_ENDPOINT: str = os.getenv("R2_ENDPOINT")
@@ -26,6 +32,46 @@ class Settings(BaseSettings):
     R2_PUBLIC_URL: str = os.getenv("R2_PUBLIC_URL")
     
     
+    # Delta sync change log
+    SYNC_CHANGE_TTL_SECONDS: int = int(os.getenv("SYNC_CHANGE_TTL_SECONDS", 7 * 24 * 3600))
+    SYNC_MAX_CHANGES: int = 500
+    # Log entries scanned per read to find how far the log is written without holes
+    SYNC_SCAN_LIMIT: int = 5000
+    # A seq still missing after this long was allocated by a writer that died before inserting it
+    SYNC_GAP_GRACE_SECONDS: int = int(os.getenv("SYNC_GAP_GRACE_SECONDS", 30))
+    # Searches replay the change log into a worker's term index at most this often
+    TERM_INDEX_REFRESH_SECONDS: float = float(os.getenv("TERM_INDEX_REFRESH_SECONDS", 1.0))
+    
+    # Duplicate post detection (max Hamming distance between image dHashes)
+    PHASH_DUPLICATE_DISTANCE: int = 6
+    
+    # Weight of the image similarity component in automated matching
+    MATCH_VISUAL_WEIGHT: float = 0.2
+    
+    # Share of a keyword's credit given when it only matches a similar spelling
+    MATCH_FUZZY_DISCOUNT: float = 0.5
+    
+    # Only items posted within this many days of each other are compared (0 = no window)
+    MATCH_WINDOW_DAYS: int = int(os.getenv("MATCH_WINDOW_DAYS", 180))
+    # Match scores halve for every this many days between the two posts (0 = no decay)
+    MATCH_RECENCY_HALF_LIFE_DAYS: float = float(os.getenv("MATCH_RECENCY_HALF_LIFE_DAYS", 60))
+    
+    # MongoDB commands a request may issue before QUERY_DEBUG logs it with a per-collection breakdown
+    QUERY_BUDGET: int = int(os.getenv("QUERY_BUDGET", 20))
+    QUERY_DEBUG: bool = os.getenv("QUERY_DEBUG", "False").lower() == "true"
+    
+    # Event loop lag histogram and blocking call detector (stalls are logged with the blocking stack)
+    LOOP_MONITOR: bool = os.getenv("LOOP_MONITOR", "False").lower() == "true"
+    LOOP_MONITOR_INTERVAL_MS: int = int(os.getenv("LOOP_MONITOR_INTERVAL_MS", 250))
+    LOOP_STALL_THRESHOLD_MS: int = int(os.getenv("LOOP_STALL_THRESHOLD_MS", 100))
+    
+    # Request tracing: OTLP/JSON file or OTLP/HTTP endpoint (empty = off) and share of traces kept
+    TRACE_EXPORT: str = os.getenv("TRACE_EXPORT", "")
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", 0.1))
+    
+    # Memory-mapped match index snapshots (written by `python -m app.jobs.snapshot`)
+    MATCH_SNAPSHOT_DIR: str = os.getenv("MATCH_SNAPSHOT_DIR", "snapshots")
+    
     RESEND_API_KEY: str = os.getenv("RESEND_API_KEY")
     MAIL_USERNAME: str
     MAIL_PASSWORD: str 
@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 import logging
 from app.core.config import settings
+from app.core.query_monitor import query_listener
 
 logger = logging.getLogger(__name__)
 
@@ -15,15 +16,39 @@ async def connect_to_mongo():
     global _db, _client
     try:
         logger.info(f"Connecting to MongoDB at {settings.MONGO_URI}")
-        _client = AsyncIOMotorClient(settings.MONGO_URI)
+        # The listener attributes every command to the request that issued it
+        _client = AsyncIOMotorClient(settings.MONGO_URI, event_listeners=[query_listener])
         # Verify connection
         await _client.admin.command('ping')
         _db = _client[settings.DB_NAME]
+        await ensure_indexes(_db)
         logger.info(f"✓ Connected to MongoDB successfully on database: {settings.DB_NAME}")
     except Exception as e:
         logger.error(f"✗ Failed to connect to MongoDB: {e}")
         raise
 
+# Pages of GET /items/ come in _id order; their version check reads only this index
+ITEM_VERSION_LIST_INDEX = [("_id", 1), ("item_id", 1), ("version", 1), ("updated_at", 1)]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    """
+    Create the indexes the repositories rely on (no-op if they already exist)
+    """
+    # Covering indexes so ETag checks never have to load the full document
+    await db["items"].create_index([("item_id", 1), ("version", 1), ("updated_at", 1)])
+    await db["items"].create_index(ITEM_VERSION_LIST_INDEX)
+    await db["conversations"].create_index([("conversation_id", 1), ("version", 1), ("updated_at", 1)])
+    # Delta sync change log, compacted by TTL
+    await db["changes"].create_index([("audience", 1), ("seq", 1)])
+    await db["changes"].create_index([("seq", 1)], unique=True)
+    # Covers the scan for holes in the log
+    await db["changes"].create_index([("seq", 1), ("changed_at", 1)])
+    await db["changes"].create_index([("changed_at", 1)], expireAfterSeconds=settings.SYNC_CHANGE_TTL_SECONDS)
+    # Match pair lookups (bulk re-match upserts, per-item match lists)
+    await db["matches"].create_index([("item_id_a", 1), ("item_id_b", 1)])
+    await db["matches"].create_index([("item_id_b", 1)])
+
 async def close_mongo_connection():
     """
     Close MongoDB connection when the application stops
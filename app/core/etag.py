@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Iterable, Optional
+import hashlib
+
+from fastapi import Response, status
+
+# Clients must revalidate on every use, but may keep a private copy to revalidate against
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from the version parts of a resource."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def list_etag(prefix: str, versions: Iterable[dict], id_field: str, *extra) -> str:
+    """Build an ETag for a page of documents from their (id, version) pairs."""
+    parts = [prefix, *extra]
+    for doc in versions:
+        parts.append(f"{doc.get(id_field)}:{doc.get('version', 0)}")
+    return make_etag(*parts)
+
+
+def latest_modified(versions: Iterable[dict]) -> Optional[datetime]:
+    """Return the newest updated_at/created_at among version documents."""
+    stamps = [d.get("updated_at") or d.get("created_at") for d in versions]
+    stamps = [s for s in stamps if s is not None]
+    return max(stamps) if stamps else None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def set_cache_headers(response: Response, etag: str, last_modified: Optional[datetime] = None) -> None:
+    """Attach ETag, Last-Modified and Cache-Control headers to a response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = _http_date(last_modified)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Build an empty 304 response carrying the current validators."""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag, last_modified)
+    return response
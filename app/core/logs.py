@@ -0,0 +1,151 @@
+"""
+Logging setup for the API process.
+
+Handlers on the event loop only put records on a queue. A QueueListener
+thread formats them as JSON (python-json-logger) and writes them to
+stdout, so slow terminals and log shippers never stall a request. Every
+record carries the request id (X-Request-ID, generated when the client
+sends none) and the trace id of a traced request.
+
+Before a record is queued it passes a per call site rate limit. Each
+logging statement may emit LOG_BURST records per LOG_WINDOW_SECONDS.
+Beyond that, only one in LOG_SAMPLE_EVERY is kept, with `sampled` set to
+the number of records it stands for. Warnings and errors are never
+limited.
+"""
+from contextvars import ContextVar
+from typing import Dict, Optional
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+
+from pythonjsonlogger import jsonlogger
+
+from app.core.config import settings
+from app.core.tracing import current_trace_id
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class ContextFilter(logging.Filter):
+    """Adds request_id and trace_id to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        record.trace_id = current_trace_id()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Per call site budget below WARNING; see the module docstring."""
+
+    def __init__(self, burst: int, window_s: float, sample_every: int):
+        super().__init__()
+        self.burst = burst
+        self.window_s = window_s
+        self.sample_every = max(1, sample_every)
+        self.sites: Dict[tuple, list] = {}  # -> [window start, count in window, dropped since last kept]
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.burst <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            state = self.sites.get(site)
+            if state is None or now - state[0] >= self.window_s:
+                dropped = state[2] if state else 0
+                state = self.sites[site] = [now, 0, 0]
+                if dropped:
+                    record.sampled = dropped + 1
+            state[1] += 1
+            if state[1] <= self.burst:
+                return True
+            if (state[1] - self.burst) % self.sample_every:
+                state[2] += 1
+                return False
+            record.sampled = state[2] + 1
+            state[2] = 0
+            return True
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging():
+    """
+    Route the root logger (and uvicorn's loggers) through the queue. Safe to
+    call more than once; the listener is started once per process.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(jsonlogger.JsonFormatter(
+        "%(asctime)s %(levelname)s %(name)s %(message)s %(request_id)s %(trace_id)s",
+        rename_fields={"asctime": "time", "levelname": "level", "name": "logger"}))
+
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(RateLimitFilter(settings.LOG_BURST, settings.LOG_WINDOW_SECONDS, settings.LOG_SAMPLE_EVERY))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    # uvicorn configures its own stream handlers before the app is imported
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Write out what is still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving every request an id, taken from X-Request-ID or generated, and echoing it back."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope.get("headers", []):
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = _request_id.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request_id.reset(token)
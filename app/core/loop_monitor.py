@@ -0,0 +1,135 @@
+"""
+Event loop lag monitor and blocking call detector.
+
+A task on the loop sleeps LOOP_MONITOR_INTERVAL_MS at a time and records
+how late it wakes up in the loop lag histogram. A watchdog thread checks
+the task's heartbeat. When the loop has not come back for
+LOOP_STALL_THRESHOLD_MS, the watchdog snapshots the loop thread's stack,
+which is the code blocking it. The coroutines it runs in are on that
+stack, so the request's route is read from the metrics middleware's frame.
+When the loop comes back, the stall is logged with its duration and kept
+for GET /debug/stalls.
+
+The ticker wakes a few times a second and the watchdog only reads a
+timestamp, so the monitor is cheap enough to leave on (LOOP_MONITOR=true).
+"""
+from collections import deque
+from typing import Deque, List, Optional
+import asyncio
+import logging
+import sys
+import threading
+import time
+
+from app.core.config import settings
+from app.core.metrics import LOOP_LAG_SECONDS, LOOP_STALLS, request_route
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames kept per stall
+STACK_DEPTH = 40
+
+class Stall:
+    def __init__(self, started_at: float, route: Optional[str], stack: List[str]):
+        self.started_at = started_at
+        self.route = route
+        self.stack = stack
+        self.duration_ms: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {"started_at": self.started_at, "duration_ms": self.duration_ms,
+                "route": self.route, "stack": self.stack}
+
+
+def _stack(frame) -> List[str]:
+    """The STACK_DEPTH innermost frames, innermost last."""
+    stack = []
+    while frame is not None and len(stack) < STACK_DEPTH:
+        code = frame.f_code
+        stack.append(f"{code.co_filename}:{frame.f_lineno} {code.co_name}")
+        frame = frame.f_back
+    return stack[::-1]
+
+
+class LoopMonitor:
+
+    def __init__(self, interval_s: float, threshold_s: float):
+        self.interval = interval_s
+        self.threshold = threshold_s
+        self.heartbeat = time.monotonic()
+        self.stalls: Deque[Stall] = deque(maxlen=100)
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog:
+            self._watchdog.join()
+
+    async def _tick(self):
+        while True:
+            due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            LOOP_LAG_SECONDS.observe(max(0.0, now - due))
+            self.heartbeat = now
+
+    def _watch(self):
+        stall, seen = None, self.heartbeat
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self.heartbeat
+            if stall is not None and heartbeat != seen:
+                stall.duration_ms = (heartbeat - seen - self.interval) * 1000.0
+                self._report(stall)
+                stall = None
+            seen = heartbeat
+            if stall is None and time.monotonic() - heartbeat - self.interval > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                stall = Stall(time.time(), request_route(frame), _stack(frame))
+
+    def _report(self, stall: Stall):
+        self.stalls.append(stall)
+        LOOP_STALLS.labels(stall.route or "none").inc()
+        logger.warning(f"Event loop blocked for {stall.duration_ms:.0f}ms"
+                       f"{' in ' + stall.route if stall.route else ''}:\n  " + "\n  ".join(stall.stack))
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def start_loop_monitor():
+    """Start the monitor on the running loop if LOOP_MONITOR is set."""
+    global _monitor
+    if not settings.LOOP_MONITOR or _monitor is not None:
+        return
+    _monitor = LoopMonitor(settings.LOOP_MONITOR_INTERVAL_MS / 1000.0, settings.LOOP_STALL_THRESHOLD_MS / 1000.0)
+    _monitor.start()
+
+
+async def stop_loop_monitor():
+    global _monitor
+    if _monitor is not None:
+        await _monitor.stop()
+        _monitor = None
+
+
+def recent_stalls() -> List[dict]:
+    """Stalls seen by this worker, latest first."""
+    if _monitor is None:
+        return []
+    return [s.to_dict() for s in reversed(_monitor.stalls)]
@@ -0,0 +1,137 @@
+"""
+Prometheus metrics, served at GET /metrics.
+
+Each worker updates its own values without coordinating with the others.
+When PROMETHEUS_MULTIPROC_DIR is set (it must be set, and the directory
+emptied, before the workers start), prometheus_client keeps every worker's
+values in its own memory-mapped file in that directory and a scrape adds
+them up, so any worker can answer for all of them. Without it the values
+are the answering worker's only.
+"""
+from functools import wraps
+from typing import Optional
+import os
+import time
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY,
+                               generate_latest, multiprocess)
+
+NAMESPACE = "lostfound"
+
+# Seconds; SMTP and image processing are slower than anything served from MongoDB
+_FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], namespace=NAMESPACE, buckets=_FAST_BUCKETS)
+HTTP_REQUEST_DB_COMMANDS = Histogram(
+    "http_request_db_commands", "MongoDB commands issued per HTTP request",
+    ["method", "route"], namespace=NAMESPACE, buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89))
+DB_COMMAND_SECONDS = Histogram(
+    "db_command_duration_seconds", "MongoDB command latency",
+    ["collection", "operation", "outcome"], namespace=NAMESPACE, buckets=_FAST_BUCKETS)
+IMAGE_PROCESSING_SECONDS = Histogram(
+    "image_processing_duration_seconds", "Time to decode, resize and fingerprint an uploaded image",
+    namespace=NAMESPACE, buckets=_SLOW_BUCKETS)
+STORAGE_OPERATION_SECONDS = Histogram(
+    "storage_operation_duration_seconds", "R2 object storage call latency",
+    ["operation", "outcome"], namespace=NAMESPACE, buckets=_SLOW_BUCKETS)
+EMAIL_SEND_SECONDS = Histogram(
+    "email_send_duration_seconds", "SMTP send latency",
+    ["outcome"], namespace=NAMESPACE, buckets=_SLOW_BUCKETS)
+MATCHING_SECONDS = Histogram(
+    "matching_duration_seconds", "Matching call latency",
+    ["operation"], namespace=NAMESPACE, buckets=_FAST_BUCKETS)
+MATCHING_CANDIDATES = Histogram(
+    "matching_candidates", "Candidates scored per matching call",
+    ["operation"], namespace=NAMESPACE, buckets=(0, 10, 100, 1000, 10000, 100000))
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "How late the event loop runs a scheduled callback",
+    namespace=NAMESPACE, buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+LOOP_STALLS = Counter(
+    "event_loop_stalls_total", "Times the event loop was blocked past LOOP_STALL_THRESHOLD_MS",
+    ["route"], namespace=NAMESPACE)
+MATCHES_CREATED = Counter(
+    "matches_created_total", "Match pairs stored by automated matching",
+    ["operation"], namespace=NAMESPACE)
+
+
+def outcome(ok: bool) -> str:
+    return "ok" if ok else "error"
+
+
+def timed(histogram):
+    """Decorator observing the duration of an async function, raised or not."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def route_template(scope) -> str:
+    """Request path with path parameter values put back as {name}, so ids do not split routes."""
+    path = scope.get("path", "")
+    for name, value in (scope.get("path_params") or {}).items():
+        path = path.replace(str(value), "{" + name + "}", 1)
+    return path
+
+
+def request_route(frame) -> Optional[str]:
+    """
+    Route of the request a stack belongs to, found from the MetricsMiddleware
+    frame on it (coroutines awaiting each other are on one stack), or None.
+    """
+    while frame is not None:
+        if frame.f_code is _MIDDLEWARE_CODE:
+            scope = frame.f_locals.get("scope") or {}
+            return f"{scope.get('method', '')} {route_template(scope) if scope.get('endpoint') else 'unmatched'}"
+        frame = frame.f_back
+    return None
+
+
+def render_metrics():
+    """Exposition text and its content type, for every worker when multiprocess mode is on."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing latency per method, route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Unmatched paths would give every scanner probe its own series
+            route = route_template(scope) if scope.get("endpoint") else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status[0])).observe(
+                time.perf_counter() - started)
+
+
+_MIDDLEWARE_CODE = MetricsMiddleware.__call__.__code__
@@ -0,0 +1,84 @@
+"""
+On-demand statistical profiler for a live worker.
+
+A background thread reads every thread's stack with sys._current_frames
+at a fixed interval for a number of seconds. Samples are tagged with the
+route of the request they belong to (or the thread name outside requests)
+and folded into collapsed stacks, one "frame;frame;... count" line per
+distinct stack with the root first. flamegraph.pl, speedscope and
+inferno read this format directly. Threads parked in select or a lock wait
+are skipped unless idle samples are asked for. Only one profile runs per
+worker at a time.
+"""
+from collections import Counter
+import os
+import sys
+import sysconfig
+import threading
+import time
+
+from app.core.metrics import request_route
+
+# Where idle threads sit: the event loop's selector and pool workers waiting for work
+_IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"),
+                ("thread.py", "_worker")}
+
+_PREFIXES = sorted({p for p in (sysconfig.get_paths()["purelib"], sysconfig.get_paths()["stdlib"], os.getcwd())},
+                   key=len, reverse=True)
+
+_running = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """A profile is already running on this worker."""
+
+
+def _short(path: str) -> str:
+    for prefix in _PREFIXES:
+        if path.startswith(prefix):
+            return path[len(prefix):].lstrip(os.sep)
+    return path
+
+
+def _idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES
+
+
+def _fold(frame, tag: str) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    frames.append(tag)
+    return ";".join(reversed(frames))
+
+
+def sample(seconds: float, interval_s: float, idle: bool = False) -> Counter:
+    """Collapsed stack -> sample count, taken on this thread (blocks for `seconds`)."""
+    own = threading.get_ident()
+    names = {}
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (not idle and _idle(frame)):
+                continue
+            if thread_id not in names:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            stacks[_fold(frame, request_route(frame) or f"[{names.get(thread_id, thread_id)}]")] += 1
+        time.sleep(max(0.0, interval_s - (time.monotonic() - started)))
+    return stacks
+
+
+def profile(seconds: float, interval_s: float, idle: bool = False) -> str:
+    """Run one profile and return it as collapsed stacks; ProfilerBusy if one is already running."""
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        stacks = sample(seconds, interval_s, idle)
+    finally:
+        _running.release()
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,186 @@
+"""
+Per-request MongoDB accounting.
+
+A pymongo CommandListener, registered on the Motor client, adds every
+command to the stats of the request that issued it. The request is found
+through a contextvar, which Motor carries into its executor threads.
+QueryStatsMiddleware opens the stats for each HTTP request and reports
+them in three places:
+- in a Server-Timing header
+- in a rolling per-route summary (query_summary)
+- in a warning, when QUERY_DEBUG is set and the request used more than
+  QUERY_BUDGET commands
+
+Queries made by background tasks count toward the summary but not the
+header, which is sent before they run.
+"""
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional, Tuple
+import logging
+import threading
+import time
+
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.core.metrics import DB_COMMAND_SECONDS, HTTP_REQUEST_DB_COMMANDS, outcome, route_template
+
+logger = logging.getLogger(__name__)
+
+# Commands whose name is not followed by the collection they act on
+_COLLECTION_FIELDS = {"getMore": "collection"}
+
+
+class RequestQueries:
+    """Command count, time and documents returned, per (collection, operation), for one request."""
+
+    def __init__(self):
+        self.ops: Dict[Tuple[str, str], list] = {}  # -> [count, duration ms, documents]
+        self.lock = threading.Lock()
+
+    def add(self, collection: str, operation: str, duration_ms: float, documents: int):
+        with self.lock:
+            entry = self.ops.setdefault((collection, operation), [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += duration_ms
+            entry[2] += documents
+
+    @property
+    def count(self) -> int:
+        return sum(e[0] for e in self.ops.values())
+
+    @property
+    def duration_ms(self) -> float:
+        return sum(e[1] for e in self.ops.values())
+
+    @property
+    def documents(self) -> int:
+        return sum(e[2] for e in self.ops.values())
+
+    def server_timing(self) -> str:
+        entries = [f'db;dur={self.duration_ms:.1f};desc="{self.count} queries, {self.documents} docs"']
+        for (collection, operation), (count, duration, documents) in sorted(self.ops.items()):
+            entries.append(f'db.{collection}.{operation};dur={duration:.1f};desc="{count}x, {documents} docs"')
+        return ", ".join(entries)
+
+    def breakdown(self) -> str:
+        return ", ".join(f"{c}.{o} x{e[0]} ({e[1]:.1f}ms, {e[2]} docs)" for (c, o), e in sorted(self.ops.items()))
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+def _documents(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "value" in reply:  # findAndModify
+        return 1 if reply["value"] is not None else 0
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class QueryListener(monitoring.CommandListener):
+    """
+    Observes every command in the latency histogram and attributes it to
+    the request in the issuing context, if any.
+    """
+
+    def __init__(self):
+        self.pending: Dict[Tuple, Tuple[Optional[RequestQueries], str, str]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        field = _COLLECTION_FIELDS.get(event.command_name, event.command_name)
+        collection = event.command.get(field)
+        self.pending[(event.connection_id, event.request_id)] = (
+            _current.get(), collection if isinstance(collection, str) else event.database_name, event.command_name)
+
+    def _finish(self, event, reply: Optional[dict]):
+        started = self.pending.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        stats, collection, operation = started
+        DB_COMMAND_SECONDS.labels(collection, operation, outcome(reply is not None)).observe(
+            event.duration_micros / 1e6)
+        if stats is not None:
+            stats.add(collection, operation, event.duration_micros / 1000.0, _documents(reply) if reply else 0)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event, event.reply)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finish(event, None)
+
+
+query_listener = QueryListener()
+
+
+class RouteSummary:
+    """Rolling window of the last WINDOW requests per route: queries, DB time and documents."""
+
+    WINDOW = 500
+
+    def __init__(self):
+        self.routes: Dict[str, Deque[Tuple[int, float, int, float]]] = {}
+
+    def add(self, route: str, stats: RequestQueries, elapsed_ms: float):
+        window = self.routes.get(route)
+        if window is None:
+            window = self.routes[route] = deque(maxlen=self.WINDOW)
+        window.append((stats.count, stats.duration_ms, stats.documents, elapsed_ms))
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for route, window in sorted(self.routes.items()):
+            n = len(window)
+            counts = sorted(w[0] for w in window)
+            result[route] = {
+                "requests": n,
+                "queries_mean": sum(counts) / n,
+                "queries_max": counts[-1],
+                "queries_p95": counts[min(n - 1, int(n * 0.95))],
+                "db_ms_mean": sum(w[1] for w in window) / n,
+                "documents_mean": sum(w[2] for w in window) / n,
+                "request_ms_mean": sum(w[3] for w in window) / n,
+            }
+        return result
+
+
+query_summary = RouteSummary()
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware opening a RequestQueries for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueries()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", stats.server_timing().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            path = route_template(scope)
+            HTTP_REQUEST_DB_COMMANDS.labels(scope["method"], path if scope.get("endpoint") else "unmatched") \
+                .observe(stats.count)
+            route = f"{scope['method']} {path}"
+            query_summary.add(route, stats, elapsed_ms)
+            if settings.QUERY_DEBUG and stats.count > settings.QUERY_BUDGET:
+                logger.warning(f"{route} used {stats.count} queries (budget {settings.QUERY_BUDGET}), "
+                               f"{stats.duration_ms:.1f}ms in MongoDB: {stats.breakdown()}")
@@ -1,12 +1,18 @@
 from typing import Optional
-import boto3
 import io
 import logging
+import threading
+import time
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.core.metrics import STORAGE_OPERATION_SECONDS, outcome
+from app.core.tracing import CLIENT, traced_class
+from app.utils.lazy import lazy_module
 
+boto3 = lazy_module("boto3")
 logger = logging.getLogger(__name__)
 
+@traced_class(CLIENT)
 class R2StorageClient:
     """
     Cloudflare R2 client wrapper (S3-compatible).
@@ -14,22 +20,31 @@ class R2StorageClient:
     """
 
     def __init__(self):
-        try:
-            self.client = boto3.client(
-                "s3",
-                endpoint_url=settings.R2_ENDPOINT,
-                aws_access_key_id=settings.R2_ACCESS_KEY,
-                aws_secret_access_key=settings.R2_SECRET_KEY,
-                region_name="auto"
-            )
-
-            self.bucket_name = settings.R2_BUCKET_NAME
-
-            logger.info(f"Connected to R2 bucket: {self.bucket_name}")
-
-        except Exception as e:
-            logger.error(f"Failed to initialize R2 client: {e}")
-            raise RuntimeError(f"R2 connection failed: {e}")
+        self.bucket_name = settings.R2_BUCKET_NAME
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Importing boto3 and loading the S3 service model is the slowest part
+        # of a worker's start, so it waits for the first storage call
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        self._client = boto3.client(
+                            "s3",
+                            endpoint_url=settings.R2_ENDPOINT,
+                            aws_access_key_id=settings.R2_ACCESS_KEY,
+                            aws_secret_access_key=settings.R2_SECRET_KEY,
+                            region_name="auto"
+                        )
+                        logger.info(f"Connected to R2 bucket: {self.bucket_name}")
+
+                    except Exception as e:
+                        logger.error(f"Failed to initialize R2 client: {e}")
+                        raise RuntimeError(f"R2 connection failed: {e}")
+        return self._client
 
     def upload_file(
         self,
@@ -40,6 +55,8 @@ class R2StorageClient:
         """
         Upload file to R2 and return public URL.
         """
+        started = time.perf_counter()
+        ok = False
         try:
             self.client.put_object(
                 Bucket=self.bucket_name,
@@ -48,6 +65,7 @@ class R2StorageClient:
                 ContentType=content_type
             )
 
+            ok = True
             file_url = f"{settings.R2_PUBLIC_URL}/{file_id}"
             logger.info(f"File uploaded to R2: {file_url}")
 
@@ -59,22 +77,29 @@ class R2StorageClient:
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Storage service unavailable."
             )
+        finally:
+            STORAGE_OPERATION_SECONDS.labels("upload", outcome(ok)).observe(time.perf_counter() - started)
 
     def delete_file(self, file_id: str) -> bool:
         """
         Delete file from R2.
         """
+        started = time.perf_counter()
+        ok = False
         try:
             self.client.delete_object(
                 Bucket=self.bucket_name,
                 Key=file_id
             )
+            ok = True
             logger.info(f"File deleted from R2: {file_id}")
             return True
 
         except Exception as e:
             logger.warning(f"R2 delete warning: {e}")
             return False
+        finally:
+            STORAGE_OPERATION_SECONDS.labels("delete", outcome(ok)).observe(time.perf_counter() - started)
 
     def get_file_url(self, file_id: str) -> str:
         """
@@ -86,6 +111,7 @@ class R2StorageClient:
         """
         Check if file exists in R2.
         """
+        started = time.perf_counter()
         try:
             self.client.head_object(
                 Bucket=self.bucket_name,
@@ -95,6 +121,9 @@ class R2StorageClient:
 
         except Exception:
             return False
+        finally:
+            # A missing file is an answer too; failures are not told apart from it here
+            STORAGE_OPERATION_SECONDS.labels("exists", "ok").observe(time.perf_counter() - started)
 
 
 # Dependency
@@ -0,0 +1,323 @@
+"""
+Lightweight request tracing.
+
+Spans nest through a contextvar, so children started in awaited calls,
+asyncio.to_thread and Motor's executor threads find their parent without
+being passed anything. Spans are made:
+- for every request, by TracingMiddleware
+- for every public method of the classes decorated with @traced_class
+  (the repositories, R2StorageClient)
+- for functions decorated with @traced (SMTP sends) and blocks in
+  `with span(...)` (img_proc)
+- for background tasks wrapped with background()
+
+Sampling is decided once per trace, at its root. A W3C traceparent header
+on the request carries an upstream decision; otherwise TRACE_SAMPLE_RATE
+of the traces are kept. Unsampled traces cost a contextvar read per span.
+
+Finished spans are queued and written by a daemon thread in OTLP/JSON
+(ExportTraceServiceRequest). TRACE_EXPORT is either a file, which gets one
+request per line like the collector's file exporter, or an OTLP/HTTP
+endpoint such as http://collector:4318/v1/traces. Leave it empty to turn
+tracing off.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional
+import asyncio
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+# OTLP status codes
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_BATCH_SIZE = 512
+_FLUSH_INTERVAL_S = 2.0
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int = INTERNAL,
+                 attributes: Optional[dict] = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _exporter.submit(self)
+
+    def to_otlp(self) -> dict:
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+# The span new spans are children of; _UNSAMPLED inside a trace that is not kept
+_UNSAMPLED = object()
+_current: ContextVar = ContextVar("current_span", default=None)
+
+
+def enabled() -> bool:
+    return bool(settings.TRACE_EXPORT) and settings.TRACE_SAMPLE_RATE > 0
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current.get()
+    return current.trace_id if isinstance(current, Span) else None
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes):
+    """
+    Run a block in a span under the current one. Outside a trace this starts
+    one, subject to sampling; in an unsampled trace it does nothing. Yields
+    the span, or None when it is not recorded.
+    """
+    parent = _current.get()
+    if parent is _UNSAMPLED or not enabled():
+        yield None
+        return
+    if parent is None and random.random() >= settings.TRACE_SAMPLE_RATE:
+        token = _current.set(_UNSAMPLED)
+        try:
+            yield None
+        finally:
+            _current.reset(token)
+        return
+
+    if parent is None:
+        current = Span(name, os.urandom(16).hex(), None, kind, attributes)
+    else:
+        current = Span(name, parent.trace_id, parent.span_id, kind, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def traced(name: Optional[str] = None, kind: int = INTERNAL):
+    """Decorator running a function (sync or async) in a span named after it."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_class(kind: int = INTERNAL):
+    """Class decorator tracing every public method defined on the class."""
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if not attr.startswith("_") and inspect.isfunction(value):
+                setattr(cls, attr, traced(f"{cls.__name__}.{attr}", kind)(value))
+        return cls
+    return decorator
+
+
+def background(func):
+    """Wrap a callable handed to BackgroundTasks so its run is a span in the request's trace."""
+    return traced(f"background {getattr(func, '__qualname__', func)}")(func)
+
+
+def _parse_traceparent(header: str):
+    # version-traceid-parentid-flags
+    parts = header.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the request's root span. The span ends with the
+    response body; background tasks run after it, as its children.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        upstream = None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                upstream = _parse_traceparent(value.decode("latin-1"))
+                break
+        sampled = upstream[2] if upstream else random.random() < settings.TRACE_SAMPLE_RATE
+        if not sampled:
+            token = _current.set(_UNSAMPLED)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _current.reset(token)
+            return
+
+        root = Span(scope["method"], upstream[0] if upstream else os.urandom(16).hex(),
+                    upstream[1] if upstream else None, SERVER,
+                    {"http.method": scope["method"], "url.path": scope.get("path", "")})
+        token = _current.set(root)
+
+        async def send_and_end(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", root.trace_id.encode())]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                _finish(root, scope)
+
+        try:
+            await self.app(scope, receive, send_and_end)
+        except Exception as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            _finish(root, scope)
+
+
+def _finish(root: Span, scope):
+    if root.end_ns is None:
+        route = route_template(scope) if scope.get("endpoint") else "unmatched"
+        root.name = f"{scope['method']} {route}"
+        root.attributes["http.route"] = route
+        if root.attributes.get("http.status_code", 500) >= 500 and not root.error:
+            root.error = "server error"
+        root.end()
+
+
+class _Exporter:
+    """Batches finished spans on a daemon thread and writes them to TRACE_EXPORT."""
+
+    def __init__(self):
+        self.queue: "queue.Queue[Span]" = queue.Queue(maxsize=10000)
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, finished: Span):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self.thread.start()
+        try:
+            self.queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch: List[Span] = [self.queue.get()]
+            deadline = time.monotonic() + _FLUSH_INTERVAL_S
+            while len(batch) < _BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.warning(f"Dropped {len(batch)} spans, export to {settings.TRACE_EXPORT} failed: {e}")
+
+    def flush(self, timeout: float = 5.0):
+        """Write whatever is queued now (called at shutdown)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch, timeout)
+
+    def _write(self, batch: List[Span], timeout: float = 10.0):
+        body = json.dumps(_export_request(batch), separators=(",", ":"))
+        target = settings.TRACE_EXPORT
+        if target.startswith(("http://", "https://")):
+            import httpx
+            httpx.post(target, content=body, headers={"Content-Type": "application/json"},
+                       timeout=timeout).raise_for_status()
+        else:
+            with open(target, "a") as f:
+                f.write(body + "\n")
+
+
+def _export_request(batch: List[Span]) -> Dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [_attribute("service.name", settings.APP_NAME),
+                                    _attribute("process.pid", os.getpid())]},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": [s.to_otlp() for s in batch]}],
+    }]}
+
+
+_exporter = _Exporter()
+
+
+async def flush_traces():
+    if enabled():
+        await asyncio.to_thread(_exporter.flush)
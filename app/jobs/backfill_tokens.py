@@ -0,0 +1,59 @@
+"""
+Write `desc_tokens` (and a missing `type_code`) onto stored items.
+
+    python -m app.jobs.backfill_tokens [--batch-size N]
+
+Only documents whose `tokens_version` differs from TOKENIZER_VERSION are
+touched, so the job is safe to interrupt and re-run: a restart skips
+everything already written. Run it after deploying a tokenizer change.
+"""
+import argparse
+import asyncio
+import logging
+
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.repositories.item_repository import ItemRepo
+from app.utils.taxonomy import item_type_code
+from app.utils.text import TOKENIZER_VERSION, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill(item_repo: ItemRepo, batch_size: int = 500) -> int:
+    after_id, total = None, 0
+    while True:
+        docs = await item_repo.get_items_needing_tokens(after_id, batch_size)
+        if not docs:
+            break
+        updates = []
+        for doc in docs:
+            fields = {"desc_tokens": tokenize(doc.get("desc", "")), "tokens_version": TOKENIZER_VERSION}
+            if doc.get("type_code") is None:
+                fields["type_code"] = item_type_code(doc.get("type", ""), doc.get("desc", ""))
+            updates.append((doc["_id"], fields))
+        await item_repo.set_derived_fields(updates)
+        after_id = docs[-1]["_id"]
+        total += len(docs)
+        logger.info(f"Backfilled {total} items (last _id {after_id})")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill tokenized descriptions on stored items.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    async def run():
+        await connect_to_mongo()
+        try:
+            total = await backfill(ItemRepo(), args.batch_size)
+            logger.info(f"Backfill finished: {total} items updated to tokenizer v{TOKENIZER_VERSION}")
+        finally:
+            await close_mongo_connection()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,265 @@
+"""
+Offline evaluation of a match scorer against returned items.
+
+    python -m app.jobs.evaluate [--dump DIR] [--scorer weighted] [--set type_weight=0.6 ...]
+                                [-k 5] [--threshold 0.7222] [--out report.json]
+
+Ground truth comes from approved claims that ended in a hand-off (status
+APPROVE with is_returned): the claimant owns the claimed item, so their own
+posts of the other post type are the matches the scorer should have found.
+Every such claim is replayed as a query: the claimed item is scored against
+the items that existed when the claim was submitted, and the ranking is
+graded with precision@k, recall@k, MRR, and recall/precision at the
+auto-match threshold. Scoring latency (p50/p99 per query) and peak traced
+memory are measured in separate passes so tracing does not skew the timings.
+
+--scorer is "weighted" (the production formula, with its weights and decay
+overridable through --set) or "module:attr" for any factory that takes the
+--set parameters as keyword arguments and returns a callable
+`scorer(query: dict, candidates: List[dict]) -> Sequence[float]`. Item dicts
+carry the stored fields plus `desc_tokens`, `type_code` and `features`.
+
+The report is written as JSON so runs can be diffed.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Sequence
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import bson
+import numpy as np
+
+from app.core.config import settings
+from app.utils.match_scoring import (AUTO_MATCH_THRESHOLD, KEYWORD_WEIGHT, TYPE_WEIGHT, days_between,
+                                     recency_factor, score_block)
+from app.utils.taxonomy import item_type_code, type_credit
+from app.utils.text import tokenize
+from app.utils.visual_features import stack_features
+
+logger = logging.getLogger(__name__)
+
+Scorer = Callable[[dict, List[dict]], Sequence[float]]
+
+
+class WeightedScorer:
+    """The production pair score: type credit, keyword overlap, photos, recency decay."""
+
+    def __init__(self, type_weight: float = TYPE_WEIGHT, keyword_weight: float = KEYWORD_WEIGHT,
+                 visual_weight: float = settings.MATCH_VISUAL_WEIGHT,
+                 half_life_days: float = settings.MATCH_RECENCY_HALF_LIFE_DAYS,
+                 window_days: int = settings.MATCH_WINDOW_DAYS):
+        self.type_weight = float(type_weight)
+        self.keyword_weight = float(keyword_weight)
+        self.visual_weight = float(visual_weight)
+        self.half_life_days = float(half_life_days)
+        self.window_days = int(window_days)
+
+    def __call__(self, query: dict, candidates: List[dict]) -> np.ndarray:
+        credit = np.array([[type_credit(query["type_code"], c["type_code"], query.get("type", ""), c.get("type", ""))
+                            for c in candidates]], dtype=np.float64)
+        scores = score_block(
+            [set(query["desc_tokens"])], [set(c["desc_tokens"]) for c in candidates],
+            query["features"][None], np.stack([c["features"] for c in candidates]),
+            type_credit=credit, visual_weight=self.visual_weight,
+            type_weight=self.type_weight, keyword_weight=self.keyword_weight,
+        )[0]
+        gaps = np.array([days_between(query.get("created_at"), c.get("created_at")) for c in candidates])
+        return scores * recency_factor(gaps, self.half_life_days, self.window_days)
+
+
+SCORERS = {"weighted": WeightedScorer}
+
+
+def load_scorer(spec: str, params: Dict[str, float]) -> Scorer:
+    factory = SCORERS.get(spec)
+    if factory is None:
+        module, _, attr = spec.partition(":")
+        if not attr:
+            raise ValueError(f"Unknown scorer {spec!r}; use one of {sorted(SCORERS)} or module:attr")
+        factory = getattr(importlib.import_module(module), attr)
+    return factory(**params)
+
+
+def _read_bson(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        return list(bson.decode_file_iter(f))
+
+
+def load_dump(dump_dir: str):
+    """Items (with derived fields and stacked image features) and ground-truth claims from a mongodump."""
+    items = _read_bson(os.path.join(dump_dir, "items.bson"))
+    claims = [c for c in _read_bson(os.path.join(dump_dir, "claims.bson"))
+              if c.get("status") == "APPROVE" and c.get("is_returned")]
+
+    blobs = {}
+    for image in _read_bson(os.path.join(dump_dir, "images.bson")):
+        if image.get("features") is not None:
+            blobs.setdefault(image["item_id"], []).append(bytes(image["features"]))
+    features = stack_features([blobs.get(d["item_id"], []) for d in items])
+
+    for doc, row in zip(items, features):
+        if doc.get("desc_tokens") is None:
+            doc["desc_tokens"] = tokenize(doc.get("desc", ""))
+        if doc.get("type_code") is None:
+            doc["type_code"] = item_type_code(doc.get("type", ""), doc.get("desc", ""))
+        doc["features"] = row
+    return items, claims
+
+
+def _opposite(a: dict, b: dict) -> bool:
+    # Legacy posts without a post_type could be either side
+    pa, pb = (a.get("post_type") or "").lower(), (b.get("post_type") or "").lower()
+    return not pa or not pb or pa != pb
+
+
+def build_queries(items: List[dict], claims: List[dict]):
+    """
+    (query item, candidates, relevant candidate ids) per returned claim.
+    Claims whose claimant has no post the scorer could have ranked are
+    skipped, since no scorer can get them right.
+    """
+    by_id = {d["item_id"]: d for d in items}
+    queries, skipped = [], 0
+    for claim in claims:
+        query = by_id.get(claim["item_id"])
+        if query is None:
+            skipped += 1
+            continue
+        as_of = claim.get("submitted_at") or datetime.max
+        candidates = [
+            d for d in items
+            if d["item_id"] != query["item_id"] and _opposite(query, d)
+            and (d.get("created_at") is None or d["created_at"] <= as_of)
+        ]
+        relevant = {d["item_id"] for d in candidates if d.get("user_id") == claim["user_id"]}
+        if not relevant:
+            skipped += 1
+            continue
+        queries.append((query, candidates, relevant))
+    return queries, skipped
+
+
+def grade(rankings, k: int, threshold: float) -> dict:
+    """Ranking metrics over [(ranked [(item_id, score)], relevant ids)]."""
+    precision, recall_k, reciprocal = [], [], []
+    relevant_total = relevant_passed = passed = 0
+    for ranked, relevant in rankings:
+        top = [item_id for item_id, _ in ranked[:k]]
+        hits = sum(item_id in relevant for item_id in top)
+        precision.append(hits / k)
+        recall_k.append(hits / len(relevant))
+        rank = next((i for i, (item_id, _) in enumerate(ranked, 1) if item_id in relevant), None)
+        reciprocal.append(1.0 / rank if rank else 0.0)
+
+        above = [item_id for item_id, score in ranked if score >= threshold]
+        passed += len(above)
+        relevant_passed += sum(item_id in relevant for item_id in above)
+        relevant_total += len(relevant)
+
+    def mean(values):
+        return float(np.mean(values)) if values else 0.0
+
+    return {
+        f"precision@{k}": mean(precision),
+        f"recall@{k}": mean(recall_k),
+        "mrr": mean(reciprocal),
+        # Auto-matching stores every pair above the threshold: how many true
+        # pairs it catches, and how many of the stored pairs are true
+        "recall_at_threshold": relevant_passed / relevant_total if relevant_total else 0.0,
+        "precision_at_threshold": relevant_passed / passed if passed else 0.0,
+        "matches_at_threshold": passed,
+    }
+
+
+def evaluate(scorer: Scorer, queries, k: int, threshold: float, measure_memory: bool = True) -> dict:
+    rankings, latencies = [], []
+    for query, candidates, relevant in queries:
+        started = time.perf_counter()
+        scores = scorer(query, candidates)
+        latencies.append(time.perf_counter() - started)
+        ranked = sorted(zip((c["item_id"] for c in candidates), map(float, scores)), key=lambda p: (-p[1], p[0]))
+        rankings.append((ranked, relevant))
+
+    peak = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            for query, candidates, _ in queries:
+                scorer(query, candidates)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "metrics": grade(rankings, k, threshold),
+        "latency_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else 0.0,
+            "p99": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else 0.0,
+            "mean": float(latencies_ms.mean()) if len(latencies_ms) else 0.0,
+        },
+        "peak_memory_bytes": peak,
+    }
+
+
+def _parse_params(pairs: List[str]) -> Dict[str, float]:
+    params = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"--set expects key=value, got {pair!r}")
+        params[key] = float(value)
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a match scorer against returned items in a dump.")
+    parser.add_argument("--dump", default=os.path.join("dump", "Lost_and_Found"), help="mongodump directory")
+    parser.add_argument("--scorer", default="weighted", help='"weighted" or module:attr')
+    parser.add_argument("--set", dest="params", action="append", default=[], metavar="KEY=VALUE",
+                        help="scorer parameter, e.g. type_weight=0.6 (repeatable)")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=AUTO_MATCH_THRESHOLD)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced-memory pass")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    params = _parse_params(args.params)
+    scorer = load_scorer(args.scorer, params)
+    items, claims = load_dump(args.dump)
+    queries, skipped = build_queries(items, claims)
+    logger.info(f"Loaded {len(items)} items and {len(claims)} returned claims from {args.dump}; "
+                f"{len(queries)} queries, {skipped} skipped")
+
+    report = {
+        "scorer": args.scorer,
+        "params": params,
+        "dump": args.dump,
+        "k": args.k,
+        "threshold": args.threshold,
+        "items": len(items),
+        "queries": len(queries),
+        "skipped": skipped,
+        "evaluated_at": datetime.now().isoformat(),
+        **evaluate(scorer, queries, args.k, args.threshold, not args.no_memory),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        logger.info(f"Report written to {args.out}")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
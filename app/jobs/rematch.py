@@ -0,0 +1,282 @@
+"""
+Re-score every unclaimed lost/found pair, e.g. after the matching rules change.
+
+    python -m app.jobs.rematch [--workers N] [--shard-size N] [--prune] [--resume]
+
+Only items of different post types are compared, and only within the same
+root category: a pair from unrelated categories cannot reach
+AUTO_MATCH_THRESHOLD on keywords and photos alone under the current weights
+(cross-block pairs are scored as well if it can, see cross_type_reachable).
+Each block is cut into shards of `--shard-size` rows in created_at order,
+and each shard is only paired with the other side's items posted within
+MATCH_WINDOW_DAYS of it. Shards are scored, with the recency decay, in a
+process pool; matches are written with bulk upserts as shards finish, and
+finished shards go to a checkpoint file so an interrupted run can continue
+with --resume.
+
+The online matcher notifies users about new matches; this job does not.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.models.match import MatchModel
+from app.repositories.image_repository import ImageRepo
+from app.repositories.item_repository import ItemRepo
+from app.repositories.match_repository import MatchRepo
+from app.utils.match_scoring import AUTO_MATCH_THRESHOLD, cross_type_reachable, days_between, score_shard
+from app.utils.taxonomy import item_type_code, type_key
+from app.utils.text import tokenize
+from app.utils.visual_features import stack_features
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """Ids of finished shards, rewritten atomically after every shard."""
+
+    def __init__(self, path: str, fingerprint: str, resume: bool):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.done = set()
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("fingerprint") == fingerprint:
+                self.done = set(data["done"])
+                logger.info(f"Resuming from {path}: {len(self.done)} shards already done")
+            else:
+                logger.warning(f"Catalog changed since {path} was written; starting over")
+
+    def mark(self, shard_id: str):
+        self.done.add(shard_id)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "done": sorted(self.done)}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def load_catalog(item_repo: ItemRepo, image_repo: ImageRepo):
+    items = await item_repo.list_match_candidates()
+    items.sort(key=lambda d: d["item_id"])
+    for doc in items:
+        if doc.get("type_code") is None:
+            doc["type_code"] = item_type_code(doc.get("type", ""), doc.get("desc", ""))
+        if doc.get("desc_tokens") is None:
+            doc["desc_tokens"] = tokenize(doc.get("desc", ""))
+    blobs = {}
+    for doc in await image_repo.get_features_since(None):
+        blobs.setdefault(doc["item_id"], []).append(bytes(doc["features"]))
+    features = stack_features([blobs.get(d["item_id"], []) for d in items])
+    return items, features
+
+
+def _posted_day(doc) -> float:
+    # Undated legacy items sort first and, like online, count as posted the same day as anything
+    created = doc.get("created_at")
+    return created.timestamp() / 86400.0 if created is not None else np.nan
+
+
+def catalog_fingerprint(items, features, shard_size: int, visual_weight: float) -> str:
+    """Hash of every scoring input, so --resume never reuses shards scored against other data."""
+    digest = hashlib.sha1(f"{shard_size}:{visual_weight}:{AUTO_MATCH_THRESHOLD}:"
+                          f"{settings.MATCH_WINDOW_DAYS}:{settings.MATCH_RECENCY_HALF_LIFE_DAYS}".encode())
+    for doc in items:
+        digest.update(f"{doc['item_id']}:{doc['post_type']}:{doc['type_code']}:{doc['type']}:"
+                      f"{doc.get('created_at')}:{' '.join(sorted(doc['desc_tokens']))}\n".encode())
+    digest.update(np.ascontiguousarray(features).tobytes())
+    return digest.hexdigest()
+
+
+def plan_shards(items, features, shard_size: int, visual_weight: float):
+    """Yield shard payloads for every post-type × category block, lazily."""
+    tokens = [set(d["desc_tokens"]) for d in items]
+    codes = np.array([d["type_code"] for d in items], dtype=np.intp)
+    days = np.array([_posted_day(d) for d in items], dtype=np.float64)
+    window, half_life = settings.MATCH_WINDOW_DAYS, settings.MATCH_RECENCY_HALF_LIFE_DAYS
+    groups = {}
+    for row, doc in enumerate(items):
+        block = repr(type_key(doc["type_code"], doc["type"]))  # ints and texts stay distinct
+        groups.setdefault((doc["post_type"].lower(), block), []).append(row)
+    for rows in groups.values():
+        # Oldest first (undated first), so a shard covers a contiguous stretch of time
+        rows.sort(key=lambda r: (not np.isnan(days[r]), np.nan_to_num(days[r]), items[r]["item_id"]))
+
+    post_types = sorted({pt for pt, _ in groups})
+    blocks = sorted({b for _, b in groups})
+    cross_block = cross_type_reachable(visual_weight)
+
+    for i, post_a in enumerate(post_types):
+        for post_b in post_types[i + 1:]:
+            for block_a in blocks:
+                for block_b in (blocks if cross_block else [block_a]):
+                    rows_a, rows_b = groups.get((post_a, block_a)), groups.get((post_b, block_b))
+                    if not rows_a or not rows_b:
+                        continue
+                    # Cut the larger side so a shard holds shard_size × smaller side scores
+                    if len(rows_a) < len(rows_b):
+                        rows_a, rows_b = rows_b, rows_a
+                    # Type credit comes from the taxonomy codes, except inside one
+                    # off-taxonomy block, where every item has the same type
+                    same_text = block_a == block_b and not codes[rows_a[0]]
+                    days_b = days[rows_b]
+                    undated_b = int(np.isnan(days_b).sum())
+                    for start in range(0, len(rows_a), shard_size):
+                        chunk = rows_a[start:start + shard_size]
+                        chunk_b = rows_b
+                        dated = days[chunk][~np.isnan(days[chunk])]
+                        if window and len(dated) == len(chunk):
+                            # Only the other side's items posted within the window of this stretch
+                            lo = undated_b + np.searchsorted(days_b[undated_b:], dated.min() - window, "left")
+                            hi = undated_b + np.searchsorted(days_b[undated_b:], dated.max() + window, "right")
+                            chunk_b = rows_b[:undated_b] + rows_b[lo:hi]
+                        if not chunk_b:
+                            continue
+                        yield {
+                            "shard_id": f"{post_a}|{post_b}|{block_a}|{block_b}|{start}",
+                            "ids_a": [items[r]["item_id"] for r in chunk],
+                            "ids_b": [items[r]["item_id"] for r in chunk_b],
+                            "tokens_a": [tokens[r] for r in chunk],
+                            "tokens_b": [tokens[r] for r in chunk_b],
+                            "features_a": features[chunk],
+                            "features_b": features[chunk_b],
+                            "codes_a": None if same_text else codes[chunk],
+                            "codes_b": None if same_text else codes[chunk_b],
+                            "days_a": days[chunk] if window or half_life else None,
+                            "days_b": days[chunk_b] if window or half_life else None,
+                            "half_life_days": half_life,
+                            "window_days": window,
+                            "visual_weight": visual_weight,
+                            "threshold": AUTO_MATCH_THRESHOLD,
+                        }
+
+
+async def rematch(workers: int, shard_size: int, checkpoint_path: str, resume: bool, prune: bool):
+    item_repo, image_repo, match_repo = ItemRepo(), ImageRepo(), MatchRepo()
+    visual_weight = settings.MATCH_VISUAL_WEIGHT
+
+    items, features = await load_catalog(item_repo, image_repo)
+    owners = {d["item_id"]: d["user_id"] for d in items}
+    duplicates = {frozenset((d["item_id"], other)) for d in items for other in d.get("duplicate_of") or []}
+    logger.info(f"Loaded {len(items)} unclaimed items")
+
+    # Existing pairs keep their orientation; pruning looks them up per item
+    existing = {frozenset(pair): pair for pair in await match_repo.get_all_pairs()}
+    existing_by_item = {}
+    for key in existing:
+        for item_id in key:
+            existing_by_item.setdefault(item_id, []).append(key)
+
+    checkpoint = Checkpoint(checkpoint_path, catalog_fingerprint(items, features, shard_size, visual_weight), resume)
+    shards = (s for s in plan_shards(items, features, shard_size, visual_weight)
+              if s["shard_id"] not in checkpoint.done)
+
+    async def write_results(shard, pairs):
+        now = datetime.now()
+        produced = {}
+        for item_id_a, item_id_b, score in pairs:
+            key = frozenset((item_id_a, item_id_b))
+            if key in duplicates:
+                continue
+            item_id_a, item_id_b = existing.get(key, (item_id_a, item_id_b))
+            produced[key] = MatchModel(item_id_a=item_id_a, item_id_b=item_id_b, score=score, matched_at=now)
+        await match_repo.bulk_upsert_matches(list(produced.values()), owners)
+
+        stale = []
+        if prune:
+            ids_b = set(shard["ids_b"])
+            for item_id in shard["ids_a"]:
+                for key in existing_by_item.get(item_id, []):
+                    other = next(iter(key - {item_id}), item_id)
+                    if other in ids_b and key not in produced:
+                        stale.append(existing[key])
+            await match_repo.bulk_delete_pairs(stale, owners)
+        return len(produced), len(stale)
+
+    loop = asyncio.get_running_loop()
+    upserted = pruned = finished = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+
+        def submit():
+            shard = next(shards, None)
+            if shard is not None:
+                in_flight[loop.run_in_executor(pool, score_shard, shard)] = shard
+            return shard is not None
+
+        # Keep a bounded number of shards in memory
+        while len(in_flight) < 2 * workers and submit():
+            pass
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                shard = in_flight.pop(future)
+                shard_id, pairs = future.result()
+                n_upserted, n_pruned = await write_results(shard, pairs)
+                checkpoint.mark(shard_id)
+                upserted += n_upserted
+                pruned += n_pruned
+                finished += 1
+                logger.info(f"Shard {shard_id}: {n_upserted} matches, {n_pruned} pruned ({finished} shards done)")
+                submit()
+
+    cross_block = cross_type_reachable(visual_weight)
+    if prune:
+        # Pairs that belong to no shard can never pass: two posts of the same
+        # type (stored by the online matcher before it filtered them),
+        # cross-block pairs under the current weights, and pairs posted
+        # further apart than the window
+        by_id = {d["item_id"]: d for d in items}
+        stale = []
+        for pair in existing.values():
+            a, b = by_id.get(pair[0]), by_id.get(pair[1])
+            if not a or not b:
+                continue
+            same_post_type = a["post_type"].lower() == b["post_type"].lower()
+            other_block = type_key(a["type_code"], a["type"]) != type_key(b["type_code"], b["type"])
+            outside = settings.MATCH_WINDOW_DAYS and \
+                days_between(a.get("created_at"), b.get("created_at")) > settings.MATCH_WINDOW_DAYS
+            if same_post_type or (other_block and not cross_block) or outside:
+                stale.append(pair)
+        await match_repo.bulk_delete_pairs(stale, owners)
+        pruned += len(stale)
+
+    checkpoint.clear()
+    logger.info(f"Re-match finished: {finished} shards, {upserted} matches upserted, {pruned} pruned")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score all lost/found pairs offline.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=500, help="rows of the larger side per shard")
+    parser.add_argument("--checkpoint", default="rematch.checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="skip shards finished by an interrupted run")
+    parser.add_argument("--prune", action="store_true", help="delete stored matches that no longer pass")
+    args = parser.parse_args()
+
+    async def run():
+        await connect_to_mongo()
+        try:
+            await rematch(args.workers, args.shard_size, args.checkpoint, args.resume, args.prune)
+        finally:
+            await close_mongo_connection()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,37 @@
+"""
+Write new memory-mapped snapshots of the match indexes.
+
+    python -m app.jobs.snapshot
+
+Workers attach to the newest snapshots at startup: the image vector index
+only replays images added after its watermark, and the term index only
+replays the change log after the seq it covers, instead of loading every
+item. Run this periodically (e.g. nightly) so the replayed tails stay small.
+"""
+import asyncio
+import logging
+
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.repositories.change_repository import ChangeRepo
+from app.repositories.image_repository import ImageRepo
+from app.repositories.item_repository import ItemRepo
+from app.services import image_search_service, term_index
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        snapshot = await image_search_service.build_snapshot(ImageRepo())
+        logger.info(f"Snapshot v{snapshot.version}: {snapshot.meta['rows']} images, watermark {snapshot.meta['watermark']}")
+        change_repo = ChangeRepo()
+        snapshot = await term_index.build_snapshot(ItemRepo(change_repo), change_repo)
+        logger.info(f"Term index snapshot v{snapshot.version}: {snapshot.meta['rows']} items, seq {snapshot.meta['seq']}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
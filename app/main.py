@@ -1,14 +1,21 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 import os
 
 from app.api.router import api_router
+from app.api.dependencies import init_container, close_container
 from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.logs import RequestIdMiddleware, setup_logging, shutdown_logging
+from app.core.loop_monitor import start_loop_monitor, stop_loop_monitor
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.query_monitor import QueryStatsMiddleware
+from app.core.tracing import TracingMiddleware, flush_traces
+from app.services import image_search_service, term_index
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# JSON logs, written off the event loop
+setup_logging()
 logger = logging.getLogger(__name__)
 port = int(os.environ.get("PORT", 8000))
 
@@ -16,27 +23,33 @@ port = int(os.environ.get("PORT", 8000))
 async def lifespan(app: FastAPI):
    
     #Startup
-    print("=" * 50)
-    print("Database initialization starting...")
+    logger.info("Database initialization starting...")
     try:
         await connect_to_mongo()
-        print("Database and MongoDB connected successfully.")
+        init_container()
+        logger.info("Database and MongoDB connected successfully.")
     except Exception as e:
-        print(f"Database connection failed: {e}")
+        logger.error(f"Database connection failed: {e}")
         raise
-    print("=" * 50)
+    if image_search_service.attach_snapshot():
+        logger.info("Match index snapshot attached.")
+    if term_index.attach_snapshot():
+        logger.info("Term index snapshot attached.")
+    start_loop_monitor()
     
     yield  
     
     #Shutdown
-    print("=" * 50)
-    print("Application shutdown starting...")
+    logger.info("Application shutdown starting...")
+    await stop_loop_monitor()
+    await flush_traces()
+    close_container()
     try:
         await close_mongo_connection()
-        print("Application shutdown complete.")
+        logger.info("Application shutdown complete.")
     except Exception as e:
-        print(f"Error during shutdown: {e}")
-    print("=" * 50)
+        logger.error(f"Error during shutdown: {e}")
+    shutdown_logging()
 
 
 def create_app() -> FastAPI:
@@ -57,7 +70,13 @@ def create_app() -> FastAPI:
         ],  
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "Last-Modified", "Server-Timing", "X-Request-ID", "X-Trace-Id"],
     )
+    # MongoDB commands per request, reported in Server-Timing and /debug/queries
+    app.add_middleware(QueryStatsMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(RequestIdMiddleware)
     
     # Include routers
     app.include_router(api_router)
@@ -70,6 +89,12 @@ def create_app() -> FastAPI:
             "service": "Lost and Found API"
         }
     
+    # Prometheus scrape endpoint, aggregated across workers in multiprocess mode
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+    
     return app
 
 
@@ -8,6 +8,8 @@ class ImageModel(BaseModel):
     item_id: str                               
     url: str                                   
     date_uploaded: datetime
+    phash: Optional[str] = None  # 64-bit dHash, hex
+    features: Optional[bytes] = None  # packed float32 visual descriptor
     
     def to_dict(self) -> Dict[str, Any]:
         return self.model_dump(by_alias=True, exclude_none=True)
@@ -16,12 +18,16 @@ class Image(BaseModel):
     item_id: str  # item id for the image
     url: str
     date_uploaded: datetime
+    phash: Optional[str] = None
+    features: Optional[bytes] = Field(None, exclude=True)  # stored on the image document only
     
     def to_model(self) -> ImageModel:
         return ImageModel(
             item_id=self.item_id,
             url=self.url,  
-            date_uploaded=self.date_uploaded
+            date_uploaded=self.date_uploaded,
+            phash=self.phash,
+            features=self.features
         )
 
     @classmethod
@@ -29,5 +35,7 @@ class Image(BaseModel):
         return cls(
             item_id=image_model.item_id,
             url=image_model.url,  # Use url as path
-            date_uploaded=image_model.date_uploaded
+            date_uploaded=image_model.date_uploaded,
+            phash=image_model.phash,
+            features=image_model.features
         )
\ No newline at end of file
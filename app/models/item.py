@@ -1,8 +1,9 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 from typing import List
 from .  image import Image
 from typing import Optional, Dict, Any
 from datetime import datetime
+from app.utils.text import tokenize
 
 class ItemModel(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
@@ -11,12 +12,24 @@ class ItemModel(BaseModel):
     item_id: str
     user_id: str                              
     desc: str
+    desc_tokens: Optional[List[str]] = None  # tokenize(desc), written by the repository
     post_type: str
     images: List[Image] = Field(default_factory=list)
     type: str
+    type_code: Optional[int] = None  # taxonomy category, 0 = not in the taxonomy, set by ItemService
     is_claimed: bool = False
     created_at: datetime
+    version: int = 0  # 0 = written before versioning existed
+    updated_at: Optional[datetime] = None
+    duplicate_of: List[str] = Field(default_factory=list)  # item ids with near-identical photos
     
+    @model_validator(mode="after")
+    def _fill_derived_fields(self):
+        # Documents written before this field existed (until the backfill reaches them)
+        if self.desc_tokens is None:
+            self.desc_tokens = tokenize(self.desc)
+        return self
+
     def to_dict(self) -> Dict[str, Any]:
         return self.model_dump(by_alias=True, exclude_none=True)
     
@@ -26,7 +39,8 @@ class ItemCreation(BaseModel):
     post_type: str
     img: List[Image] = []
     type: str #type like bottle, pen etc
-    def to_model(self, item_id: str, image_metadata: List[Image], created_at: datetime) -> ItemModel:
+    def to_model(self, item_id: str, image_metadata: List[Image], created_at: datetime,
+                 type_code: Optional[int] = None) -> ItemModel:
         return ItemModel(
             item_id=item_id,
             user_id=self.user_id,
@@ -34,18 +48,24 @@ class ItemCreation(BaseModel):
             post_type= self.post_type,
             images=image_metadata,
             type=self.type,
-            created_at=created_at
+            type_code=type_code,
+            created_at=created_at,
+            version=1
         )
     
 class ItemResponse(BaseModel):
     user_id: str
     item_id:str
     desc: str
+    desc_tokens: List[str] = Field(default_factory=list, exclude=True)  # for matching, not the API
     post_type: str
     img: List[Image] = []
     is_claimed: bool= False
     type: str
+    type_code: int = 0
     created_at: Optional[datetime] = None
+    version: int = 0
+    duplicate_of: List[str] = []
     status: Optional[int]
     mssg:Optional[str]
     @classmethod
@@ -54,11 +74,15 @@ class ItemResponse(BaseModel):
             item_id=item_model.item_id,
             user_id=item_model.user_id,
             desc=item_model.desc,
+            desc_tokens=item_model.desc_tokens or [],
             post_type= item_model.post_type,
             img=item_model.images,  
             type=item_model.type,
+            type_code=item_model.type_code or 0,
             is_claimed=item_model.is_claimed,
             created_at=item_model.created_at,
+            version=item_model.version,
+            duplicate_of=item_model.duplicate_of,
             status=200,
             mssg="Success"
         )
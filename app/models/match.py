@@ -19,6 +19,8 @@ class MatchSearchRequest(BaseModel):
     keywords: List[str] #from desc
     location: str 
     post_type: str
+    k: int = Field(20, ge=1, le=100)  # page size
+    cursor: Optional[str] = None  # next_cursor of the previous page
 
 class MatchResponse(BaseModel):
     matched_item: ItemResponse
@@ -28,4 +30,5 @@ class MatchResponse(BaseModel):
     
 class MatchList(BaseModel):
     matches: List[MatchResponse] = []
-    count: int
\ No newline at end of file
+    count: int
+    next_cursor: Optional[str] = None  # None on the last page
\ No newline at end of file
@@ -11,4 +11,11 @@ class SearchRequest(BaseModel):
     date_from: Optional[datetime] = None
     is_claimed: Optional[bool] = False
     limit: int = 20
-    offset: int = 0
\ No newline at end of file
+    offset: int = 0
+
+class CategoryFacet(BaseModel):
+    code: int  # 0 = types outside the taxonomy
+    name: Optional[str] = None
+    parent: Optional[int] = None
+    count: int  # items filed directly under this category
+    total: int  # including every subcategory
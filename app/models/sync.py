@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any
+from app.models.item import ItemResponse
+from app.models.claim import ClaimResponse
+from app.models.message import MessageResponse, ConversationResponse
+
+
+class SyncResponse(BaseModel):
+    cursor: int  # pass back as ?since= on the next call
+    reset: bool = False  # cursor fell behind the compacted log; refetch the full lists
+    has_more: bool = False
+    items: List[ItemResponse] = []
+    claims: List[ClaimResponse] = []
+    matches: List[Dict[str, Any]] = []
+    messages: List[MessageResponse] = []
+    conversations: List[ConversationResponse] = []
+    deleted: Dict[str, List[str]] = Field(default_factory=dict)  # entity -> ids
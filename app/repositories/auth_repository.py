@@ -1,23 +1,22 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.database import get_db
+from app.core.tracing import traced_class
 from app.models.auth import AuthSessionModel
 
 
 
 
+@traced_class()
 class AuthRepo:
-    
+    def __init__(self, db: AsyncIOMotorDatabase = None):
+        self.sessions = (db if db is not None else get_db())["sessions"]
+
     async def create_session(self, session: AuthSessionModel):
-        db=get_db()
-        collection = db["sessions"]
-        result = await collection.insert_one(session.to_dict())
+        result = await self.sessions.insert_one(session.to_dict())
         return str(result.inserted_id)
 
     async def get_session_by_user(self,user_id: str):
-        db=get_db()
-        collection = db["sessions"]
-        return await collection.find_one({"user_id": user_id})
+        return await self.sessions.find_one({"user_id": user_id})
 
     async def delete_session(self,token: str):
-        db=get_db()
-        collection = db["sessions"]
-        return await collection.delete_one({"token": token})
+        return await self.sessions.delete_one({"token": token})
@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pymongo import ASCENDING, ReturnDocument
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.tracing import traced_class
+
+# Audience marker for changes every user may see (items are public)
+PUBLIC = "*"
+
+# This worker's committed watermark per change log (collection full name); it only moves forward
+_watermarks: Dict[str, int] = {}
+
+
+@traced_class()
+class ChangeRepo:
+    """
+    Append-only change log used by the delta sync API.
+    Every repository mutation records one entry with a monotonically
+    increasing sequence number; old entries are dropped by a TTL index.
+
+    A seq is reserved on the counter before its entry is inserted, so under
+    concurrent writes seq N+1 can be visible while N is still being written.
+    Readers therefore only go as far as get_committed_seq, the end of the
+    run of entries without holes.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase = None):
+        db = db if db is not None else get_db()
+        self.changes = db["changes"]
+        self.counters = db["counters"]
+        # Read only, to resolve audiences
+        self.items = db["items"]
+        self.claims = db["claims"]
+
+    async def _next_seq(self, count: int = 1) -> int:
+        # Reserves `count` consecutive numbers and returns the last one
+        counter = await self.counters.find_one_and_update(
+            {"_id": "changes"},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+    async def record(self, entity: str, entity_id: str, op: str, audience: List[str]):
+        audience = sorted({a for a in audience if a})
+        if not audience:
+            return None
+        seq = await self._next_seq()
+        await self.changes.insert_one({
+            "seq": seq,
+            "entity": entity,
+            "entity_id": entity_id,
+            "op": op,
+            "audience": audience,
+            "changed_at": datetime.utcnow()
+        })
+        return seq
+
+    async def record_many(self, entity: str, entries: List[tuple]):
+        """Record (entity_id, op, audience) entries with one counter bump and one insert."""
+        entries = [(entity_id, op, sorted({a for a in audience if a})) for entity_id, op, audience in entries]
+        entries = [e for e in entries if e[2]]
+        if not entries:
+            return None
+        last = await self._next_seq(len(entries))
+        now = datetime.utcnow()
+        await self.changes.insert_many([
+            {
+                "seq": last - len(entries) + 1 + i,
+                "entity": entity,
+                "entity_id": entity_id,
+                "op": op,
+                "audience": audience,
+                "changed_at": now
+            }
+            for i, (entity_id, op, audience) in enumerate(entries)
+        ])
+        return last
+
+    async def get_committed_seq(self, since: int, scan: int = None) -> int:
+        """
+        Highest seq S such that every entry in (since, S] is readable, looking
+        at up to `scan` entries. A hole older than SYNC_GAP_GRACE_SECONDS is
+        skipped: a live writer inserts within milliseconds of reserving.
+        """
+        stale = datetime.utcnow() - timedelta(seconds=settings.SYNC_GAP_GRACE_SECONDS)
+        scan = scan or settings.SYNC_SCAN_LIMIT
+        committed = since
+        cursor = self.changes.find(
+            {"seq": {"$gt": since}}, {"_id": 0, "seq": 1, "changed_at": 1}
+        ).sort("seq", ASCENDING).limit(scan)
+        async for entry in cursor:
+            # The missing seqs were reserved before this entry's, so no later than its changed_at
+            if entry["seq"] != committed + 1 and entry["changed_at"] > stale:
+                break
+            committed = entry["seq"]
+        return committed
+
+    async def get_watermark(self, head: Optional[int] = None) -> int:
+        """
+        get_committed_seq continued from where this worker last left it, so
+        each poll only scans the entries written since rather than re-checking
+        from the caller's cursor. Pass the head seq if already known; nothing
+        is read once the watermark has reached it.
+        """
+        key = self.changes.full_name
+        mark = _watermarks.get(key)
+        if mark is None:
+            # Everything before the oldest entry left is compacted away
+            oldest = await self.get_oldest_seq()
+            mark = oldest - 1 if oldest is not None else await self.get_head_seq()
+        if head is None or mark < head:
+            mark = await self.get_committed_seq(mark)
+        _watermarks[key] = max(_watermarks.get(key, mark), mark)
+        return _watermarks[key]
+
+    async def get_changes_since(self, user_id: str, since: int, limit: int = 500, entity: Optional[str] = None,
+                                until: Optional[int] = None):
+        seq = {"$gt": since}
+        if until is not None:
+            seq["$lte"] = until
+        query = {"seq": seq, "audience": {"$in": [user_id, PUBLIC]}}
+        if entity:
+            query["entity"] = entity
+        return await self.changes.find(query, {"_id": 0}).sort("seq", ASCENDING).limit(limit).to_list(length=limit)
+
+    async def get_head_seq(self) -> int:
+        counter = await self.counters.find_one({"_id": "changes"})
+        return counter["seq"] if counter else 0
+
+    async def get_oldest_seq(self) -> Optional[int]:
+        oldest = await self.changes.find_one({}, {"_id": 0, "seq": 1}, sort=[("seq", ASCENDING)])
+        return oldest["seq"] if oldest else None
+
+    # Audience helpers: resolve which users a change is relevant to
+
+    async def item_owner_map(self, item_ids: List[str]) -> Dict[str, str]:
+        """item_id -> owner for a whole batch in one query."""
+        item_ids = list(set(item_ids))
+        docs = await self.items.find(
+            {"item_id": {"$in": item_ids}},
+            {"_id": 0, "item_id": 1, "user_id": 1}
+        ).to_list(length=len(item_ids))
+        return {d["item_id"]: d["user_id"] for d in docs if d.get("user_id")}
+
+    async def item_owners(self, item_ids: List[str]) -> List[str]:
+        return list((await self.item_owner_map(item_ids)).values())
+
+    async def claim_audience(self, claim_id: str) -> List[str]:
+        # Claimant and item owner in one round trip
+        docs = await self.claims.aggregate([
+            {"$match": {"claim_id": claim_id}},
+            {"$limit": 1},
+            {"$lookup": {"from": "items", "localField": "item_id", "foreignField": "item_id", "as": "item"}},
+            {"$project": {"_id": 0, "user_id": 1, "owners": "$item.user_id"}},
+        ]).to_list(length=1)
+        if not docs:
+            return []
+        return [docs[0].get("user_id")] + list(docs[0].get("owners") or [])
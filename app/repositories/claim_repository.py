@@ -1,44 +1,58 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.database import get_db
+from app.core.tracing import traced_class
 from app.models.claim import ClaimModel
+from app.repositories.change_repository import ChangeRepo
 
 
 
+@traced_class()
 class ClaimRepo:
-    
+    def __init__(self, change_repo: ChangeRepo = None, db: AsyncIOMotorDatabase = None):
+        db = db if db is not None else get_db()
+        self.claims = db["claims"]
+        self.change_repository = change_repo or ChangeRepo(db)
+
+    async def _record_change(self, claim_id: str, op: str, audience=None):
+        if audience is None:
+            audience = await self.change_repository.claim_audience(claim_id)
+        await self.change_repository.record("claim", claim_id, op, audience)
+
     async def create_claim(self,claim: ClaimModel):
-        db=get_db()
-        collection = db["claims"]   
-        result = await collection.insert_one(claim.to_dict())
+        result = await self.claims.insert_one(claim.to_dict())
+        await self._record_change(claim.claim_id, "upsert")
         return str(result.inserted_id)
 
     async def get_claim_by_id(self,claim_id: str):
-        db=get_db()
-        collection = db["claims"]
-        return await collection.find_one({"claim_id": claim_id})
+        return await self.claims.find_one({"claim_id": claim_id})
 
     async def get_claims_for_item(self,item_id: str, limit: int = 20):
-        db=get_db()
-        collection = db["claims"]
-        return await collection.find({"item_id": item_id}).to_list(length=limit)
+        return await self.claims.find({"item_id": item_id}).to_list(length=limit)
 
     async def update_claim_status(self,claim_id: str, status: str):
-        db=get_db()
-        collection = db["claims"]
-        return await collection.update_one({"claim_id": claim_id}, {"$set": {"status": status}})
+        result = await self.claims.update_one({"claim_id": claim_id}, {"$set": {"status": status}})
+        if result.matched_count:
+            await self._record_change(claim_id, "upsert")
+        return result
 
     async def delete_claim(self,claim_id: str):
-        db=get_db()
-        collection = db["claims"]
-        return await collection.delete_one({"claim_id": claim_id})
-    
+        # Resolve the audience before the claim document is gone
+        audience = await self.change_repository.claim_audience(claim_id)
+        result = await self.claims.delete_one({"claim_id": claim_id})
+        if result.deleted_count:
+            await self._record_change(claim_id, "delete", audience)
+        return result
+
     async def update_claim_fields(self,claim_id: str, update_data: dict):
-        db=get_db()
-        collection = db["claims"]
-        return await collection.update_one(
-        {"claim_id": claim_id},
-        {"$set": update_data}
-    )
+        result = await self.claims.update_one(
+            {"claim_id": claim_id},
+            {"$set": update_data}
+        )
+        if result.matched_count:
+            await self._record_change(claim_id, "upsert")
+        return result
     async def get_claims_by_user(self, user_id: str, limit: int = 50):
-        db=get_db()
-        collection = db["claims"]
-        return await collection.find({"user_id": user_id}).to_list(length=limit)
\ No newline at end of file
+        return await self.claims.find({"user_id": user_id}).to_list(length=limit)
+
+    async def get_claims_by_ids(self, claim_ids: list):
+        return await self.claims.find({"claim_id": {"$in": list(claim_ids)}}).to_list(length=len(claim_ids))
@@ -1,20 +1,22 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.database import get_db
+from app.core.tracing import traced_class
 from app.models.image import ImageModel
 
 
 
+@traced_class()
 class ImageRepo:
+    def __init__(self, db: AsyncIOMotorDatabase = None):
+        self.images = (db if db is not None else get_db())["images"]
+
     async def add_image(self,image: ImageModel):
-        db=get_db()
-        collection = db["images"]
-        result = await collection.insert_one(image.to_dict())
+        result = await self.images.insert_one(image.to_dict())
         return str(result.inserted_id)
 
     async def get_images_by_item(self,item_id: str, limit: int = 20):
-        db = get_db()
-        collection = db["images"]
     
-        images = await collection.find({"item_id": item_id}).to_list(length=limit)
+        images = await self.images.find({"item_id": item_id}).to_list(length=limit)
     
     # Convert MongoDB documents to Image DTOs
         image_list = []
@@ -30,7 +32,39 @@ class ImageRepo:
     
         return image_list
 
+    async def get_images_for_items(self, item_ids: list) -> dict:
+        # One query for a whole page of items instead of one per item
+        images_by_item = {item_id: [] for item_id in item_ids}
+        async for img in self.images.find({"item_id": {"$in": list(item_ids)}}):
+            images_by_item.setdefault(img["item_id"], []).append({
+                "item_id": img["item_id"],
+                "url": img.get("url") or img.get("path"),
+                "date_uploaded": img["date_uploaded"]
+            })
+        return images_by_item
+
+    async def get_features_for_items(self, item_ids: list) -> dict:
+        # item_id -> list of packed float32 descriptors
+        features = {item_id: [] for item_id in item_ids}
+        cursor = self.images.find(
+            {"item_id": {"$in": list(item_ids)}, "features": {"$exists": True}},
+            {"_id": 0, "item_id": 1, "features": 1}
+        )
+        async for img in cursor:
+            features.setdefault(img["item_id"], []).append(bytes(img["features"]))
+        return features
+
+    async def get_features_since(self, since_id=None):
+        query = {"features": {"$exists": True}}
+        if since_id is not None:
+            query["_id"] = {"$gte": since_id}
+        return await self.images.find(query, {"item_id": 1, "features": 1}).to_list(length=None)
+
+    async def get_phashes_since(self, since_id=None):
+        query = {"phash": {"$exists": True}}
+        if since_id is not None:
+            query["_id"] = {"$gte": since_id}
+        return await self.images.find(query, {"item_id": 1, "phash": 1}).to_list(length=None)
+
     async def delete_image(self,path: str):
-        db=get_db()
-        collection = db["images"]
-        return await collection.delete_one({"path": path})
+        return await self.images.delete_one({"path": path})
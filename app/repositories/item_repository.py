@@ -1,42 +1,129 @@
-from app.core.database import get_db
+from datetime import datetime
+from pymongo import ASCENDING, UpdateOne
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.database import ITEM_VERSION_LIST_INDEX, get_db
+from app.core.tracing import traced_class
 from app.models.item import ItemModel
+from app.repositories.change_repository import ChangeRepo, PUBLIC
+from app.utils.text import TOKENIZER_VERSION, tokenize
 
+# Fields that are maintained by the repository itself on every write
+_VERSION_FIELDS = ("version", "updated_at")
+# Only indexed fields, so the list check is covered by ITEM_VERSION_LIST_INDEX
+_VERSION_PROJECTION = {"_id": 0, "item_id": 1, "version": 1, "updated_at": 1}
+_MATCH_PROJECTION = {"_id": 0, "item_id": 1, "user_id": 1, "type": 1, "type_code": 1, "post_type": 1, "desc": 1,
+                     "desc_tokens": 1, "duplicate_of": 1, "created_at": 1}
 
 
+def _token_fields(desc: str) -> dict:
+    return {"desc_tokens": tokenize(desc), "tokens_version": TOKENIZER_VERSION}
+
+
+
+@traced_class()
 class ItemRepo:
+    def __init__(self, change_repo: ChangeRepo = None, db: AsyncIOMotorDatabase = None):
+        db = db if db is not None else get_db()
+        self.items = db["items"]
+        self.change_repository = change_repo or ChangeRepo(db)
+
     async def create_item(self,item: ItemModel):
-        db=get_db()
-        collection = db["items"]
-        result = await collection.insert_one(item.to_dict())
+        # updated_at from the start, so version checks need no created_at fallback
+        doc = {"updated_at": item.created_at, **item.to_dict(), **_token_fields(item.desc)}
+        result = await self.items.insert_one(doc)
+        await self.change_repository.record("item", item.item_id, "upsert", [PUBLIC])
         return str(result.inserted_id)
 
     async def get_item_by_id(self,item_id: str):
-        db=get_db()
-        collection = db["items"]
-        return await collection.find_one({"item_id": item_id})
+        return await self.items.find_one({"item_id": item_id})
+
+    async def get_items_by_ids(self, item_ids: list):
+        return await self.items.find({"item_id": {"$in": list(item_ids)}}).to_list(length=len(item_ids))
+
+    async def get_item_states(self, item_ids: list):
+        # Existence and claim state only, for checks that do not need the documents
+        return await self.items.find({"item_id": {"$in": list(item_ids)}}, {"_id": 0, "item_id": 1, "is_claimed": 1}) \
+            .to_list(length=len(item_ids))
 
     async def list_items(self,limit: int = 100, offset: int = 0):
-        db=get_db()
-        collection = db["items"]
-        return await collection.find().skip(offset).limit(limit).to_list(length=limit)
+        # Oldest first: a stable order, so the version check sees the same page
+        return await self.items.find().sort("_id", ASCENDING).skip(offset).limit(limit).to_list(length=limit)
+
+    async def get_item_version(self, item_id: str):
+        # Covered by the (item_id, version, updated_at) index
+        return await self.items.find_one(
+            {"item_id": item_id},
+            {"_id": 0, "version": 1, "updated_at": 1}
+        )
+
+    async def list_item_versions(self, limit: int = 100, offset: int = 0):
+        # Same page as list_items, read from the index alone
+        return await self.items.find({}, _VERSION_PROJECTION).sort("_id", ASCENDING) \
+            .hint(ITEM_VERSION_LIST_INDEX).skip(offset).limit(limit).to_list(length=limit)
+
+    async def list_match_candidates(self):
+        # Every unclaimed item, with only the fields the matcher scores on
+        return await self.items.find({"is_claimed": {"$ne": True}}, _MATCH_PROJECTION).to_list(length=None)
+
+    async def list_claimed_candidates(self, since: datetime = None):
+        # Claimed items are not in the term index; the same fields, posted since `since`
+        query = {"is_claimed": True}
+        if since is not None:
+            query["created_at"] = {"$gte": since}
+        return await self.items.find(query, _MATCH_PROJECTION).to_list(length=None)
+
+    async def count_by_type_code(self, include_claimed: bool = False) -> dict:
+        pipeline = [] if include_claimed else [{"$match": {"is_claimed": {"$ne": True}}}]
+        pipeline.append({"$group": {"_id": {"$ifNull": ["$type_code", 0]}, "count": {"$sum": 1}}})
+        return {doc["_id"]: doc["count"] async for doc in self.items.aggregate(pipeline)}
+
+    async def get_items_needing_tokens(self, after_id=None, limit: int = 500):
+        # Documents tokenized by an older tokenizer (or never), in _id order so a backfill can resume
+        query = {"tokens_version": {"$ne": TOKENIZER_VERSION}}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        return await self.items.find(
+            query, {"_id": 1, "desc": 1, "type": 1, "type_code": 1}
+        ).sort("_id", ASCENDING).limit(limit).to_list(length=limit)
+
+    async def set_derived_fields(self, updates: list):
+        """
+        Bulk-write (_id, fields) pairs of derived fields. These never change what
+        the API returns, so neither the version nor the change log is touched.
+        """
+        if not updates:
+            return None
+        return await self.items.bulk_write(
+            [UpdateOne({"_id": _id}, {"$set": fields}) for _id, fields in updates], ordered=False
+        )
 
     async def update_claim_status(self,item_id: str, is_claimed: bool):
-        db=get_db()
-        collection = db["items"]
-        return await collection.update_one(
+        result = await self.items.update_one(
             {"item_id": item_id},
-            {"$set": {"is_claimed": is_claimed}}
+            {
+                "$set": {"is_claimed": is_claimed, "updated_at": datetime.utcnow()},
+                "$inc": {"version": 1}
+            }
         )
+        if result.matched_count:
+            await self.change_repository.record("item", item_id, "upsert", [PUBLIC])
+        return result
     async def update_fields(self,item_id: str, update_data: dict):
-        db=get_db()
-        collection = db["items"]
-
-        return await collection.update_one(
-        {"item_id": item_id},
-        {"$set": update_data}
-    )
-    
+        update_data = {k: v for k, v in update_data.items() if k not in _VERSION_FIELDS}
+        update_data["updated_at"] = datetime.utcnow()
+        if "desc" in update_data:
+            update_data.update(_token_fields(update_data["desc"]))
+
+        result = await self.items.update_one(
+            {"item_id": item_id},
+            {"$set": update_data, "$inc": {"version": 1}}
+        )
+        if result.matched_count:
+            await self.change_repository.record("item", item_id, "upsert", [PUBLIC])
+        return result
+
     async def delete_item(self,item_id: str):
-        db=get_db()
-        collection = db["items"]
-        return await collection.delete_one({"item_id": item_id})
+        result = await self.items.delete_one({"item_id": item_id})
+        if result.deleted_count:
+            await self.change_repository.record("item", item_id, "delete", [PUBLIC])
+        return result
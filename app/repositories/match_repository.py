@@ -1,43 +1,120 @@
+from typing import Dict, List, Tuple
+from pymongo import DeleteOne, UpdateOne
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.database import get_db
+from app.core.tracing import traced_class
 from app.models.match import MatchModel
+from app.repositories.change_repository import ChangeRepo
 
 
+def match_key(item_id_a: str, item_id_b: str) -> str:
+    # Matches have no id of their own; the item pair identifies them
+    return f"{item_id_a}:{item_id_b}"
+
+
+@traced_class()
 class MatchRepo:
+    def __init__(self, change_repo: ChangeRepo = None, db: AsyncIOMotorDatabase = None):
+        db = db if db is not None else get_db()
+        self.matches = db["matches"]
+        self.change_repository = change_repo or ChangeRepo(db)
+
+    async def _record_changes(self, pairs, op: str):
+        # One owner lookup and one seq reservation for all the pairs
+        pairs = list(pairs)
+        if not pairs:
+            return
+        owners = await self.change_repository.item_owner_map([item_id for pair in pairs for item_id in pair])
+        await self.change_repository.record_many("match", [
+            (match_key(a, b), op, [owners.get(a), owners.get(b)]) for a, b in pairs
+        ])
+
+    async def _pairs_for_item(self, item_id: str):
+        docs = await self.matches.find(
+            {"$or": [{"item_id_a": item_id}, {"item_id_b": item_id}]},
+            {"_id": 0, "item_id_a": 1, "item_id_b": 1}
+        ).to_list(length=None)
+        return [(d["item_id_a"], d["item_id_b"]) for d in docs]
+
     async def add_match(self,match: MatchModel):
-        db=get_db()
-        collection = db["matches"]
-        result = await collection.insert_one(match.to_dict())
+        result = await self.matches.insert_one(match.to_dict())
+        await self._record_changes([(match.item_id_a, match.item_id_b)], "upsert")
         return str(result.inserted_id)
 
+    async def get_all_pairs(self) -> List[Tuple[str, str]]:
+        docs = await self.matches.find({}, {"_id": 0, "item_id_a": 1, "item_id_b": 1}).to_list(length=None)
+        return [(d["item_id_a"], d["item_id_b"]) for d in docs]
+
+    async def bulk_upsert_matches(self, matches: List[MatchModel], owners: Dict[str, str]):
+        """
+        Upsert many matches in one unordered bulk write. The first match time of
+        an existing pair is kept; only its score is refreshed. `owners` maps
+        item ids to user ids for the change log.
+        """
+        if not matches:
+            return None
+        result = await self.matches.bulk_write([
+            UpdateOne(
+                {"item_id_a": m.item_id_a, "item_id_b": m.item_id_b},
+                {"$set": {"score": m.score}, "$setOnInsert": {"matched_at": m.matched_at}},
+                upsert=True
+            )
+            for m in matches
+        ], ordered=False)
+        await self.change_repository.record_many("match", [
+            (match_key(m.item_id_a, m.item_id_b), "upsert", [owners.get(m.item_id_a), owners.get(m.item_id_b)])
+            for m in matches
+        ])
+        return result
+
+    async def bulk_delete_pairs(self, pairs: List[Tuple[str, str]], owners: Dict[str, str]):
+        if not pairs:
+            return None
+        result = await self.matches.bulk_write([
+            DeleteOne({"item_id_a": a, "item_id_b": b}) for a, b in pairs
+        ], ordered=False)
+        await self.change_repository.record_many("match", [
+            (match_key(a, b), "delete", [owners.get(a), owners.get(b)]) for a, b in pairs
+        ])
+        return result
+
     async def get_all_matches(self,limit: int = 100, offset: int = 0):
-        db=get_db()
-        collection = db["matches"]
-        return await collection.find().skip(offset).limit(limit).to_list(length=limit)
+        return await self.matches.find().skip(offset).limit(limit).to_list(length=limit)
 
     async def get_match_by_item(self, item_id: str):
-        db = get_db()
-        collection = db["matches"]
-        return await collection.find_one({
+        return await self.matches.find_one({
             "$or": [
                 {"item_id_a": item_id},
                 {"item_id_b": item_id}
             ]
         })
 
+    async def get_matches_for_item(self, item_id: str):
+        return await self.matches.find(
+            {"$or": [{"item_id_a": item_id}, {"item_id_b": item_id}]},
+            {"_id": 0}
+        ).to_list(length=None)
+
+    async def get_matches_by_pairs(self, pairs):
+        if not pairs:
+            return []
+        return await self.matches.find({
+            "$or": [{"item_id_a": a, "item_id_b": b} for a, b in pairs]
+        }).to_list(length=len(pairs))
+
     async def delete_match(self, item_id: str):
-        db = get_db()
-        collection = db["matches"]
-        return await collection.delete_many({
+        pairs = await self._pairs_for_item(item_id)
+        result = await self.matches.delete_many({
             "$or": [
                 {"item_id_a": item_id},
                 {"item_id_b": item_id}
             ]
         })
-    
+        await self._record_changes(pairs, "delete")
+        return result
+
     async def update_match_fields(self, item_id: str, update_data: dict):
-        db = get_db()
-        collection = db["matches"]
-        return await collection.update_many(
+        result = await self.matches.update_many(
             {
                 "$or": [
                     {"item_id_a": item_id},
@@ -46,3 +123,6 @@ class MatchRepo:
             },
             {"$set": update_data}
         )
+        if result.matched_count:
+            await self._record_changes(await self._pairs_for_item(item_id), "upsert")
+        return result
@@ -1,42 +1,64 @@
 """Message Repository - Data Access Layer (ASYNC with Motor)"""
+from datetime import datetime
 from typing import Optional, List
-from pymongo import DESCENDING, ASCENDING
+from pymongo import DESCENDING, ASCENDING, ReturnDocument
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
 from app.schemas.message import Message, Conversation
 from app.core.database import get_db
+from app.core.tracing import traced_class
+from app.repositories.change_repository import ChangeRepo
 
 logger = logging.getLogger(__name__)
 
+@traced_class()
 class MessageRepository:
     """Repository for message and conversation database operations (ASYNC)"""
     
-    def __init__(self, db: AsyncIOMotorDatabase = None):
+    def __init__(self, db: AsyncIOMotorDatabase = None, change_repo: ChangeRepo = None):
         self.db = db if db is not None else get_db()
         self.messages = self.db.messages
         self.conversations = self.db.conversations
+        self.change_repository = change_repo or ChangeRepo(self.db)
     
     # ALL methods are now async
     async def create_message(self, message: Message) -> Message:
         """Create a new message"""
         message_dict = message.to_dict()
         await self.messages.insert_one(message_dict)  # await
+        await self.change_repository.record(
+            "message", message.message_id, "upsert", [message.sender_id, message.receiver_id]
+        )
         return message
     
     async def create_conversation(self, conversation: Conversation) -> Conversation:
         """Create a new conversation"""
         conv_dict = conversation.to_dict()
         await self.conversations.insert_one(conv_dict)  # await
+        await self.change_repository.record(
+            "conversation", conversation.conversation_id, "upsert", list(conversation.participant_ids)
+        )
         return conversation
     
     async def update_conversation(self, conversation: Conversation) -> Conversation:
-        """Update an existing conversation"""
+        """Update an existing conversation and bump its version"""
         conv_dict = conversation.to_dict()
-        await self.conversations.update_one(  # await
+        conv_dict.pop("_id", None)
+        conv_dict.pop("version", None)
+        conv_dict["updated_at"] = datetime.utcnow()
+        updated = await self.conversations.find_one_and_update(  # await
             {"conversation_id": conversation.conversation_id},
-            {"$set": conv_dict}
+            {"$set": conv_dict, "$inc": {"version": 1}},
+            projection={"_id": 0, "version": 1},
+            return_document=ReturnDocument.AFTER
         )
+        if updated:
+            conversation.version = updated["version"]
+            conversation.updated_at = conv_dict["updated_at"]
+            await self.change_repository.record(
+                "conversation", conversation.conversation_id, "upsert", list(conversation.participant_ids)
+            )
         return conversation
     
     async def get_conversation_by_id(self, conversation_id: str) -> Optional[Conversation]:
@@ -46,6 +68,30 @@ class MessageRepository:
             return Conversation.from_dict(conv_dict)
         return None
     
+    async def get_conversation_version(self, conversation_id: str, user_id: str) -> Optional[dict]:
+        """Get only the version fields of a conversation the user takes part in"""
+        return await self.conversations.find_one(
+            {"conversation_id": conversation_id, "participant_ids": user_id},
+            {"_id": 0, "version": 1, "updated_at": 1}
+        )
+    
+    async def get_user_conversation_versions(
+        self,
+        user_id: str,
+        include_archived: bool = False,
+        limit: int = 20
+    ) -> List[dict]:
+        """Get the version fields for the same page as get_user_conversations"""
+        query = {"participant_ids": user_id}
+        if not include_archived:
+            query["is_archived"] = False
+        
+        cursor = self.conversations.find(
+            query,
+            {"_id": 0, "conversation_id": 1, "version": 1, "updated_at": 1, "created_at": 1}
+        ).sort("last_message_at", DESCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
+    
     async def get_conversation_by_participants(self, participant_ids: List[str]) -> Optional[Conversation]:
         """Get conversation by participants"""
         # Use $all to find conversations with both participants
@@ -71,6 +117,16 @@ class MessageRepository:
             conversations.append(Conversation.from_dict(doc))
         return conversations
     
+    async def get_messages_by_ids(self, message_ids: List[str]) -> List[Message]:
+        """Get messages by their IDs"""
+        cursor = self.messages.find({"message_id": {"$in": list(message_ids)}})
+        return [Message.from_dict(doc) async for doc in cursor]
+    
+    async def get_conversations_by_ids(self, conversation_ids: List[str]) -> List[Conversation]:
+        """Get conversations by their IDs"""
+        cursor = self.conversations.find({"conversation_id": {"$in": list(conversation_ids)}})
+        return [Conversation.from_dict(doc) async for doc in cursor]
+    
     async def get_messages_by_conversation(
         self,
         conversation_id: str,
@@ -1,30 +1,26 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.database import get_db
+from app.core.tracing import traced_class
 from app.models.user import UserModel
 
 
+@traced_class()
 class UserRepo:
+    def __init__(self, db: AsyncIOMotorDatabase = None):
+        self.users = (db if db is not None else get_db())["users"]
+
     async def create_user(self,user: UserModel):
-        db=get_db()
-        collection = db["users"]
-        result = await collection.insert_one(user.to_dict())
+        result = await self.users.insert_one(user.to_dict())
         return str(result.inserted_id)
 
     async def get_user_by_id(self,user_id: str):
-        db=get_db()
-        collection = db["users"]
-        return await collection.find_one({"user_id": user_id})
+        return await self.users.find_one({"user_id": user_id})
 
     async def get_user_by_email(self,email: str):
-        db=get_db()
-        collection = db["users"]
-        return await collection.find_one({"email": email})
+        return await self.users.find_one({"email": email})
 
     async def get_all_users(self,limit: int = 100, offset: int = 0):
-        db=get_db()
-        collection = db["users"]
-        return await collection.find().skip(offset).limit(limit).to_list(length=limit)
+        return await self.users.find().skip(offset).limit(limit).to_list(length=limit)
 
     async def delete_user(self,user_id: str):
-        db=get_db()
-        collection = db["users"]
-        return await collection.delete_one({"user_id": user_id})
+        return await self.users.delete_one({"user_id": user_id})
@@ -139,6 +139,8 @@ class Conversation:
         created_at: Timestamp when conversation was created
         is_archived: Whether conversation is archived
         unread_count: Count of unread messages per user
+        version: Monotonic counter bumped by the repository on every update
+        updated_at: Timestamp of the last update
     """
     
     def __init__(
@@ -151,6 +153,8 @@ class Conversation:
         last_message_content: Optional[str] = None,
         is_archived: bool = False,
         unread_count: Optional[dict[str, int]] = None,
+        version: int = 1,
+        updated_at: Optional[datetime] = None,
     ):
         self.conversation_id = conversation_id or str(uuid4())
         self.participant_ids = participant_ids
@@ -160,6 +164,8 @@ class Conversation:
         self.created_at = created_at or datetime.utcnow()
         self.is_archived = is_archived
         self.unread_count = unread_count or {pid: 0 for pid in participant_ids}
+        self.version = version
+        self.updated_at = updated_at or self.created_at
     
     def update_last_message(self, content: str, timestamp: datetime) -> None:
         """Update the last message timestamp and content"""
@@ -206,6 +212,8 @@ class Conversation:
             "created_at": self.created_at,
             "is_archived": self.is_archived,
             "unread_count": self.unread_count,
+            "version": self.version,
+            "updated_at": self.updated_at,
         }
     
     @classmethod
@@ -220,6 +228,8 @@ class Conversation:
             last_message_content=data.get("last_message_content"),
             is_archived=data.get("is_archived", False),
             unread_count=data.get("unread_count", {}),
+            version=data.get("version", 0),
+            updated_at=data.get("updated_at"),
         )
     
     def __repr__(self) -> str:
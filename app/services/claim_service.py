@@ -9,7 +9,11 @@ from app.repositories.user_repository import UserRepo
 from fastapi import Depends, HTTPException, status
 import uuid
 from fastapi import BackgroundTasks
+from app.core.tracing import background
 import random
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class ClaimService:
@@ -44,19 +48,19 @@ class ClaimService:
         new_claim_id = str(uuid.uuid4())
         claim_model = claim_data.to_model(claim_id=new_claim_id, submitted_at=datetime.now())
         claim_model.user_id = user_id
-        print(claim_model)
+        logger.debug("Submitting claim %s for item %s", new_claim_id, claim_model.item_id)
         await self.claim_repository.create_claim(claim_model)
         claimant_doc = await self.user_repository.get_user_by_id(user_id)
         if claimant_doc:
              claimant = UserResponse.from_model(UserModel(**claimant_doc))
              background_tasks.add_task(
-                self.notification_service.notify_item_poster_of_claim,
+                background(self.notification_service.notify_item_poster_of_claim),
                 item,
                 claimant
                 )
-             print("background task worked")
+             logger.debug("Claim %s: poster notification scheduled", new_claim_id)
         else: 
-            print(f"no emial sent")
+            logger.warning(f"Claim {new_claim_id}: claimant {user_id} not found, poster not notified")
       
         return ClaimResponse.from_model(claim_model)
     
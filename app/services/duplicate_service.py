@@ -0,0 +1,89 @@
+from datetime import timedelta
+from typing import List, Optional
+import asyncio
+import logging
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.repositories.image_repository import ImageRepo
+from app.repositories.item_repository import ItemRepo
+from app.utils.bk_tree import BKTree
+
+logger = logging.getLogger(__name__)
+
+# ObjectIds from other workers may land slightly out of order, so each refresh
+# re-reads a short window behind the newest id already indexed
+_REFRESH_OVERLAP = timedelta(seconds=30)
+
+
+class _PhashIndex:
+    """Per-worker BK-tree over every stored image hash, kept current from the images collection."""
+
+    def __init__(self):
+        self.tree = BKTree()
+        self.seen = set()  # image _ids inside the overlap window, the only ones a refresh can re-read
+        self.last_id: Optional[ObjectId] = None
+        self.lock = asyncio.Lock()
+
+    async def refresh(self, image_repo: ImageRepo):
+        async with self.lock:
+            since = None
+            if self.last_id is not None:
+                since = ObjectId.from_datetime(self.last_id.generation_time - _REFRESH_OVERLAP)
+            docs = await image_repo.get_phashes_since(since)
+            for doc in docs:
+                key = doc["_id"]
+                if key in self.seen or not doc.get("phash"):
+                    continue
+                self.seen.add(key)
+                self.tree.add(int(doc["phash"], 16), doc["item_id"])
+                if self.last_id is None or doc["_id"] > self.last_id:
+                    self.last_id = doc["_id"]
+            if self.last_id is not None:
+                cutoff = ObjectId.from_datetime(self.last_id.generation_time - _REFRESH_OVERLAP)
+                self.seen = {key for key in self.seen if key >= cutoff}
+
+    def forget(self, item_ids):
+        """Drop the hashes of items that no longer exist."""
+        removed = self.tree.discard(set(item_ids))
+        logger.debug("Dropped %s image hashes of %s deleted items", removed, len(item_ids))
+
+
+_index = _PhashIndex()
+
+
+class DuplicateService:
+
+    def __init__(self, image_repo: ImageRepo, item_repo: ItemRepo):
+        self.image_repository = image_repo
+        self.item_repository = item_repo
+
+    async def find_duplicates(self, phashes: List[Optional[str]], exclude_item_id: str) -> List[str]:
+        """
+        Return ids of existing items with an image within PHASH_DUPLICATE_DISTANCE
+        of any of the given hashes, closest first.
+        """
+        hashes = [int(h, 16) for h in phashes if h]
+        if not hashes:
+            return []
+
+        await _index.refresh(self.image_repository)
+
+        best = {}
+        for h in hashes:
+            for distance, item_id in _index.tree.search(h, settings.PHASH_DUPLICATE_DISTANCE):
+                if item_id == exclude_item_id:
+                    continue
+                if item_id not in best or distance < best[item_id]:
+                    best[item_id] = distance
+        if not best:
+            return []
+
+        # The index only learns of deletions here; prune items that have since been deleted
+        alive = {doc["item_id"] for doc in await self.item_repository.get_item_states(list(best))}
+        if len(alive) < len(best):
+            _index.forget([i for i in best if i not in alive])
+        duplicates = sorted((d, i) for i, d in best.items() if i in alive)
+        logger.info(f"Found {len(duplicates)} probable duplicates for item {exclude_item_id}")
+        return [item_id for _, item_id in duplicates]
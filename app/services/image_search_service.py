@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.models.item import ItemModel, ItemResponse
+from app.models.match import MatchList, MatchResponse
+from app.repositories.image_repository import ImageRepo
+from app.repositories.item_repository import ItemRepo
+from app.utils.image_processing import img_signals_from_bytes
+from app.utils.visual_features import FEATURE_DIM, unpack_features, visual_similarity
+from app.utils.lazy import lazy_module
+from app.utils.snapshot import load_snapshot, write_snapshot
+
+np = lazy_module("numpy")
+logger = logging.getLogger(__name__)
+
+_REFRESH_OVERLAP = timedelta(seconds=30)
+# Images scanned per requested result; several images can belong to one item
+_OVERFETCH = 4
+
+
+class _VectorIndex:
+    """
+    Per-worker matrix of every stored image descriptor, one row per image.
+    Rows come from a memory-mapped snapshot (shared by all workers on the
+    host) plus an in-memory tail of images added after the snapshot, grown
+    by doubling and refreshed incrementally from the images collection.
+    """
+
+    SNAPSHOT_NAME = "image_vectors"
+
+    def __init__(self):
+        self.base_matrix = np.zeros((0, FEATURE_DIM), dtype=np.float32)
+        self.base_item_ids = np.zeros(0, dtype="U1")
+        self.base_version = 0
+        self.matrix = np.zeros((0, FEATURE_DIM), dtype=np.float32)
+        self.item_ids: List[str] = []
+        self.image_ids: List[str] = []  # hex ObjectIds, sort like the ids themselves
+        self.seen = set()
+        self.last_id: Optional[ObjectId] = None
+        self.lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self.base_item_ids) + len(self.item_ids)
+
+    def attach(self, snapshot) -> bool:
+        """Use a snapshot as the base; only images after its watermark are replayed."""
+        arrays = snapshot.arrays
+        if arrays["features"].shape[1:] != (FEATURE_DIM,):
+            logger.warning(f"Ignoring {snapshot}: feature size does not match")
+            return False
+        self.base_matrix = arrays["features"]
+        self.base_item_ids = arrays["item_ids"]
+        self.base_version = snapshot.version
+        self.matrix = np.zeros((0, FEATURE_DIM), dtype=np.float32)
+        self.item_ids, self.image_ids = [], []
+        self.seen = set()
+        self.last_id = None
+
+        image_ids = arrays["image_ids"]
+        if len(image_ids):
+            self.last_id = ObjectId(image_ids[-1].decode())
+            # Rows are sorted by _id, so only the overlap window needs a seen-set
+            window = str(ObjectId.from_datetime(self.last_id.generation_time - _REFRESH_OVERLAP))
+            start = int(np.searchsorted(image_ids, window.encode()))
+            self.seen = {i.decode() for i in image_ids[start:]}
+        logger.info(f"Attached image vector snapshot v{snapshot.version} ({len(image_ids)} images)")
+        return True
+
+    def export(self) -> dict:
+        """Arrays for a new snapshot, rows sorted by image _id."""
+        order = sorted(range(len(self.item_ids)), key=lambda i: self.image_ids[i])
+        width = max([len(i) for i in self.item_ids] + [1])
+        return {
+            "features": self.matrix[:len(self.item_ids)][order],
+            "item_ids": np.array([self.item_ids[i] for i in order], dtype=f"U{width}"),
+            "image_ids": np.array([self.image_ids[i] for i in order], dtype="S24"),
+        }
+
+    def _append(self, vec: np.ndarray, item_id: str, image_id: ObjectId):
+        n = len(self.item_ids)
+        if n == len(self.matrix):
+            grown = np.zeros((max(1024, 2 * n), FEATURE_DIM), dtype=np.float32)
+            grown[:n] = self.matrix[:n]
+            self.matrix = grown
+        self.matrix[n] = vec
+        self.item_ids.append(item_id)
+        self.image_ids.append(str(image_id))
+
+    async def refresh(self, image_repo: ImageRepo):
+        async with self.lock:
+            since = None
+            if self.last_id is not None:
+                since = ObjectId.from_datetime(self.last_id.generation_time - _REFRESH_OVERLAP)
+            docs = await image_repo.get_features_since(since)
+            for doc in docs:
+                key = str(doc["_id"])
+                blob = bytes(doc.get("features") or b"")
+                if key in self.seen or len(blob) != FEATURE_DIM * 4:
+                    continue
+                self.seen.add(key)
+                self._append(unpack_features(blob), doc["item_id"], doc["_id"])
+                if self.last_id is None or doc["_id"] > self.last_id:
+                    self.last_id = doc["_id"]
+
+    def _item_id(self, row: int) -> str:
+        base_n = len(self.base_item_ids)
+        return str(self.base_item_ids[row]) if row < base_n else self.item_ids[row - base_n]
+
+    def similarities(self, query: np.ndarray) -> np.ndarray:
+        """Visual similarity of query to every row, base rows first."""
+        return np.concatenate([
+            visual_similarity(query, self.base_matrix),
+            visual_similarity(query, self.matrix[:len(self.item_ids)]),
+        ])
+
+    def top_k(self, sims: np.ndarray, k: int, skip=frozenset()) -> List[Tuple[str, float]]:
+        """
+        Exact nearest items by visual similarity, best image per item, leaving
+        out the item ids in skip. The scan widens until k items are found,
+        however many images they or the skipped items have.
+        """
+        n = len(sims)
+        if n == 0 or k <= 0:
+            return []
+        m = min(n, k * _OVERFETCH)
+        while True:
+            top = np.argpartition(-sims, m - 1)[:m]
+            top = top[np.argsort(-sims[top])]
+
+            ranked, seen = [], set()
+            for row in top:
+                item_id = self._item_id(int(row))
+                if item_id in seen or item_id in skip:
+                    continue
+                seen.add(item_id)
+                ranked.append((item_id, float(sims[row])))
+                if len(ranked) == k:
+                    return ranked
+            if m == n:
+                return ranked
+            m = min(n, 2 * m)
+
+
+_index: Optional[_VectorIndex] = None
+
+
+def _vector_index() -> _VectorIndex:
+    # Built on first use: its empty matrices would otherwise load numpy at import
+    global _index
+    if _index is None:
+        _index = _VectorIndex()
+    return _index
+
+
+def attach_snapshot() -> bool:
+    """Attach this worker's index to the current on-disk snapshot, if any."""
+    snapshot = load_snapshot(settings.MATCH_SNAPSHOT_DIR, _VectorIndex.SNAPSHOT_NAME)
+    return snapshot is not None and _vector_index().attach(snapshot)
+
+
+async def build_snapshot(image_repo: ImageRepo):
+    """Build the index from the database and write it as a new snapshot version."""
+    index = _VectorIndex()
+    await index.refresh(image_repo)
+    watermark = str(index.last_id) if index.last_id else None
+    return write_snapshot(settings.MATCH_SNAPSHOT_DIR, _VectorIndex.SNAPSHOT_NAME, index.export(),
+                          {"watermark": watermark, "rows": len(index)})
+
+
+class ImageSearchService:
+
+    def __init__(self, image_repo: ImageRepo, item_repo: ItemRepo):
+        self.image_repository = image_repo
+        self.item_repository = item_repo
+
+    async def search_by_image(self, content: bytes, limit: int = 10, min_score: float = 0.0) -> MatchList:
+        signals = await asyncio.to_thread(img_signals_from_bytes, content)
+        query = unpack_features(signals["features"])
+
+        index = _vector_index()
+        await index.refresh(self.image_repository)
+        sims = index.similarities(query)
+
+        # Claimed, deleted and unreadable items are skipped before the cut, so
+        # the page is only short when the index runs out; only ranked items
+        # are hydrated, and a round only repeats when one was skipped
+        skip, by_id = set(), {}
+        while True:
+            ranked = [(i, s) for i, s in index.top_k(sims, limit, skip) if s >= min_score]
+            pending = [i for i, _ in ranked if i not in by_id]
+            if not pending:
+                break
+            docs = [d for d in await self.item_repository.get_items_by_ids(pending) if not d.get("is_claimed")]
+            images = await self.image_repository.get_images_for_items([d["item_id"] for d in docs])
+            for doc in docs:
+                doc["_id"] = str(doc["_id"])
+                doc["images"] = images.get(doc["item_id"], [])
+                try:
+                    by_id[doc["item_id"]] = ItemResponse.from_model(ItemModel.model_validate(doc))
+                except Exception as e:
+                    logger.error(f"Error parsing item document {doc.get('item_id')}: {e}")
+            skipped = [i for i in pending if i not in by_id]
+            if not skipped:
+                break
+            skip.update(skipped)
+
+        matches = [
+            MatchResponse(
+                matched_item=by_id[item_id],
+                item_id=item_id,
+                score=round(score, 2),
+                mssg=f"Score {round(score*100)}%. Reasons: Visual similarity."
+            )
+            for item_id, score in ranked if item_id in by_id
+        ][:limit]
+        return MatchList(matches=matches, count=len(matches))
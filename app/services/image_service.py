@@ -5,8 +5,11 @@ import os
 from typing import Optional
 from fastapi import UploadFile, HTTPException, status
 import logging
+import time
 
 from app.core.storage import get_r2_client
+from app.core.metrics import IMAGE_PROCESSING_SECONDS
+from app.core.tracing import span
 from app.utils.image_processing import img_proc 
 from app.repositories import image_repository
 from app.models.image import Image, ImageModel
@@ -15,9 +18,9 @@ logger = logging.getLogger(__name__)
 
 class ImageService:
     
-    def __init__(self):
-        self.storage_client = get_r2_client()
-        self.image_repository = image_repository.ImageRepo()
+    def __init__(self, storage_client=None, image_repo: Optional[image_repository.ImageRepo] = None):
+        self.storage_client = storage_client or get_r2_client()
+        self.image_repository = image_repo or image_repository.ImageRepo()
 
     async def process_and_upload_image(self, file: UploadFile, item_id: str) -> Image:
         """
@@ -40,7 +43,10 @@ class ImageService:
 
             try:
                 # Process the image using your utility
-                img_proc(temp_path)
+                started = time.perf_counter()
+                with span("img_proc", bytes=len(file_content)):
+                    signals = img_proc(temp_path)
+                IMAGE_PROCESSING_SECONDS.observe(time.perf_counter() - started)
                 
                 # Re-read the processed content
                 with open(temp_path, 'rb') as f:
@@ -61,7 +67,9 @@ class ImageService:
                 image_dto = Image(
                     item_id=item_id,
                     url=file_url,  #Changed from 'path' to 'url'
-                    date_uploaded=datetime.now()
+                    date_uploaded=datetime.now(),
+                    phash=signals.get("phash"),
+                    features=signals.get("features")
                 )
                 
                 # Save to repository
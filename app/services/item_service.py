@@ -1,5 +1,7 @@
 from app.models.item import ItemCreation, ItemResponse, ItemList, ItemModel
 from app.services.image_service import ImageService
+from app.services.duplicate_service import DuplicateService
+from app.utils.taxonomy import item_type_code
 from fastapi import status, UploadFile
 from typing import Optional, List
 from app.repositories import image_repository, item_repository
@@ -9,15 +11,25 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _fill_type_code(doc: dict) -> dict:
+    # Documents written before type_code existed, until backfill_tokens reaches them
+    if doc.get("type_code") is None:
+        doc["type_code"] = item_type_code(doc.get("type", ""), doc.get("desc", ""))
+    return doc
+
+
 class ItemService:
     
     def __init__(self, 
                  image_service: ImageService,
                  item_repo: item_repository.ItemRepo,
-                 image_repo: image_repository.ImageRepo):
+                 image_repo: image_repository.ImageRepo,
+                 duplicate_service: Optional[DuplicateService] = None):
         self.image_service = image_service
         self.item_repository = item_repo
         self.image_repository= image_repo
+        self.duplicate_service = duplicate_service
         
         
     async def create_item(self, item_cr: ItemCreation, image_files: List[UploadFile]) -> Optional[ItemResponse]:
@@ -35,9 +47,16 @@ class ItemService:
         item_model = item_cr.to_model(
             item_id=id, 
             image_metadata=image_metadata_list, 
-            created_at=datetime.now()
+            created_at=datetime.now(),
+            type_code=item_type_code(item_cr.type, item_cr.desc)
         )
         
+        # Flag probable duplicate posts before matching runs on this item
+        if self.duplicate_service:
+            item_model.duplicate_of = await self.duplicate_service.find_duplicates(
+                [img.phash for img in image_metadata_list], exclude_item_id=id
+            )
+        
         await self.item_repository.create_item(item_model)
         
         return ItemResponse.from_model(item_model)
@@ -57,13 +76,13 @@ class ItemService:
                     item_id = m.get('item_id')
                     if item_id and self.image_repository:
                         images = await self.image_repository.get_images_by_item(item_id)
-                        logger.info(f"Fetched {len(images)} images for item {item_id}")
+                        logger.debug("Fetched %s images for item %s", len(images), item_id)
                         # Replace embedded images with fetched images
                         m['images'] = images
                     else:
                         m['images'] = []
                     
-                    item_model = ItemModel.model_validate(m, from_attributes=True)
+                    item_model = ItemModel.model_validate(_fill_type_code(m), from_attributes=True)
                     item_response = ItemResponse.from_model(item_model)
                     items.append(item_response)
                     
@@ -90,12 +109,12 @@ class ItemService:
                 #FETCH IMAGES FROM SEPARATE COLLECTION
                 if self.image_repository:
                     images = await self.image_repository.get_images_by_item(item_id)
-                    logger.info(f"Fetched {len(images)} images for item {item_id}")
+                    logger.debug("Fetched %s images for item %s", len(images), item_id)
                     item_doc['images'] = images
                 else:
                     item_doc['images'] = []
                 
-                item_model = ItemModel.model_validate(item_doc, from_attributes=True)
+                item_model = ItemModel.model_validate(_fill_type_code(item_doc), from_attributes=True)
                 return ItemResponse.from_model(item_model)
             
             return None
@@ -104,6 +123,28 @@ class ItemService:
             logger.error(f"Error fetching item {item_id}: {e}", exc_info=True)
             raise
 
+    async def get_items_by_ids(self, item_ids: List[str]) -> List[ItemResponse]:
+        """Hydrate a page of items with two queries, in the given order; missing ids are skipped."""
+        docs = await self.item_repository.get_items_by_ids(item_ids)
+        images = {}
+        if self.image_repository:
+            images = await self.image_repository.get_images_for_items([d["item_id"] for d in docs])
+
+        by_id = {}
+        for doc in docs:
+            doc["_id"] = str(doc["_id"])
+            doc["images"] = images.get(doc["item_id"], [])
+            try:
+                by_id[doc["item_id"]] = ItemResponse.from_model(ItemModel.model_validate(_fill_type_code(doc)))
+            except Exception as e:
+                logger.error(f"Error parsing item document {doc.get('item_id')}: {e}", exc_info=True)
+        return [by_id[item_id] for item_id in item_ids if item_id in by_id]
+
+    async def get_item_version(self, item_id: str) -> Optional[dict]:
+        return await self.item_repository.get_item_version(item_id)
+
+    async def get_items_versions(self, limit: int = 10, offset: int = 0) -> List[dict]:
+        return await self.item_repository.list_item_versions(limit, offset)
     
     async def delete_item(self, item_id: str) -> bool:
         try:
@@ -116,6 +157,13 @@ class ItemService:
     async def update_item(self, item_id: str, item_update: ItemCreation) -> Optional[ItemResponse]:
         try:
             update_data = item_update.model_dump(exclude_unset=True)
+            # The code falls back on the description, so either field can move it
+            if "type" in update_data or "desc" in update_data:
+                current = {}
+                if "type" not in update_data or "desc" not in update_data:
+                    current = await self.item_repository.get_item_by_id(item_id) or {}
+                update_data["type_code"] = item_type_code(update_data.get("type", current.get("type", "")),
+                                                          update_data.get("desc", current.get("desc", "")))
             update_result = await self.item_repository.update_fields(item_id, update_data)
             
             # Return updated item
@@ -149,7 +197,8 @@ class ItemService:
             item_model = item_cr.to_model(
                 item_id=item_id,
                 image_metadata=image_metadata_list,
-                created_at=datetime.now()
+                created_at=datetime.now(),
+                type_code=item_type_code(item_cr.type, item_cr.desc)
             )
             
             # Update in repository
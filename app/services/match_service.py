@@ -1,4 +1,4 @@
-from typing import List, Annotated
+from typing import List, Annotated, Optional
 from app.models.match import MatchSearchRequest, MatchResponse, MatchList, MatchModel 
 from app.models.item import ItemResponse
 from app.services.item_service import ItemService 
@@ -7,6 +7,24 @@ from fastapi import Depends
 from datetime import datetime
 from app.services.noti_service import NotificationService
 from app.repositories.user_repository import UserRepo
+from app.repositories.image_repository import ImageRepo
+from app.repositories.item_repository import ItemRepo
+from app.repositories.change_repository import ChangeRepo
+from app.core.config import settings
+from app.core.metrics import MATCHES_CREATED, MATCHING_CANDIDATES, MATCHING_SECONDS, timed
+from app.utils.visual_features import has_features, stack_features, visual_similarity
+from app.utils.match_scoring import (TYPE_WEIGHT, KEYWORD_WEIGHT, LOCATION_WEIGHT, AUTO_MATCH_THRESHOLD,
+                                     SEARCH_MIN_SCORE, cross_type_reachable, days_between, match_window,
+                                     normalize_score, recency_factor, score_block)
+from app.utils.topk import TopK, decode_cursor, encode_cursor, ranks_after
+from app.utils.text import tokenize, tokenize_all
+from app.utils.taxonomy import UNKNOWN, category_code, normalize_type, type_credit, type_key
+from app.services.term_index import get_term_index, fuzzy_hits
+from app.utils.lazy import lazy_module
+import logging
+
+np = lazy_module("numpy")
+logger = logging.getLogger(__name__)
 
 
 class MatchService:
@@ -14,110 +32,294 @@ class MatchService:
     def __init__(self,
                  item_service: Annotated[ItemService, Depends()],
                  match_repo: match_repository.MatchRepo,
-                notification_service: Annotated[NotificationService, Depends()]):
+                notification_service: Annotated[NotificationService, Depends()],
+                item_repo: ItemRepo,
+                change_repo: ChangeRepo,
+                image_repo: Optional[ImageRepo] = None):
         self.item_service = item_service
         self.match_repository = match_repo
         self.notification_service = notification_service
+        self.item_repository = item_repo
+        self.change_repository = change_repo
+        self.image_repository = image_repo
         
+    async def _term_index(self, max_age: Optional[float] = None):
+        return await get_term_index(self.item_repository, self.change_repository, max_age)
+
+    @timed(MATCHING_SECONDS.labels("find_potential_matches"))
     async def find_potential_matches(self, search_request: MatchSearchRequest) -> MatchList:
-        
-        all_items_list = await self.item_service.get_all_items(limit=1000, offset=0)
-        all_items = all_items_list.item_list
-        potential_matches: List[MatchResponse] = []
+        """
+        One page (k results after cursor) of unclaimed items of the other post
+        type, best first. Candidates come from the type block and the keyword
+        postings of the last MATCH_WINDOW_DAYS, since nothing else can reach
+        SEARCH_MIN_SCORE, and scores decay with the age of the post.
+        Components are scored cheapest first and a candidate is dropped as
+        soon as its upper bound cannot enter the top k. Only the page is
+        hydrated.
+        """
+        after = decode_cursor(search_request.cursor)
+        index = await self._term_index()
+        # Later pages decay from the first page's time, or their scores would not line up with the cursor
+        now = after.as_of if after and after.as_of else datetime.now().replace(microsecond=0)
+        start, _ = match_window(now, settings.MATCH_WINDOW_DAYS)
 
-        search_keywords = {k.lower() for k in search_request.keywords}
+        search_keywords = set(tokenize_all(search_request.keywords))
+        # Misspelt keywords are expanded once per request; the loop only intersects sets
+        expansions = index.expand_keywords(search_keywords)
+        location_tokens = set(tokenize(search_request.location))
+        search_code = category_code(search_request.search_type)
 
-        for item in all_items:
-            if item.is_claimed:
+        candidates = index.block_ids(type_key(search_code, search_request.search_type), start)
+        for keyword, terms in expansions.items():
+            for term in terms | {keyword}:
+                candidates |= index.term_ids(term, start)
+
+        # Highest type credit first, so once a credit group cannot make the cut nothing after it can
+        credited = []
+        for item_id in candidates:
+            item = index.items[item_id]
+            if item.post_type.lower() == search_request.post_type.lower():
                 continue
+            credit = type_credit(search_code, item.type_code, search_request.search_type, item.type)
+            credited.append((-credit, item_id, item))
+        credited.sort(key=lambda c: (c[0], c[1]))
+        MATCHING_CANDIDATES.labels("find_potential_matches").observe(len(credited))
 
-            if item.post_type == search_request.post_type:
-                continue 
-                
-            score = 0.0
-            reasons = []
+        top = TopK(search_request.k)
+        for neg_credit, item_id, item in credited:
+            floor = top.floor(SEARCH_MIN_SCORE) - 0.005  # scores are ranked rounded to 2 places
+            score = TYPE_WEIGHT * -neg_credit
+            if score + LOCATION_WEIGHT + KEYWORD_WEIGHT < floor:
+                break
 
-            #highest priority to the type match
-            if item.type.lower() == search_request.search_type.lower():
-                score += 0.5  # 50% score for exact type match
-                reasons.append("Exact item type match.")
+            decay = recency_factor(days_between(now, item.created_at), settings.MATCH_RECENCY_HALF_LIFE_DAYS)
+            located = bool(location_tokens) and location_tokens <= item.tokens
+            if located:
+                score += LOCATION_WEIGHT
+            if (score + KEYWORD_WEIGHT) * decay < floor:
+                continue
 
-            #then desc match using keywords
-            item_desc_words = set(item.desc.lower().split())
-            common_keywords = search_keywords.intersection(item_desc_words)
-            
-            if common_keywords:
-                keyword_score = len(common_keywords) / len(search_keywords)
-                score += (keyword_score * 0.4) 
-                reasons.append(f"Keyword overlap: {', '.join(common_keywords)}")
-            
-            #match the locatiom
-            if search_request.location.lower() in item.desc.lower():
-                 score += 0.1 # 10% score for location keyword in description
-                 reasons.append("Location mentioned in description.")
-
-
-            #filter and crate a response
-            if score >= 0.5: 
-                potential_matches.append(
-                    MatchResponse(
-                        matched_item=item,
-                        item_id=item.item_id,
-                        score=round(score, 2),
-                        mssg=f"Score {round(score*100)}%. Reasons: {'; '.join(reasons)}"
-                    )
-                )
+            common_keywords = search_keywords & item.tokens
+            similar_keywords = fuzzy_hits(search_keywords - common_keywords, expansions, item.tokens)
+            if common_keywords or similar_keywords:
+                matched = len(common_keywords) + settings.MATCH_FUZZY_DISCOUNT * len(similar_keywords)
+                score += KEYWORD_WEIGHT * matched / len(search_keywords)
+
+            score = round(score * decay, 2)
+            if score < SEARCH_MIN_SCORE or (after and not ranks_after(score, item_id, after)):
+                continue
+            top.push(score, item_id, (-neg_credit, common_keywords, similar_keywords, located))
+
+        page = top.sorted()
+        items = {i.item_id: i for i in await self.item_service.get_items_by_ids([item_id for _, item_id, _ in page])}
 
-        potential_matches.sort(key=lambda m: m.score, reverse=True)
+        matches: List[MatchResponse] = []
+        for score, item_id, (credit, common_keywords, similar_keywords, located) in page:
+            item = items.get(item_id)
+            if item is None or item.is_claimed:
+                continue
+            reasons = []
+            if credit:
+                reasons.append("Exact item type match." if credit == 1.0 else "Related item category.")
+            if common_keywords:
+                reasons.append(f"Keyword overlap: {', '.join(sorted(common_keywords))}")
+            if similar_keywords:
+                reasons.append("Similar spelling: " + ", ".join(
+                    f"{k} ~ {'/'.join(sorted(terms))}" for k, terms in similar_keywords.items()))
+            if located:
+                reasons.append("Location mentioned in description.")
+            matches.append(MatchResponse(
+                matched_item=item,
+                item_id=item_id,
+                score=score,
+                mssg=f"Score {round(score*100)}%. Reasons: {'; '.join(reasons)}"
+            ))
 
+        next_cursor = encode_cursor(page[-1][0], page[-1][1], now) if len(page) == search_request.k else None
         return MatchList(
-            matches=potential_matches,
-            count=len(potential_matches)
+            matches=matches,
+            count=len(matches),
+            next_cursor=next_cursor
         )
         
+    @timed(MATCHING_SECONDS.labels("run_automated_matching"))
     async def run_automated_matching(self, new_item_id: str):
-       
-        new_item = await self.item_service.get_item_id(new_item_id)
-        if not new_item:
+        """
+        Score a new item against the unclaimed items posted within
+        MATCH_WINDOW_DAYS of it, taken from the term index's monthly buckets
+        of its type block, and store the pairs that pass with their decayed
+        score.
+        """
+        # The item was just written, so skip the refresh throttle
+        index = await self._term_index(max_age=0)
+        new_item = index.items.get(new_item_id)
+        if new_item is None:
             return
 
-        all_items_list = await self.item_service.get_all_items(limit=1000, offset=0)
-        all_items = all_items_list.item_list
-
-        new_item_desc_words = set(new_item.desc.lower().split())
-
-        for existing_item in all_items:
-            if existing_item.item_id == new_item.item_id or existing_item.is_claimed:
-                continue
+        new_item_desc_words = new_item.tokens
+        start, end = match_window(new_item.created_at, settings.MATCH_WINDOW_DAYS)
+        # Pairs across root categories cannot pass unless keywords and photos alone can
+        cross_type = cross_type_reachable(self._visual_weight())
+        # Entries are read once: snapshot rows are decoded on every lookup
+        entries = {cid: index.items[cid] for cid in index.block_ids(None if cross_type else new_item.block, start, end)}
+        candidate_ids = sorted(
+            cid for cid, entry in entries.items()
+            if cid != new_item_id
+            # A lost item is only matched with found ones and vice versa
+            and entry.post_type.lower() != new_item.post_type.lower()
+            # The same item posted twice is not a match
+            and cid not in new_item.duplicate_of
+            and new_item_id not in entry.duplicate_of
+        )
+        MATCHING_CANDIDATES.labels("run_automated_matching").observe(len(candidate_ids))
+        visual_scores, has_visual = await self._visual_scores(new_item_id, candidate_ids)
 
+        for existing_item_id, visual_score, with_photos in zip(candidate_ids, visual_scores, has_visual):
+            existing_item = entries[existing_item_id]
             score = 0.0
 
             #type Match
-            if existing_item.type.lower() == new_item.type.lower():
-                score += 0.5 
+            score += TYPE_WEIGHT * type_credit(new_item.type_code, existing_item.type_code,
+                                               new_item.type, existing_item.type)
 
             #keyword Match
-            existing_item_desc_words = set(existing_item.desc.lower().split())
+            existing_item_desc_words = existing_item.tokens
             common_keywords = new_item_desc_words.intersection(existing_item_desc_words)
             
             if common_keywords and new_item_desc_words:
                 min_len = min(len(new_item_desc_words), len(existing_item_desc_words))
                 keyword_score = len(common_keywords) / min_len
-                score += (keyword_score * 0.4) 
-                
-            print(f"in automanted matching ofund score: {score}")
+                score += (keyword_score * KEYWORD_WEIGHT)
+
+            #visual Match
+            score += float(visual_score) * self._visual_weight()
+            score = float(normalize_score(score, self._visual_weight(), with_photos))
+
+            #recency: posts further apart are less likely to be the same item
+            score *= recency_factor(days_between(new_item.created_at, existing_item.created_at),
+                                    settings.MATCH_RECENCY_HALF_LIFE_DAYS)
 
-            if score >= 0.65:
+            # Lazy arguments: this runs once per candidate
+            logger.debug("Automated matching %s ~ %s: %.3f", new_item_id, existing_item_id, score)
+
+            if score >= AUTO_MATCH_THRESHOLD:
                 match_data = MatchModel(
-                    item_id_a=new_item.item_id,
-                    item_id_b=existing_item.item_id,
+                    item_id_a=new_item_id,
+                    item_id_b=existing_item_id,
                     score=round(score, 2),
                     matched_at=datetime.now()
                 )
                 await self.match_repository.add_match(match_data)
+                MATCHES_CREATED.labels("run_automated_matching").inc()
                 await self.notification_service.notify_match_found(new_item.user_id, new_item.type, score)
                 await self.notification_service.notify_match_found(existing_item.user_id, existing_item.type, score)
                 
 
+    @timed(MATCHING_SECONDS.labels("rematch_item"))
+    async def rematch_item(self, item_id: str, previous: ItemResponse, images_changed: bool = False):
+        """
+        Incremental re-match after an edit. Only pairs whose score can have
+        moved are re-scored: candidates sharing a changed term (every shared
+        term if the description length changed), the whole type block if the
+        type or photos changed, and the item's stored matches, all within the
+        item's MATCH_WINDOW_DAYS. The result is diffed against the stored
+        matches with bulk upserts and deletes.
+        """
+        # The item was just written, so skip the refresh throttle
+        index = await self._term_index(max_age=0)
+        item = index.items.get(item_id)
+        if item is None:
+            return
+
+        old_tokens = frozenset(previous.desc_tokens)
+        stored = {}
+        for m in await self.match_repository.get_matches_for_item(item_id):
+            partner = m["item_id_b"] if m["item_id_a"] == item_id else m["item_id_a"]
+            stored.setdefault(partner, []).append(m)
+
+        type_changed = item.type_code != previous.type_code or (
+            item.type_code == UNKNOWN and normalize_type(item.type) != normalize_type(previous.type))
+        start, end = match_window(item.created_at, settings.MATCH_WINDOW_DAYS)
+        if images_changed or type_changed:
+            cross_type = cross_type_reachable(self._visual_weight())
+            candidates = index.block_ids(None if cross_type else item.block, start, end)
+        else:
+            changed = item.tokens ^ old_tokens if len(item.tokens) == len(old_tokens) else item.tokens | old_tokens
+            candidates = set()
+            for term in changed:
+                candidates |= index.term_ids(term, start, end)
+        candidates |= stored.keys()
+
+        entries = {cid: index.items.get(cid) for cid in candidates if cid != item_id}
+        candidate_ids = sorted(
+            cid for cid, entry in entries.items()
+            if entry is not None
+            and cid not in item.duplicate_of and item_id not in entry.duplicate_of
+            # Same post type only to remove a stored pair (e.g. after post_type was edited)
+            and (cid in stored or entry.post_type.lower() != item.post_type.lower())
+        )
+        MATCHING_CANDIDATES.labels("rematch_item").observe(len(candidate_ids))
+        if not candidate_ids:
+            return
+        others = [entries[cid] for cid in candidate_ids]
+
+        visual_weight = self._visual_weight()
+        if visual_weight:
+            features = await self.image_repository.get_features_for_items([item_id] + candidate_ids)
+            query = stack_features([features.get(item_id, [])])
+            matrix = stack_features([features.get(cid, []) for cid in candidate_ids])
+        else:
+            query = matrix = None
+        credit = np.array([[type_credit(item.type_code, o.type_code, item.type, o.type) for o in others]],
+                          dtype=np.float64)
+        scores = score_block([item.tokens], [o.tokens for o in others], query, matrix,
+                             type_credit=credit, visual_weight=visual_weight)[0]
+        # Stored partners outside the window decay to 0 and are removed
+        scores *= recency_factor(np.array([days_between(item.created_at, o.created_at) for o in others]),
+                                 settings.MATCH_RECENCY_HALF_LIFE_DAYS, settings.MATCH_WINDOW_DAYS)
+        scores[np.array([o.post_type.lower() == item.post_type.lower() for o in others], dtype=bool)] = 0.0
+
+        now = datetime.now()
+        upserts, deletes, created = [], [], []
+        for cid, other, score in zip(candidate_ids, others, scores):
+            score = float(score)
+            if score >= AUTO_MATCH_THRESHOLD:
+                if cid not in stored:
+                    upserts.append(MatchModel(item_id_a=item_id, item_id_b=cid, score=round(score, 2), matched_at=now))
+                    created.append((other, score))
+                elif stored[cid][0].get("score") != round(score, 2):
+                    m = stored[cid][0]
+                    upserts.append(MatchModel(item_id_a=m["item_id_a"], item_id_b=m["item_id_b"],
+                                              score=round(score, 2), matched_at=now))
+            elif cid in stored:
+                deletes.extend((m["item_id_a"], m["item_id_b"]) for m in stored[cid])
+
+        owners = {item_id: item.user_id, **{cid: o.user_id for cid, o in zip(candidate_ids, others)}}
+        await self.match_repository.bulk_upsert_matches(upserts, owners)
+        await self.match_repository.bulk_delete_pairs(deletes, owners)
+        MATCHES_CREATED.labels("rematch_item").inc(len(created))
+        logger.info(f"Re-matched item {item_id}: {len(candidate_ids)} candidates, "
+                    f"{len(upserts)} upserted, {len(deletes)} removed")
+
+        for other, score in created:
+            await self.notification_service.notify_match_found(item.user_id, item.type, score)
+            await self.notification_service.notify_match_found(other.user_id, other.type, score)
+
+    def _visual_weight(self) -> float:
+        return settings.MATCH_VISUAL_WEIGHT if self.image_repository else 0.0
+
+    async def _visual_scores(self, item_id: str, candidate_ids: List[str]):
+        """
+        Image similarity of one item against all candidates, computed in one
+        NumPy pass, and whether both posts of each pair have photos.
+        """
+        if not self.image_repository or not candidate_ids:
+            return [0.0] * len(candidate_ids), [False] * len(candidate_ids)
+
+        features = await self.image_repository.get_features_for_items([item_id] + candidate_ids)
+        query = stack_features([features.get(item_id, [])])
+        matrix = stack_features([features.get(cid, []) for cid in candidate_ids])
+        return visual_similarity(query[0], matrix), has_features(query)[0] & has_features(matrix)
+
     async def get_saved_matches(self, item_id: str):
         return await self.match_repository.get_match_by_item(item_id)
\ No newline at end of file
@@ -89,8 +89,16 @@ class MessageService:
     async def get_conversation_messages(self, conversation_id: str, limit: int = 50):
         return await self.message_repo.get_messages_by_conversation(conversation_id, limit)  #  await
     
+    async def get_conversation_version(self, conversation_id: str, user_id: str):
+        return await self.message_repo.get_conversation_version(conversation_id, user_id)
+    
+    async def get_user_conversation_versions(self, user_id: str, include_archived: bool = False, limit: int = 20):
+        return await self.message_repo.get_user_conversation_versions(user_id, include_archived, limit)
+    
     async def mark_conversation_as_read(self, conversation_id: str, user_id: str):
         conversation = await self.get_conversation(conversation_id)  #  await
-        if user_id in conversation.unread_count:
-            conversation.unread_count[user_id] = 0
+        # Only write (and bump the version) when there is something to clear
+        if conversation.unread_count.get(user_id, 0) > 0:
+            conversation.reset_unread_for_user(user_id)
             await self.message_repo.update_conversation(conversation)  #  await
+        return conversation
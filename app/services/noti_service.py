@@ -3,10 +3,16 @@ from app.models.item import ItemResponse
 from app.repositories.user_repository import UserRepo
 import smtplib
 import asyncio
+import time
 import os
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import logging
 from app.core.config import settings
+from app.core.metrics import EMAIL_SEND_SECONDS
+from app.core.tracing import CLIENT, traced
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -17,6 +23,7 @@ class NotificationService:
         self.sender_password = settings.MAIL_PASSWORD
         
         
+    @traced("smtp send", CLIENT)
     def _sync_send_email(self, msg, recipient_email: str):
         server = smtplib.SMTP('smtp.gmail.com', 587)
         server.starttls() 
@@ -30,7 +37,7 @@ class NotificationService:
     
     async def send_email(self, recipient_email: str, subject: str, body: str) -> bool:
         if not self.sender_email or not self.sender_password:
-            print(" Email credentials missing. Skipping email.")
+            logger.warning("Email credentials missing. Skipping email.")
             return
 
         msg = MIMEMultipart()
@@ -39,12 +46,15 @@ class NotificationService:
         msg['Subject'] = subject
         msg.attach(MIMEText(body, 'html'))
 
+        started = time.perf_counter()
         try:
             await asyncio.to_thread(self._sync_send_email, msg, recipient_email)
-            print(f"Successfully sent email to {recipient_email}")
+            EMAIL_SEND_SECONDS.labels("ok").observe(time.perf_counter() - started)
+            logger.info(f"Sent email to {recipient_email}")
             return True
         except Exception as e:
-            print(f"Failed to send email: {e}")
+            EMAIL_SEND_SECONDS.labels("error").observe(time.perf_counter() - started)
+            logger.error(f"Failed to send email to {recipient_email}: {e}")
             return False
         
         
@@ -52,7 +62,7 @@ class NotificationService:
         user_data = await self.user_repository.get_user_by_id(user_id)
         
         if not user_data or not user_data.get("email"):
-            print(f"User {user_id} not found or has no email for match alert")
+            logger.info(f"User {user_id} not found or has no email for match alert")
             return False
 
         recipient_email = user_data.get("email")
@@ -91,13 +101,13 @@ class NotificationService:
         owner = await self.user_repository.get_user_by_id(item.user_id)
 
         if not owner:
-            print("Owner not found")
+            logger.warning(f"Owner {item.user_id} of item {item.item_id} not found")
             return False
 
         poster_email = owner.get("email")
 
         if not poster_email:
-            print("Owner has no email")
+            logger.info(f"Owner {item.user_id} of item {item.item_id} has no email")
             return False
         
         subject = f"ACTION REQUIRED: New Claim for Item {item.item_id}"
@@ -128,7 +138,7 @@ class NotificationService:
         claimant_email = claimant.email
 
         if not claimant_email:
-            print("Claimant has no email")
+            logger.info(f"Claimant {claimant.user_id} has no email")
             return False
         
         accent_color = "#4CAF50" if decision.lower() == "approved" else "#e74c3c"
@@ -1,46 +1,133 @@
-from typing import List, Annotated
+from datetime import datetime
+from typing import Dict, List, Annotated, Set
 from fastapi import Depends
-from app.models.search import SearchRequest
-from app.models.item import ItemList, ItemResponse
+from app.models.search import SearchRequest, CategoryFacet
+from app.models.item import ItemList
 from app.services.item_service import ItemService 
+from app.repositories.item_repository import ItemRepo
+from app.repositories.change_repository import ChangeRepo
+from app.services.term_index import get_term_index, fuzzy_hits, index_entry
+from app.core.config import settings
+from app.utils.text import tokenize
+from app.utils.taxonomy import UNKNOWN, ancestors, category_code, category_name, is_within, normalize_type, parent_code, type_key
 
 class SearchService:
     
-    def __init__(self, item_service: Annotated[ItemService, Depends()]):
+    def __init__(self, item_service: Annotated[ItemService, Depends()], item_repo: ItemRepo, change_repo: ChangeRepo):
         self.item_service = item_service
+        self.item_repository = item_repo
+        self.change_repository = change_repo
 
     async def search_items(self, search_request: SearchRequest) -> ItemList:
-       
-        
-        all_items = await self.item_service.get_all_items(limit=1000, offset=0)
-        filtered_items: List[ItemResponse] = []
-        
-        for item in all_items.items:
-            
-            if search_request.is_claimed is not None and item.is_claimed != search_request.is_claimed:
-                continue
+        """
+        Items that contain every query word (exactly or as a close misspelling)
+        or whose type the query names, within item_type, best first.
+        Unclaimed candidates come from the term index postings and type blocks,
+        claimed ones from a projected query; either way only the returned page
+        is loaded in full.
+        """
+        # Resolve the request against the taxonomy once, not per item
+        type_code = category_code(search_request.item_type) if search_request.item_type else UNKNOWN
+        item_type = normalize_type(search_request.item_type)
+        query_lower = search_request.query.lower() if search_request.query else None
+        query_tokens = set(tokenize(search_request.query)) if search_request.query else set()
+        query_code = category_code(search_request.query) if search_request.query else UNKNOWN
+        since = search_request.date_from
 
-          
-            if search_request.item_type and item.type.lower() != search_request.item_type.lower():
-                continue
+        index = await get_term_index(self.item_repository, self.change_repository)
+        # Misspelt query words are expanded once per request; the loop only intersects sets
+        expansions = index.expand_keywords(query_tokens)
+
+        entries, weights = {}, {}
+        if search_request.is_claimed is not True:
+            candidates = index.block_ids(type_key(type_code, search_request.item_type) if search_request.item_type
+                                         else None, since)
+            if query_tokens:
+                weights = self._query_weights(index, query_tokens, expansions, since)
+                candidates &= set(weights) | self._named_types(index, query_lower, query_code, since)
+            entries = {item_id: index.items[item_id] for item_id in candidates}
+        if search_request.is_claimed is not False:
+            for doc in await self.item_repository.list_claimed_candidates(since):
+                item = entries[doc["item_id"]] = index_entry(doc)
+                if query_tokens:
+                    # Not in the postings, so weighed on its own tokens the same way
+                    exact = query_tokens.intersection(item.tokens)
+                    similar = fuzzy_hits(query_tokens - exact, expansions, item.tokens)
+                    if len(exact) + len(similar) == len(query_tokens):
+                        weights[doc["item_id"]] = \
+                            (len(exact) + settings.MATCH_FUZZY_DISCOUNT * len(similar)) / len(query_tokens)
 
-            if search_request.query:
-                query_lower = search_request.query.lower()
-                if not (query_lower in item.desc.lower() or query_lower in item.type.lower()):
+        relevance = {}
+        for item_id, item in entries.items():
+            # A parent category ("electronics") also returns its children ("phone")
+            if search_request.item_type:
+                if type_code:
+                    if not is_within(item.type_code, type_code):
+                        continue
+                elif item.type_code or normalize_type(item.type) != item_type:
                     continue
-            
-           
-            if search_request.date_from and item.created_at < search_request.date_from:
+
+            if since and (item.created_at is None or item.created_at < since):
                 continue
 
-            filtered_items.append(item)
-            
-     
-        start = search_request.offset
-        end = search_request.offset + search_request.limit
-        paginated_items = filtered_items[start:end]
+            if item_id in weights:
+                relevance[item_id] = weights[item_id]
+            elif not query_tokens or query_lower in item.type.lower() or \
+                    (query_code and is_within(item.type_code, query_code)):
+                relevance[item_id] = 1.0
+
+        # Exact hits before misspelt ones, then in posting order
+        ranked = sorted(relevance, key=lambda i: (-relevance[i], entries[i].created_at or datetime.min, i))
+        page = ranked[search_request.offset:search_request.offset + search_request.limit]
+        items = await self.item_service.get_items_by_ids(page)
+        if search_request.is_claimed is not None:
+            # The index can trail a claim by TERM_INDEX_REFRESH_SECONDS
+            items = [item for item in items if item.is_claimed == search_request.is_claimed]
 
         return ItemList(
-            items=paginated_items,
-            count=len(filtered_items)
-        )
\ No newline at end of file
+            item_list=items,
+            count=len(ranked)
+        )
+
+    @staticmethod
+    def _query_weights(index, query_tokens, expansions, since) -> Dict[str, float]:
+        """
+        Relevance of the unclaimed items holding every query word, read off the
+        postings: a word counts 1 where the item has it and MATCH_FUZZY_DISCOUNT
+        where it only has one of the word's expansions (a close misspelling).
+        """
+        total = None
+        for token in query_tokens:
+            exact = index.term_ids(token, since)
+            weight = dict.fromkeys(exact, 1.0)
+            for term in expansions.get(token, ()):
+                for item_id in index.term_ids(term, since) - exact:
+                    weight[item_id] = settings.MATCH_FUZZY_DISCOUNT
+            total = weight if total is None else {i: total[i] + w for i, w in weight.items() if i in total}
+        return {item_id: w / len(query_tokens) for item_id, w in total.items()}
+
+    @staticmethod
+    def _named_types(index, query_lower, query_code, since) -> Set[str]:
+        """Unclaimed items of a type the query names, by category or by the type's text."""
+        found = index.type_ids(lambda name: query_lower in name, since)
+        if query_code:
+            found |= index.block_ids(type_key(query_code), since)
+        return found
+
+    async def category_facets(self, include_claimed: bool = False) -> List[CategoryFacet]:
+        """Item counts per taxonomy category, grouped on the stored integer codes."""
+        counts = await self.item_repository.count_by_type_code(include_claimed)
+        totals = {}
+        for code, count in counts.items():
+            for ancestor in ancestors(code):
+                totals[ancestor] = totals.get(ancestor, 0) + count
+
+        facets = [
+            CategoryFacet(code=code, name=category_name(code), parent=parent_code(code),
+                          count=counts.get(code, 0), total=total)
+            for code, total in sorted(totals.items())
+        ]
+        if counts.get(UNKNOWN):
+            facets.append(CategoryFacet(code=UNKNOWN, name=None, parent=None,
+                                        count=counts[UNKNOWN], total=counts[UNKNOWN]))
+        return facets
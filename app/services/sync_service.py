@@ -0,0 +1,133 @@
+from typing import Optional, Dict, List
+import logging
+
+from app.core.config import settings
+from app.models.sync import SyncResponse
+from app.models.item import ItemModel, ItemResponse
+from app.models.claim import ClaimModel, ClaimResponse
+from app.models.message import MessageResponse, ConversationResponse
+from app.repositories.change_repository import ChangeRepo
+from app.repositories.item_repository import ItemRepo
+from app.repositories.image_repository import ImageRepo
+from app.repositories.claim_repository import ClaimRepo
+from app.repositories.match_repository import MatchRepo
+from app.repositories.message_repository import MessageRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SyncService:
+    """
+    Delta sync: returns only what changed for a user since a change-log cursor.
+    """
+
+    def __init__(self,
+                 change_repo: ChangeRepo,
+                 item_repo: ItemRepo,
+                 image_repo: ImageRepo,
+                 claim_repo: ClaimRepo,
+                 match_repo: MatchRepo,
+                 message_repo: MessageRepository):
+        self.change_repository = change_repo
+        self.item_repository = item_repo
+        self.image_repository = image_repo
+        self.claim_repository = claim_repo
+        self.match_repository = match_repo
+        self.message_repository = message_repo
+
+    async def get_changes(self, user_id: str, since: Optional[int], limit: int = None) -> SyncResponse:
+        limit = min(limit or settings.SYNC_MAX_CHANGES, settings.SYNC_MAX_CHANGES)
+
+        # No cursor yet: the client is about to do a full fetch, hand it the current head
+        if since is None:
+            return SyncResponse(cursor=await self.change_repository.get_head_seq())
+
+        # Never hand out a cursor past an entry that is still being written
+        head = await self.change_repository.get_head_seq()
+        committed = await self.change_repository.get_watermark(head)
+        if committed < since:
+            # A cursor from a worker whose watermark got further than this one's
+            committed = await self.change_repository.get_committed_seq(since)
+
+        # Entries after the cursor are gone although the log is readable past
+        # them; a hole still being written at since + 1 holds the watermark back
+        oldest = await self.change_repository.get_oldest_seq()
+        if since < committed and (oldest is None or oldest > since + 1):
+            return SyncResponse(cursor=committed, reset=True)
+
+        changes = await self.change_repository.get_changes_since(user_id, since, limit, until=committed)
+        # The scan stopped at its limit rather than at the end of the log
+        scan_full = committed - since >= settings.SYNC_SCAN_LIMIT
+        if not changes:
+            # Nothing for this user, but the scanned entries are done with: an
+            # idle user's cursor keeps up with the log instead of expiring
+            return SyncResponse(cursor=committed, has_more=scan_full)
+
+        # Last operation per entity wins
+        latest: Dict[tuple, str] = {}
+        for change in changes:
+            latest[(change["entity"], change["entity_id"])] = change["op"]
+
+        upserts: Dict[str, List[str]] = {}
+        deleted: Dict[str, List[str]] = {}
+        for (entity, entity_id), op in latest.items():
+            target = deleted if op == "delete" else upserts
+            target.setdefault(entity, []).append(entity_id)
+
+        page_full = len(changes) == limit
+        response = SyncResponse(
+            cursor=changes[-1]["seq"] if page_full else committed,
+            has_more=page_full or scan_full,
+        )
+        await self._hydrate(response, upserts, deleted)
+        response.deleted = deleted
+        return response
+
+    async def _hydrate(self, response: SyncResponse, upserts: Dict[str, List[str]], deleted: Dict[str, List[str]]):
+        item_ids = upserts.get("item", [])
+        if item_ids:
+            docs = await self.item_repository.get_items_by_ids(item_ids)
+            images = await self.image_repository.get_images_for_items([d["item_id"] for d in docs])
+            for doc in docs:
+                doc["_id"] = str(doc["_id"])
+                doc["images"] = images.get(doc["item_id"], [])
+                try:
+                    response.items.append(ItemResponse.from_model(ItemModel.model_validate(doc)))
+                except Exception as e:
+                    logger.error(f"Error parsing item document {doc.get('item_id')}: {e}")
+            self._mark_missing(deleted, "item", item_ids, {i.item_id for i in response.items})
+
+        claim_ids = upserts.get("claim", [])
+        if claim_ids:
+            docs = await self.claim_repository.get_claims_by_ids(claim_ids)
+            for doc in docs:
+                doc["_id"] = str(doc["_id"])
+                response.claims.append(ClaimResponse.from_model(ClaimModel(**doc)))
+            self._mark_missing(deleted, "claim", claim_ids, {c.claim_id for c in response.claims})
+
+        match_keys = upserts.get("match", [])
+        if match_keys:
+            pairs = [tuple(key.split(":", 1)) for key in match_keys]
+            docs = await self.match_repository.get_matches_by_pairs(pairs)
+            for doc in docs:
+                doc["_id"] = str(doc["_id"])
+                response.matches.append(doc)
+            found = {f"{d['item_id_a']}:{d['item_id_b']}" for d in docs}
+            self._mark_missing(deleted, "match", match_keys, found)
+
+        message_ids = upserts.get("message", [])
+        if message_ids:
+            messages = await self.message_repository.get_messages_by_ids(message_ids)
+            response.messages = [MessageResponse.from_domain(m) for m in messages]
+
+        conversation_ids = upserts.get("conversation", [])
+        if conversation_ids:
+            conversations = await self.message_repository.get_conversations_by_ids(conversation_ids)
+            response.conversations = [ConversationResponse.from_domain(c) for c in conversations]
+
+    @staticmethod
+    def _mark_missing(deleted: Dict[str, List[str]], entity: str, wanted: List[str], found: set):
+        # Upserted and then removed by a change beyond this page
+        missing = [i for i in wanted if i not in found]
+        if missing:
+            deleted.setdefault(entity, []).extend(missing)
@@ -0,0 +1,570 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.repositories.change_repository import ChangeRepo, PUBLIC
+from app.repositories.item_repository import ItemRepo
+from app.utils.lazy import lazy_module
+from app.utils.snapshot import load_snapshot, write_snapshot
+from app.utils.taxonomy import item_type_code, type_key
+from app.utils.text import TOKENIZER_VERSION, tokenize
+from app.utils.trigram import MIN_TERM_LENGTH, TrigramIndex, trigrams
+
+np = lazy_module("numpy")
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+# created_at of undated items in the base arrays; sorts before every date
+_NO_DATE = -2 ** 63
+
+
+def _desc_tokens(doc: dict) -> FrozenSet[str]:
+    tokens = doc.get("desc_tokens")
+    return frozenset(tokens if tokens is not None else tokenize(doc.get("desc", "")))
+
+
+def _micros(at: Optional[datetime]) -> int:
+    return _NO_DATE if at is None else (at - _EPOCH) // _MICROSECOND
+
+
+def _strings(values: Iterable[str]) -> np.ndarray:
+    values = list(values)
+    return np.array(values, dtype=f"U{max([len(v) for v in values] + [1])}")
+
+
+def _ragged(lists: List[List]) -> Tuple[List, np.ndarray]:
+    """Concatenated values and the (n + 1) offsets splitting them back into lists."""
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(values) for values in lists])
+    return [v for values in lists for v in values], offsets
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, n_keys: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Offsets and values grouped by key; a stable sort keeps each group in the values' order."""
+    offsets = np.zeros(n_keys + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(keys, minlength=n_keys))
+    return offsets, values[np.argsort(keys, kind="stable")].astype(np.int32)
+
+
+def _block_key(block) -> str:
+    return repr(block)  # root codes and off-taxonomy texts stay distinct
+
+
+def month_of(at: Optional[datetime]) -> Optional[int]:
+    """Posting bucket of a created_at: months since year 0, None for undated items."""
+    return at.year * 12 + at.month - 1 if at is not None else None
+
+
+class _IndexedItem(NamedTuple):
+    tokens: FrozenSet[str]
+    type_code: int
+    type: str
+    post_type: str
+    user_id: str
+    duplicate_of: FrozenSet[str]
+    created_at: Optional[datetime]
+
+    @property
+    def block(self):
+        return type_key(self.type_code, self.type)
+
+
+def _entry(doc: dict) -> Optional[_IndexedItem]:
+    return None if doc.get("is_claimed") else index_entry(doc)
+
+
+def index_entry(doc: dict) -> _IndexedItem:
+    """The fields the index keeps for an item document (one with _MATCH_PROJECTION's fields)."""
+    code = doc.get("type_code")
+    if code is None:
+        code = item_type_code(doc.get("type", ""), doc.get("desc", ""))
+    return _IndexedItem(
+        tokens=_desc_tokens(doc),
+        type_code=code,
+        type=doc.get("type", ""),
+        post_type=doc.get("post_type", ""),
+        user_id=doc.get("user_id"),
+        duplicate_of=frozenset(doc.get("duplicate_of") or []),
+        created_at=doc.get("created_at")
+    )
+
+
+class _Base:
+    """
+    Read-only CSR form of the index as of one load: rows are items in
+    created_at order (undated first), and term, block and trigram postings
+    are offsets into ascending row (or term) numbers. A posting's slice of
+    rows is therefore also in date order, so a created_at window is two
+    np.searchsorted calls. Attached from a snapshot, every array is
+    memory-mapped and shared by the workers on the host.
+    """
+
+    ARRAYS = ("item_ids", "type_codes", "types", "post_types", "user_ids", "created_at",
+              "token_offsets", "token_ids", "duplicate_offsets", "duplicate_ids",
+              "sorted_item_ids", "sorted_rows", "vocab", "posting_offsets", "posting_rows",
+              "blocks", "block_offsets", "block_rows", "type_names", "type_offsets", "type_rows",
+              "grams", "gram_offsets", "gram_terms")
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        for key in self.ARRAYS:
+            setattr(self, key, arrays[key])
+        self.n = len(self.item_ids)
+        self.n_undated = int(np.searchsorted(self.created_at, _NO_DATE, side="right"))
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, _IndexedItem]]) -> "_Base":
+        entries = sorted(entries, key=lambda kv: (_micros(kv[1].created_at), kv[0]))
+        n = len(entries)
+        item_ids = _strings(item_id for item_id, _ in entries)
+        vocab = sorted({t for _, e in entries for t in e.tokens})
+        term_no = {term: i for i, term in enumerate(vocab)}
+        token_ids, token_offsets = _ragged([sorted(term_no[t] for t in e.tokens) for _, e in entries])
+        token_ids = np.array(token_ids, dtype=np.int32)
+        duplicate_ids, duplicate_offsets = _ragged([sorted(e.duplicate_of) for _, e in entries])
+
+        token_rows = np.repeat(np.arange(n, dtype=np.int32), np.diff(token_offsets))
+        posting_offsets, posting_rows = _csr(token_ids, token_rows, len(vocab))
+
+        row_blocks = [_block_key(e.block) for _, e in entries]
+        blocks = sorted(set(row_blocks))
+        block_no = {block: i for i, block in enumerate(blocks)}
+        block_offsets, block_rows = _csr(np.array([block_no[b] for b in row_blocks], dtype=np.int32),
+                                         np.arange(n, dtype=np.int32), len(blocks))
+
+        row_types = [(e.type or "").lower() for _, e in entries]
+        type_names = sorted(set(row_types))
+        type_no = {name: i for i, name in enumerate(type_names)}
+        type_offsets, type_rows = _csr(np.array([type_no[t] for t in row_types], dtype=np.int32),
+                                       np.arange(n, dtype=np.int32), len(type_names))
+
+        pairs = sorted((gram, i) for i, term in enumerate(vocab) if len(term) >= MIN_TERM_LENGTH
+                       for gram in trigrams(term))
+        grams = sorted({gram for gram, _ in pairs})
+        gram_no = {gram: i for i, gram in enumerate(grams)}
+        gram_offsets, gram_terms = _csr(np.array([gram_no[g] for g, _ in pairs], dtype=np.int32),
+                                        np.array([i for _, i in pairs], dtype=np.int32), len(grams))
+
+        order = np.argsort(item_ids, kind="stable")
+        return cls({
+            "item_ids": item_ids,
+            "type_codes": np.array([e.type_code for _, e in entries], dtype=np.int32),
+            "types": _strings(e.type or "" for _, e in entries),
+            "post_types": _strings(e.post_type or "" for _, e in entries),
+            "user_ids": _strings(e.user_id or "" for _, e in entries),
+            "created_at": np.array([_micros(e.created_at) for _, e in entries], dtype=np.int64),
+            "token_offsets": token_offsets,
+            "token_ids": token_ids,
+            "duplicate_offsets": duplicate_offsets,
+            "duplicate_ids": _strings(duplicate_ids),
+            "sorted_item_ids": item_ids[order],
+            "sorted_rows": order.astype(np.int32),
+            "vocab": _strings(vocab),
+            "posting_offsets": posting_offsets,
+            "posting_rows": posting_rows,
+            "blocks": _strings(blocks),
+            "block_offsets": block_offsets,
+            "block_rows": block_rows,
+            "type_names": _strings(type_names),
+            "type_offsets": type_offsets,
+            "type_rows": type_rows,
+            "grams": _strings(grams),
+            "gram_offsets": gram_offsets,
+            "gram_terms": gram_terms,
+        })
+
+    @staticmethod
+    def _find(sorted_keys: np.ndarray, key: str) -> Optional[int]:
+        i = int(np.searchsorted(sorted_keys, key))
+        return i if i < len(sorted_keys) and sorted_keys[i] == key else None
+
+    def row_of(self, item_id: str) -> Optional[int]:
+        i = self._find(self.sorted_item_ids, item_id)
+        return None if i is None else int(self.sorted_rows[i])
+
+    def entry(self, row: int) -> _IndexedItem:
+        created_at = int(self.created_at[row])
+        return _IndexedItem(
+            tokens=frozenset(self.vocab[self.token_ids[self.token_offsets[row]:self.token_offsets[row + 1]]].tolist()),
+            type_code=int(self.type_codes[row]),
+            type=str(self.types[row]),
+            post_type=str(self.post_types[row]),
+            user_id=str(self.user_ids[row]) or None,
+            duplicate_of=frozenset(
+                self.duplicate_ids[self.duplicate_offsets[row]:self.duplicate_offsets[row + 1]].tolist()),
+            created_at=None if created_at == _NO_DATE else _EPOCH + created_at * _MICROSECOND,
+        )
+
+    def term_tokens(self, row: int) -> List[str]:
+        return self.vocab[self.token_ids[self.token_offsets[row]:self.token_offsets[row + 1]]].tolist()
+
+    def term_count(self, term: str) -> int:
+        i = self._find(self.vocab, term)
+        return 0 if i is None else int(self.posting_offsets[i + 1] - self.posting_offsets[i])
+
+    def term_rows(self, term: str) -> np.ndarray:
+        i = self._find(self.vocab, term)
+        return self.posting_rows[:0] if i is None else \
+            self.posting_rows[self.posting_offsets[i]:self.posting_offsets[i + 1]]
+
+    def block_rows_of(self, block) -> np.ndarray:
+        i = self._find(self.blocks, _block_key(block))
+        return self.block_rows[:0] if i is None else self.block_rows[self.block_offsets[i]:self.block_offsets[i + 1]]
+
+    def type_rows_where(self, match: Callable[[str], bool]) -> np.ndarray:
+        """Rows (ascending) whose lower-cased type text satisfies match; one call per distinct type."""
+        slices = [self.type_rows[self.type_offsets[i]:self.type_offsets[i + 1]]
+                  for i, name in enumerate(self.type_names.tolist()) if match(name)]
+        return np.sort(np.concatenate(slices)) if slices else self.type_rows[:0]
+
+    def gram_terms_of(self, gram: str) -> List[str]:
+        i = self._find(self.grams, gram)
+        return [] if i is None else self.vocab[self.gram_terms[self.gram_offsets[i]:self.gram_offsets[i + 1]]].tolist()
+
+    def window(self, rows: np.ndarray, start: Optional[datetime], end: Optional[datetime]) -> np.ndarray:
+        """The rows (ascending) posted between start and end; undated rows are never windowed out."""
+        if start is None and end is None:
+            return rows
+        lo = self.n_undated if start is None else \
+            max(int(np.searchsorted(self.created_at, _micros(start), side="left")), self.n_undated)
+        hi = self.n if end is None else int(np.searchsorted(self.created_at, _micros(end), side="right"))
+        undated = int(np.searchsorted(rows, self.n_undated))
+        return np.concatenate([rows[:undated], rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]])
+
+
+class _GramSource:
+    # The base's trigram postings in the shape TrigramIndex expects
+    def __init__(self, base: _Base):
+        self.gram_terms = base.gram_terms_of
+
+
+class _Items(Mapping):
+    """item id -> _IndexedItem over the overlay and the base rows still live."""
+
+    def __init__(self, index: "_TermIndex"):
+        self.index = index
+
+    def __getitem__(self, item_id: str) -> _IndexedItem:
+        index = self.index
+        entry = index.overlay.get(item_id)
+        if entry is not None:
+            return entry
+        row = index.base.row_of(item_id)
+        if row is None or row in index.dead:
+            raise KeyError(item_id)
+        return index.base.entry(row)
+
+    def __iter__(self) -> Iterator[str]:
+        index = self.index
+        yield from index.overlay
+        for row, item_id in enumerate(index.base.item_ids.tolist()):
+            if row not in index.dead:
+                yield item_id
+
+    def __len__(self) -> int:
+        # An overlay item's base row, if any, is always dead
+        return len(self.index.overlay) + self.index.base.n - len(self.index.dead)
+
+
+class _TermIndex:
+    """
+    Per-worker inverted index over unclaimed items: description term and type
+    block (root category) -> item ids by posting date, and a trigram index
+    over the term vocabulary for typo-tolerant lookups. Lookups take a
+    created_at range and only touch the dates inside it, so old history is
+    never scanned. Kept current by replaying item entries from the change
+    log, so edits made through other workers show up as well.
+
+    The bulk of the index is a read-only _Base, memory-mapped from the
+    latest snapshot when there is one (built from a full load otherwise).
+    Items changed since then live in a small in-memory overlay (term and
+    block -> month -> ids, as the base's rows cannot change), and their
+    base rows are marked dead.
+    """
+
+    SNAPSHOT_NAME = "term_index"
+
+    def __init__(self):
+        self._reset(_Base.build([]))
+        self.cursor: Optional[int] = None
+        self.refreshed_at = 0.0  # time.monotonic() when the last refresh started
+        self.lock = asyncio.Lock()
+
+    def _reset(self, base: _Base):
+        self.base = base
+        self.dead: Set[int] = set()  # base rows removed or replaced since the base was built
+        self.dead_frequency: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[Optional[int], Set[str]]] = {}
+        self.frequency: Dict[str, int] = {}
+        self.by_block: Dict[object, Dict[Optional[int], Set[str]]] = {}
+        self.by_month: Dict[Optional[int], Set[str]] = {}
+        self.overlay: Dict[str, _IndexedItem] = {}
+        self.trigrams = TrigramIndex(_GramSource(base), live=lambda term: self.term_frequency(term) > 0)
+        self.items = _Items(self)
+
+    def term_frequency(self, term: str) -> int:
+        """Live items containing term."""
+        return self.base.term_count(term) - self.dead_frequency.get(term, 0) + self.frequency.get(term, 0)
+
+    def _vocabulary_changed(self, term: str):
+        # Base terms never leave the base postings, they only stop being live
+        if self.base.term_count(term):
+            self.trigrams.invalidate(term)
+        elif self.frequency.get(term):
+            self.trigrams.add(term)
+        else:
+            self.trigrams.remove(term)
+
+    def _kill_base_row(self, item_id: str):
+        row = self.base.row_of(item_id)
+        if row is None or row in self.dead:
+            return
+        self.dead.add(row)
+        for term in self.base.term_tokens(row):
+            self.dead_frequency[term] = self.dead_frequency.get(term, 0) + 1
+            if not self.term_frequency(term):
+                self._vocabulary_changed(term)
+
+    def _remove(self, item_id: str):
+        self._kill_base_row(item_id)
+        old = self.overlay.pop(item_id, None)
+        if old is None:
+            return
+        month = month_of(old.created_at)
+        for term in old.tokens:
+            _discard(self.postings[term], month, item_id)
+            self.frequency[term] -= 1
+            if not self.frequency[term]:
+                del self.postings[term], self.frequency[term]
+                if not self.term_frequency(term):
+                    self._vocabulary_changed(term)
+        _discard(self.by_block[old.block], month, item_id)
+        _discard(self.by_month, month, item_id)
+
+    def _add(self, doc: dict):
+        entry = _entry(doc)
+        if entry is not None:
+            self._insert(doc["item_id"], entry)
+
+    def _insert(self, item_id: str, entry: _IndexedItem):
+        self._kill_base_row(item_id)
+        month = month_of(entry.created_at)
+        self.overlay[item_id] = entry
+        for term in entry.tokens:
+            appeared = not self.term_frequency(term)
+            if term not in self.postings:
+                self.postings[term], self.frequency[term] = {}, 0
+            self.postings[term].setdefault(month, set()).add(item_id)
+            self.frequency[term] += 1
+            if appeared:
+                self._vocabulary_changed(term)
+        self.by_block.setdefault(entry.block, {}).setdefault(month, set()).add(item_id)
+        self.by_month.setdefault(month, set()).add(item_id)
+
+    def _fresh(self, max_age: float) -> bool:
+        return self.cursor is not None and time.monotonic() - self.refreshed_at < max_age
+
+    async def refresh(self, item_repo: ItemRepo, change_repo: ChangeRepo, max_age: float = 0.0):
+        """Replay the change log, unless the last refresh started less than max_age seconds ago."""
+        if self._fresh(max_age):
+            return
+        async with self.lock:
+            # Requests queued behind a refresh are served by it
+            if self._fresh(max_age):
+                return
+            started = time.monotonic()
+            await self._refresh(item_repo, change_repo)
+            self.refreshed_at = started
+
+    async def _refresh(self, item_repo: ItemRepo, change_repo: ChangeRepo):
+        if self.cursor is not None:
+            oldest = await change_repo.get_oldest_seq()
+            if oldest is not None and oldest > self.cursor + 1:
+                logger.info("Change log compacted past the term index cursor; rebuilding")
+                self.cursor = None
+
+        if self.cursor is None:
+            # Read the head first: changes racing the full load are replayed next time
+            head = await change_repo.get_head_seq()
+            docs = await item_repo.list_match_candidates()
+            self._reset(_Base.build((doc["item_id"], entry) for doc in docs
+                                    if (entry := _entry(doc)) is not None))
+            self.cursor = head
+            return
+
+        limit = settings.SYNC_MAX_CHANGES
+        committed = await change_repo.get_committed_seq(self.cursor)
+        while True:
+            changes = await change_repo.get_changes_since(PUBLIC, self.cursor, limit, entity="item",
+                                                          until=committed)
+            if changes:
+                item_ids = list({c["entity_id"] for c in changes})
+                docs = await item_repo.get_items_by_ids(item_ids)
+                for item_id in item_ids:
+                    self._remove(item_id)
+                for doc in docs:
+                    self._add(doc)
+                self.cursor = changes[-1]["seq"]
+            if len(changes) < limit:
+                # Entries for other entities up to `committed` need no replay
+                self.cursor = committed
+                break
+
+    def export(self) -> Dict[str, np.ndarray]:
+        """Arrays for a snapshot: the base with the overlay folded in."""
+        if not self.overlay and not self.dead:
+            return self.base.arrays
+        return _Base.build(self.items.items()).arrays
+
+    def attach(self, snapshot) -> bool:
+        """Map a snapshot as the base; the next refresh replays the change log after its seq."""
+        meta = snapshot.meta
+        if meta.get("tokenizer_version") != TOKENIZER_VERSION or meta.get("db") != settings.DB_NAME:
+            logger.warning(f"Ignoring {snapshot}: written for another tokenizer or database")
+            return False
+        if set(_Base.ARRAYS) - set(snapshot.arrays):
+            logger.warning(f"Ignoring {snapshot}: written by an older layout")
+            return False
+        self._reset(_Base(snapshot.arrays))
+        self.cursor = meta["seq"]
+        self.refreshed_at = 0.0
+        logger.info(f"Attached term index snapshot v{snapshot.version} ({self.base.n} items, seq {self.cursor})")
+        return True
+
+    def expand(self, term: str) -> List[Tuple[str, float]]:
+        """
+        Likely intended spellings of term. A term that is itself in the
+        vocabulary only expands to more common ones: "wallett" -> "wallet",
+        never the other way round.
+        """
+        expansions = self.trigrams.expand(term)
+        frequency = self.term_frequency(term)
+        if frequency:
+            expansions = [(t, sim) for t, sim in expansions if self.term_frequency(t) > frequency]
+        return expansions
+
+    def _window(self, buckets: Dict[Optional[int], Set[str]],
+                start: Optional[datetime], end: Optional[datetime]) -> Set[str]:
+        # Overlay lookups, by month bucket
+        if start is None and end is None:
+            return set().union(*buckets.values())
+        found = set(buckets.get(None, ()))  # undated legacy items are never windowed out
+        dated = [m for m in buckets if m is not None]
+        if not dated:
+            return found
+        first = month_of(start) if start is not None else min(dated)
+        last = month_of(end) if end is not None else max(dated)
+        for month in range(first, last + 1):
+            ids = buckets.get(month)
+            if not ids:
+                continue
+            if month in (first, last):
+                # Edge months are only partly inside the range
+                ids = {i for i in ids if (start is None or self.overlay[i].created_at >= start)
+                       and (end is None or self.overlay[i].created_at <= end)}
+            found |= ids
+        return found
+
+    def _base_ids(self, rows: np.ndarray, start: Optional[datetime], end: Optional[datetime]) -> Set[str]:
+        rows = self.base.window(rows, start, end)
+        if self.dead and len(rows):
+            rows = rows[~np.isin(rows, np.fromiter(self.dead, dtype=np.int64, count=len(self.dead)))]
+        return set(self.base.item_ids[rows].tolist())
+
+    def term_ids(self, term: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Set[str]:
+        """Items containing term, posted between start and end."""
+        return self._base_ids(self.base.term_rows(term), start, end) | \
+            self._window(self.postings.get(term, {}), start, end)
+
+    def block_ids(self, block=None, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Set[str]:
+        """Items in a type block (every block if None), posted between start and end."""
+        if block is None:
+            rows, buckets = np.arange(self.base.n, dtype=np.int32), self.by_month
+        else:
+            rows, buckets = self.base.block_rows_of(block), self.by_block.get(block, {})
+        return self._base_ids(rows, start, end) | self._window(buckets, start, end)
+
+    def type_ids(self, match: Callable[[str], bool], start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> Set[str]:
+        """Items whose lower-cased type text satisfies match, posted between start and end."""
+        return self._base_ids(self.base.type_rows_where(match), start, end) | {
+            item_id for item_id, entry in self.overlay.items()
+            if match((entry.type or "").lower()) and (entry.created_at is None or (
+                (start is None or entry.created_at >= start) and (end is None or entry.created_at <= end)))
+        }
+
+    def expand_keywords(self, keywords: Iterable[str]) -> Dict[str, Set[str]]:
+        return {k: {term for term, _ in self.expand(k)} for k in keywords}
+
+
+def _discard(buckets: Dict[Optional[int], Set[str]], month: Optional[int], item_id: str):
+    ids = buckets.get(month)
+    if ids is not None:
+        ids.discard(item_id)
+        if not ids:
+            del buckets[month]
+
+
+def fuzzy_hits(keywords: Set[str], expansions: Dict[str, Set[str]], tokens: Iterable[str]) -> Dict[str, Set[str]]:
+    """Keywords missing from tokens that one of their expansions covers, with those terms."""
+    tokens = set(tokens)
+    hits = {}
+    for keyword in keywords:
+        if keyword not in tokens:
+            covered = expansions.get(keyword, set()) & tokens
+            if covered:
+                hits[keyword] = covered
+    return hits
+
+
+_index: Optional[_TermIndex] = None
+
+
+def _term_index() -> _TermIndex:
+    # Built on first use: its empty base arrays would otherwise load numpy at import
+    global _index
+    if _index is None:
+        _index = _TermIndex()
+    return _index
+
+
+async def get_term_index(item_repo: ItemRepo, change_repo: ChangeRepo,
+                         max_age: Optional[float] = None) -> _TermIndex:
+    """
+    This worker's term index, brought up to date with the change log at most
+    once per max_age seconds (TERM_INDEX_REFRESH_SECONDS by default). Pass 0
+    to see a write that was just made.
+    """
+    if max_age is None:
+        max_age = settings.TERM_INDEX_REFRESH_SECONDS
+    index = _term_index()
+    await index.refresh(item_repo, change_repo, max_age)
+    return index
+
+
+def attach_snapshot() -> bool:
+    """Start this worker's term index from the current on-disk snapshot, if any."""
+    snapshot = load_snapshot(settings.MATCH_SNAPSHOT_DIR, _TermIndex.SNAPSHOT_NAME)
+    return snapshot is not None and _term_index().attach(snapshot)
+
+
+async def build_snapshot(item_repo: ItemRepo, change_repo: ChangeRepo):
+    """Load the term index from the database and write it as a new snapshot version."""
+    index = _TermIndex()
+    await index.refresh(item_repo, change_repo)
+    return write_snapshot(settings.MATCH_SNAPSHOT_DIR, _TermIndex.SNAPSHOT_NAME, index.export(),
+                          {"seq": index.cursor, "rows": len(index.items), "db": settings.DB_NAME,
+                           "tokenizer_version": TOKENIZER_VERSION})
+
+
+def reset_term_index():
+    """Drop this worker's term index, e.g. after switching databases; the next lookup rebuilds it."""
+    global _index
+    _index = None
@@ -0,0 +1,4 @@
+"""
+Operational commands run by hand, never on import, e.g.
+`python -m app.tools.migrate_storage`.
+"""
@@ -0,0 +1,263 @@
+"""
+Copy every object from the old MinIO bucket into R2.
+
+    python -m app.tools.migrate_storage [--source-endpoint http://localhost:9000] [--source-bucket lost-and-found]
+                                        [--dest-endpoint <R2_ENDPOINT>] [--dest-bucket <R2_BUCKET_NAME>]
+                                        [--dest-region auto]
+                                        [--prefix ""] [--workers 16] [--part-size-mb 8]
+                                        [--checkpoint migrate_storage.json] [--restart] [--dry-run]
+
+Credentials come from the environment: MINIO_ROOT_USER / MINIO_ROOT_PASSWORD
+for the source, R2_ACCESS_KEY / R2_SECRET_KEY for the destination.
+
+Listings are paginated, and --workers threads each stream one object from
+its GET into the destination upload in --part-size-mb chunks (multipart
+above that size), so memory stays near workers x part size whatever the
+objects weigh. An object already at the destination with the same size and
+ETag is skipped; multipart copies get a different ETag, so the source ETag
+is also kept in their metadata and compared. An interrupted run can simply
+be started again.
+
+To spare the re-checks, the checkpoint file records the last key up to
+which every object is done, and a rerun lists from there (--restart lists
+from the start). A failed object holds the checkpoint back and is retried
+by the next run; the exit status is 1 when any failed. Throughput is logged
+every --progress-seconds and at the end.
+
+To try it against two local MinIO stand-ins (the second one plays R2):
+
+    docker compose --profile migration up minio minio-target
+    R2_ENDPOINT=http://localhost:9100 R2_ACCESS_KEY=$MINIO_ROOT_USER R2_SECRET_KEY=$MINIO_ROOT_PASSWORD \\
+        python -m app.tools.migrate_storage --dest-bucket lost-and-found --dest-region us-east-1
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Object metadata key holding the source ETag on the destination copy
+SOURCE_ETAG = "source-etag"
+# Response headers of the GET carried over to the upload
+_CARRIED = ("CacheControl", "ContentDisposition", "ContentEncoding", "ContentLanguage", "ContentType")
+
+
+@dataclass
+class Stats:
+    listed: int = 0
+    copied: int = 0
+    skipped: int = 0
+    failed: int = 0
+    bytes_copied: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        done = self.copied + self.skipped
+        return (f"{done}/{self.listed} done ({self.copied} copied, {self.skipped} skipped, {self.failed} failed), "
+                f"{done / elapsed:.1f} objects/s, {self.bytes_copied / elapsed / 2 ** 20:.2f} MB/s copied, "
+                f"{elapsed:.0f} s")
+
+
+class _Watermark:
+    """Keys in listing order; `key` is the last one before the first not yet done."""
+
+    def __init__(self, key: Optional[str]):
+        self.key = key
+        self.pending = deque()  # [key, done]
+
+    def add(self, key: str) -> list:
+        entry = [key, False]
+        self.pending.append(entry)
+        return entry
+
+    def done(self, entry: list):
+        entry[1] = True
+        while self.pending and self.pending[0][1]:
+            self.key = self.pending.popleft()[0]
+
+
+def _etag(value: str) -> str:
+    return (value or "").strip('"')
+
+
+def load_checkpoint(path: str, identity: dict) -> Optional[str]:
+    """The key to list after, or None to start from the beginning."""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state.get("identity") != identity:
+        raise SystemExit(f"{path} belongs to another migration ({state.get('identity')}); pass --restart "
+                         f"or another --checkpoint")
+    return state.get("after")
+
+
+def save_checkpoint(path: str, identity: dict, after: Optional[str], stats: Stats):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"identity": identity, "after": after,
+                   "stats": {k: v for k, v in asdict(stats).items() if k != "started"}}, f)
+    os.replace(tmp, path)
+
+
+def already_copied(dest, bucket: str, key: str, etag: str, size: int) -> bool:
+    try:
+        head = dest.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+    if head["ContentLength"] != size:
+        return False
+    return etag in (_etag(head.get("ETag")), head.get("Metadata", {}).get(SOURCE_ETAG))
+
+
+def copy_object(source, source_bucket: str, dest, dest_bucket: str, obj: dict, transfer: TransferConfig,
+                dry_run: bool = False) -> int:
+    """Copy one listed object unless it is already there; returns the bytes copied, or -1 when skipped."""
+    key, etag, size = obj["Key"], _etag(obj["ETag"]), obj["Size"]
+    if already_copied(dest, dest_bucket, key, etag, size):
+        return -1
+    if dry_run:
+        return size
+    # IfMatch pins the GET to the version that was listed and compared
+    response = source.get_object(Bucket=source_bucket, Key=key, IfMatch=obj["ETag"])
+    extra = {name: response[name] for name in _CARRIED if response.get(name)}
+    extra["Metadata"] = {**response.get("Metadata", {}), SOURCE_ETAG: etag}
+    with response["Body"] as body:
+        dest.upload_fileobj(body, dest_bucket, key, ExtraArgs=extra, Config=transfer)
+    return size
+
+
+def migrate(source, source_bucket: str, dest, dest_bucket: str, prefix: str = "", workers: int = 16,
+            part_size: int = 8 * 2 ** 20, checkpoint: Optional[str] = None, restart: bool = False,
+            dry_run: bool = False, progress_seconds: float = 10.0) -> Stats:
+    identity = {"source_bucket": source_bucket, "dest_bucket": dest_bucket, "prefix": prefix}
+    after = None if restart or not checkpoint else load_checkpoint(checkpoint, identity)
+    if after:
+        logger.info(f"Resuming after {after!r}")
+
+    # Parts are uploaded one at a time by the worker that read them: the pool is the concurrency
+    transfer = TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size, use_threads=False)
+    stats = Stats()
+    watermark = _Watermark(after)
+    failures = []
+    in_flight = {}
+    last_report = last_save = time.monotonic()
+
+    def settle(futures):
+        for future in futures:
+            obj, entry = in_flight.pop(future)
+            try:
+                copied = future.result()
+            except Exception as e:
+                stats.failed += 1
+                failures.append(obj["Key"])
+                logger.error(f"Failed to copy {obj['Key']}: {e}")
+                continue
+            if copied < 0:
+                stats.skipped += 1
+            else:
+                stats.copied += 1
+                stats.bytes_copied += copied
+            watermark.done(entry)
+
+    def tick():
+        nonlocal last_report, last_save
+        now = time.monotonic()
+        if now - last_report >= progress_seconds:
+            logger.info(stats.line())
+            last_report = now
+        if checkpoint and not dry_run and now - last_save >= 5:
+            save_checkpoint(checkpoint, identity, watermark.key, stats)
+            last_save = now
+
+    listing = {"Bucket": source_bucket, "Prefix": prefix}
+    if after:
+        listing["StartAfter"] = after
+    pages = source.get_paginator("list_objects_v2").paginate(**listing)
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="migrate") as pool:
+            for page in pages:
+                for obj in page.get("Contents", []):
+                    # Bounded backlog, so listing millions of keys does not queue millions of futures
+                    while len(in_flight) >= workers * 2:
+                        done, _ = wait(in_flight, timeout=progress_seconds, return_when=FIRST_COMPLETED)
+                        settle(done)
+                        tick()
+                    stats.listed += 1
+                    future = pool.submit(copy_object, source, source_bucket, dest, dest_bucket, obj, transfer, dry_run)
+                    in_flight[future] = (obj, watermark.add(obj["Key"]))
+            while in_flight:
+                done, _ = wait(in_flight, timeout=progress_seconds, return_when=FIRST_COMPLETED)
+                settle(done)
+                tick()
+    finally:
+        if checkpoint and not dry_run:
+            save_checkpoint(checkpoint, identity, watermark.key, stats)
+
+    logger.info(("Dry run: " if dry_run else "Migration finished: ") + stats.line())
+    if failures:
+        logger.error(f"{len(failures)} objects failed, first: {failures[:10]}; rerun to retry them")
+    return stats
+
+
+def _client(endpoint: Optional[str], access_key: Optional[str], secret_key: Optional[str], region: Optional[str],
+            pool_size: int):
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region,
+        config=Config(max_pool_connections=pool_size, retries={"max_attempts": 5, "mode": "adaptive"})
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the MinIO bucket into R2.")
+    parser.add_argument("--source-endpoint", default="http://localhost:9000")
+    parser.add_argument("--source-bucket", default=os.getenv("MINIO_BUCKET_NAME", "lost-and-found"))
+    parser.add_argument("--dest-endpoint", default=settings.R2_ENDPOINT)
+    parser.add_argument("--dest-bucket", default=settings.R2_BUCKET_NAME)
+    parser.add_argument("--dest-region", default="auto", help="R2 signs for 'auto'; MinIO for us-east-1")
+    parser.add_argument("--prefix", default="", help="only keys starting with this")
+    parser.add_argument("--workers", type=int, default=16, help="objects copied at once")
+    parser.add_argument("--part-size-mb", type=int, default=8, help="streaming chunk and multipart part size")
+    parser.add_argument("--checkpoint", default="migrate_storage.json")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and list from the start")
+    parser.add_argument("--dry-run", action="store_true", help="count what would be copied, copy nothing")
+    parser.add_argument("--progress-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if not args.dest_bucket:
+        parser.error("--dest-bucket (or R2_BUCKET_NAME) is required")
+
+    pool_size = args.workers + 4
+    source = _client(args.source_endpoint, os.getenv("MINIO_ROOT_USER"), os.getenv("MINIO_ROOT_PASSWORD"), None,
+                     pool_size)
+    dest = _client(args.dest_endpoint, settings.R2_ACCESS_KEY, settings.R2_SECRET_KEY, args.dest_region, pool_size)
+    stats = migrate(source, args.source_bucket, dest, args.dest_bucket, prefix=args.prefix, workers=args.workers,
+                    part_size=args.part_size_mb * 2 ** 20, checkpoint=args.checkpoint, restart=args.restart,
+                    dry_run=args.dry_run, progress_seconds=args.progress_seconds)
+    sys.exit(1 if stats.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
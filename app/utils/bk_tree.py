@@ -0,0 +1,72 @@
+from typing import Any, List, Tuple
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes under Hamming distance.
+    A radius query only descends into children whose edge distance is within
+    the triangle-inequality bound, so it visits a small part of the tree.
+    """
+
+    def __init__(self):
+        # node = [hash, values, {distance: child_node}]
+        self.root = None
+        self.size = 0
+
+    def add(self, h: int, value: Any):
+        self.size += 1
+        if self.root is None:
+            self.root = [h, [value], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, [value], {}]
+                return
+            node = child
+
+    def discard(self, values) -> int:
+        """
+        Drop every entry whose value is in values and return how many went.
+        Nodes stay in place as routing points for the hashes below them.
+        """
+        removed = 0
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            kept = [v for v in node[1] if v not in values]
+            removed += len(node[1]) - len(kept)
+            node[1] = kept
+            stack.extend(node[2].values())
+        self.size -= removed
+        return removed
+
+    def search(self, h: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """Return (distance, value) for every stored hash within max_distance of h."""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= max_distance:
+                found.extend((d, v) for v in node[1])
+            low, high = d - max_distance, d + max_distance
+            for edge, child in node[2].items():
+                if low <= edge <= high:
+                    stack.append(child)
+        found.sort(key=lambda x: x[0])
+        return found
+
+    def __len__(self):
+        return self.size
@@ -1,11 +1,40 @@
-import cv2 as cv
-from PIL import Image
+from app.utils.lazy import lazy_module
+from app.utils.visual_features import extract_features, pack_features
+
+cv = lazy_module("cv2")
+np = lazy_module("numpy")
+Image = lazy_module("PIL.Image")
+
+def dhash(img, hash_size=8) -> int:
+    # difference hash: sign of horizontal gradients on a (hash_size+1)x(hash_size) thumbnail
+    gray = cv.cvtColor(img, cv.COLOR_RGB2GRAY) if img.ndim == 3 else img
+    small = cv.resize(gray, (hash_size + 1, hash_size), interpolation=cv.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def _prepare(img, size):
+    rgb_img=cv.cvtColor(img, cv.COLOR_BGR2RGB)
+    return cv.resize(rgb_img, size, interpolation=cv.INTER_AREA) #resize
+
+def _signals(resized_img):
+    # content fingerprints computed from the already decoded pixels
+    return {
+        "phash": f"{dhash(resized_img):016x}",
+        "features": pack_features(extract_features(resized_img))
+    }
 
 def img_proc(path, size =(200, 200), quality=70):
     img=cv.imread(path)
-    rgb_img=cv.cvtColor(img, cv.COLOR_BGR2RGB)
-    resized_img = cv.resize(rgb_img, size, interpolation=cv.INTER_AREA) #resize
-    
+    resized_img = _prepare(img, size)
+
     pil_img = Image.fromarray(resized_img)
     pil_img.save(path, optimize=True, quality=quality) #compress
-    
+
+    return _signals(resized_img)
+
+def img_signals_from_bytes(content: bytes, size=(200, 200)):
+    """Decode an uploaded image in memory and compute the same signals as img_proc."""
+    img = cv.imdecode(np.frombuffer(content, dtype=np.uint8), cv.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image")
+    return _signals(_prepare(img, size))
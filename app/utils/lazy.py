@@ -0,0 +1,31 @@
+"""
+Deferred imports for heavy modules.
+
+OpenCV, numpy, Pillow and boto3 together take a few hundred milliseconds to
+import, and most requests a worker serves never touch them. Binding them
+with lazy_module keeps the `np.`/`cv.` spelling at the call sites while the
+real import happens on the first attribute lookup.
+
+Annotations such as `-> np.ndarray` are evaluated when a function is
+defined, so modules using lazy_module for a type they annotate with also
+need `from __future__ import annotations`.
+"""
+import importlib
+import types
+
+
+class _LazyModule(types.ModuleType):
+
+    def __getattr__(self, attr):
+        # Only called for names not yet copied onto the proxy
+        value = getattr(importlib.import_module(self.__name__), attr)
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self.__name__!r}>"
+
+
+def lazy_module(name: str) -> types.ModuleType:
+    """Stand-in for `import name` that imports on first use."""
+    return _LazyModule(name)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple, Union
+
+from app.utils.lazy import lazy_module
+from app.utils.taxonomy import type_credit_matrix
+from app.utils.visual_features import has_features, visual_similarity_matrix
+
+np = lazy_module("numpy")
+
+# Same weights and threshold as MatchService.run_automated_matching. Pair
+# scores are normalised to [0, 1] by the weight of the signals the pair has
+# (photos count only when both posts have some); the threshold is the 0.65
+# the scorer used on its type + keyword scale before photos were weighed in
+TYPE_WEIGHT = 0.5
+KEYWORD_WEIGHT = 0.4
+AUTO_MATCH_THRESHOLD = round(0.65 / (TYPE_WEIGHT + KEYWORD_WEIGHT), 4)
+# Search-only component and cut-off (MatchService.find_potential_matches)
+LOCATION_WEIGHT = 0.1
+SEARCH_MIN_SCORE = 0.5
+
+
+def match_window(at: Optional[datetime], window_days: int) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """created_at range of items comparable with one posted at `at`; (None, None) for no window."""
+    if not window_days or at is None:
+        return None, None
+    return at - timedelta(days=window_days), at + timedelta(days=window_days)
+
+
+def recency_factor(gap_days: Union[float, np.ndarray], half_life_days: float, window_days: int = 0):
+    """
+    Multiplier for a pair posted gap_days apart: 1.0 within the first day,
+    halving every half_life_days, and 0 outside the window. Gaps count whole
+    days, so a pair scored on the threshold still passes when posted minutes
+    apart.
+    """
+    gap = np.floor(np.abs(gap_days))
+    factor = np.exp2(-gap / half_life_days) if half_life_days else np.ones_like(gap, dtype=np.float64)
+    if window_days:
+        factor = np.where(gap > window_days, 0.0, factor)
+    return factor if isinstance(gap_days, np.ndarray) else float(factor)
+
+
+def days_between(a: Optional[datetime], b: Optional[datetime]) -> float:
+    """Days between two posts; undated legacy items count as the same day."""
+    if a is None or b is None:
+        return 0.0
+    return abs((a - b).total_seconds()) / 86400.0
+
+
+def normalize_score(raw, visual_weight: float, has_visual, type_weight: float = TYPE_WEIGHT,
+                    keyword_weight: float = KEYWORD_WEIGHT):
+    """Weighted sum of a pair (or an array of pairs) scaled to [0, 1]; has_visual is a bool or bool array."""
+    return raw / (type_weight + keyword_weight + visual_weight * np.asarray(has_visual, dtype=np.float64))
+
+
+def cross_type_reachable(visual_weight: float) -> bool:
+    """Whether a pair without type credit can pass the threshold on keywords and photos alone."""
+    return float(normalize_score(KEYWORD_WEIGHT + visual_weight, visual_weight, True)) >= AUTO_MATCH_THRESHOLD
+
+
+def _term_matrix(token_sets: List[Set[str]], vocab: dict) -> np.ndarray:
+    matrix = np.zeros((len(token_sets), len(vocab)), dtype=np.float32)
+    for row, tokens in enumerate(token_sets):
+        cols = [vocab[t] for t in tokens if t in vocab]
+        matrix[row, cols] = 1.0
+    return matrix
+
+
+def score_block(
+    tokens_a: List[Set[str]],
+    tokens_b: List[Set[str]],
+    features_a: np.ndarray,
+    features_b: np.ndarray,
+    type_credit: Union[float, np.ndarray] = 1.0,
+    visual_weight: float = 0.0,
+    type_weight: float = TYPE_WEIGHT,
+    keyword_weight: float = KEYWORD_WEIGHT,
+) -> np.ndarray:
+    """
+    Score every (a, b) pair of a block in one pass, shape (len(a), len(b)).
+    Mirrors the online scorer: type credit (a scalar or a per-pair matrix),
+    keyword overlap over the smaller description, plus the weighted visual
+    similarity, normalised with normalize_score. The weights default to the
+    production ones.
+    """
+    vocab = {}
+    for tokens in tokens_a:
+        for t in tokens:
+            vocab.setdefault(t, len(vocab))
+    ta = _term_matrix(tokens_a, vocab)
+    tb = _term_matrix(tokens_b, vocab)
+
+    # Counts are exact in float32; the ratios are taken in float64 like the
+    # online scorer so pairs sitting exactly on the threshold agree
+    overlap = (ta @ tb.T).astype(np.float64)
+    len_a = np.array([len(t) for t in tokens_a], dtype=np.float64)
+    len_b = np.array([len(t) for t in tokens_b], dtype=np.float64)
+    min_len = np.minimum.outer(len_a, len_b)
+    keyword = np.divide(overlap, min_len, out=np.zeros_like(overlap), where=min_len > 0)
+
+    scores = keyword_weight * keyword + type_weight * type_credit
+    has_visual = False
+    if visual_weight:
+        scores = scores + visual_weight * visual_similarity_matrix(features_a, features_b).astype(np.float64)
+        has_visual = np.logical_and.outer(has_features(features_a), has_features(features_b))
+    return normalize_score(scores, visual_weight, has_visual, type_weight, keyword_weight)
+
+
+def score_shard(shard: dict) -> Tuple[str, List[Tuple[str, str, float]]]:
+    """
+    Process-pool entry point: score one shard, apply the recency decay when
+    the shard carries posting days, and return the pairs at or above the
+    threshold as (id_a, id_b, score).
+    """
+    credit = 1.0 if shard["codes_a"] is None else type_credit_matrix(shard["codes_a"], shard["codes_b"])
+    scores = score_block(
+        shard["tokens_a"], shard["tokens_b"],
+        shard["features_a"], shard["features_b"],
+        type_credit=credit,
+        visual_weight=shard["visual_weight"],
+    )
+    if shard.get("days_a") is not None:
+        # Undated (NaN) items count as posted the same day, as online
+        gaps = np.nan_to_num(np.subtract.outer(shard["days_a"], shard["days_b"]), nan=0.0)
+        scores = scores * recency_factor(gaps, shard["half_life_days"], shard["window_days"])
+    threshold = shard.get("threshold", AUTO_MATCH_THRESHOLD)
+    rows, cols = np.nonzero(scores >= threshold)
+    ids_a, ids_b = shard["ids_a"], shard["ids_b"]
+    return shard["shard_id"], [
+        (ids_a[r], ids_b[c], round(float(scores[r, c]), 2)) for r, c in zip(rows, cols)
+    ]
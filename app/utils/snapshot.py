@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Optional
+import json
+import logging
+import os
+import shutil
+
+from app.utils.lazy import lazy_module
+
+np = lazy_module("numpy")
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+
+class Snapshot:
+    """A versioned set of read-only, memory-mapped arrays plus JSON metadata."""
+
+    def __init__(self, name: str, version: int, path: str, meta: dict, arrays: Dict[str, np.ndarray]):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.meta = meta
+        self.arrays = arrays
+
+    def __repr__(self) -> str:
+        return f"<Snapshot {self.name} v{self.version} at {self.path}>"
+
+
+def _pointer_path(root: str, name: str) -> str:
+    return os.path.join(root, f"{name}.current")
+
+
+def _snapshot_dir(root: str, name: str, version: int) -> str:
+    return os.path.join(root, f"{name}-v{version:06d}")
+
+
+def current_version(root: str, name: str) -> int:
+    try:
+        with open(_pointer_path(root, name)) as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def write_snapshot(root: str, name: str, arrays: Dict[str, np.ndarray], meta: dict, keep: int = 2) -> Snapshot:
+    """
+    Write arrays as .npy files into a new version directory, then atomically
+    repoint `<name>.current` at it. Workers still mapping an older version
+    keep their pages; only versions beyond `keep` are removed.
+    """
+    os.makedirs(root, exist_ok=True)
+    version = current_version(root, name) + 1
+    final = _snapshot_dir(root, name, version)
+    tmp = final + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    for key, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{key}.npy"), np.ascontiguousarray(arr), allow_pickle=False)
+    meta = {
+        **meta,
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "arrays": sorted(arrays),
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    os.replace(tmp, final)
+    pointer_tmp = _pointer_path(root, name) + ".tmp"
+    with open(pointer_tmp, "w") as f:
+        f.write(str(version))
+    os.replace(pointer_tmp, _pointer_path(root, name))
+
+    for old in range(version - keep, 0, -1):
+        old_dir = _snapshot_dir(root, name, old)
+        if not os.path.isdir(old_dir):
+            break
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info(f"Wrote snapshot {name} v{version} to {final}")
+    return load_snapshot(root, name)
+
+
+def load_snapshot(root: str, name: str) -> Optional[Snapshot]:
+    """Attach to the current snapshot version; arrays are mapped, not read."""
+    version = current_version(root, name)
+    if not version:
+        return None
+    path = _snapshot_dir(root, name, version)
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            logger.warning(f"Ignoring snapshot {path}: unsupported format {meta.get('format')}")
+            return None
+        arrays = {
+            key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r", allow_pickle=False)
+            for key in meta["arrays"]
+        }
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Could not load snapshot {path}: {e}")
+        return None
+    return Snapshot(name, version, path, meta, arrays)
@@ -0,0 +1,186 @@
+"""
+Canonical item categories.
+
+Free-text types ("Mobile", "smartphone", "power bank") map to a small integer
+code through a synonym table. Codes form a shallow hierarchy
+(electronics > phone) so a post filed under the parent category still earns
+partial credit against one filed under the child.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set
+import functools
+import re
+
+from app.utils.lazy import lazy_module
+
+np = lazy_module("numpy")
+
+UNKNOWN = 0
+# Credit for a pair where one category is an ancestor of the other
+PARENT_CREDIT = 0.5
+
+# code: (name, parent code, synonyms)
+CATEGORIES = {
+    1: ("electronics", None, ["electronic", "electronics", "gadget", "device"]),
+    2: ("phone", 1, ["phone", "mobile", "smartphone", "cellphone", "iphone", "android"]),
+    3: ("laptop", 1, ["laptop", "macbook", "chromebook"]),
+    4: ("tablet", 1, ["tablet", "ipad", "kindle"]),
+    5: ("headphones", 1, ["headphone", "headphones", "earphone", "earphones", "earbud", "earbuds",
+                          "airpods", "headset"]),
+    6: ("charger", 1, ["charger", "adapter", "adaptor", "cable", "powerbank"]),
+    7: ("calculator", 1, ["calculator"]),
+    8: ("pendrive", 1, ["pendrive", "usb", "flashdrive", "harddisk", "ssd"]),
+
+    10: ("accessories", None, ["accessory", "accessories"]),
+    11: ("watch", 10, ["watch", "smartwatch", "wristwatch"]),
+    12: ("glasses", 10, ["glasses", "spectacles", "sunglasses", "specs", "eyeglasses", "goggles"]),
+    13: ("jewellery", 10, ["jewellery", "jewelry", "ring", "necklace", "bracelet", "earring", "chain", "pendant"]),
+    14: ("umbrella", 10, ["umbrella"]),
+    15: ("wallet", 10, ["wallet", "purse", "cardholder"]),
+
+    20: ("bags", None, ["bag", "bags"]),
+    21: ("backpack", 20, ["backpack", "rucksack", "schoolbag"]),
+    22: ("handbag", 20, ["handbag", "tote", "sling"]),
+    23: ("pouch", 20, ["pouch", "pencilcase"]),
+
+    30: ("documents", None, ["document", "documents", "papers"]),
+    31: ("id card", 30, ["id", "idcard", "card", "license", "licence", "passport", "aadhar", "aadhaar"]),
+    32: ("certificate", 30, ["certificate", "marksheet"]),
+
+    40: ("keys", None, ["key", "keys", "keychain", "keyring"]),
+    50: ("bottle", None, ["bottle", "waterbottle", "flask", "tumbler", "sipper"]),
+
+    60: ("stationery", None, ["stationery", "stationary"]),
+    61: ("book", 60, ["book", "textbook", "notebook", "novel", "diary", "register"]),
+    62: ("pen", 60, ["pen", "pencil", "marker", "highlighter"]),
+
+    70: ("clothing", None, ["clothing", "clothes", "cloth", "apparel"]),
+    71: ("jacket", 70, ["jacket", "hoodie", "sweater", "sweatshirt", "coat", "blazer"]),
+    72: ("shoes", 70, ["shoe", "shoes", "sneakers", "slippers", "sandals", "footwear"]),
+    73: ("cap", 70, ["cap", "hat", "beanie"]),
+
+    80: ("sports", None, ["sports", "sport"]),
+    81: ("ball", 80, ["ball", "football", "basketball", "volleyball"]),
+    82: ("racket", 80, ["racket", "racquet", "bat"]),
+}
+
+_SYNONYMS: Dict[str, int] = {
+    synonym: code for code, (_, _, synonyms) in CATEGORIES.items() for synonym in synonyms
+}
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _ancestors(code: int) -> List[int]:
+    chain = []
+    while code:
+        chain.append(code)
+        code = CATEGORIES[code][1] or UNKNOWN
+    return chain
+
+
+_ANCESTORS = {code: _ancestors(code) for code in CATEGORIES}
+
+
+@functools.lru_cache(maxsize=None)
+def credit_matrix() -> np.ndarray:
+    # Dense credit table so blocks of pairs are scored with one fancy-indexing
+    # lookup; built on first use so importing the taxonomy does not load numpy
+    matrix = np.zeros((max(CATEGORIES) + 1, max(CATEGORIES) + 1), dtype=np.float32)
+    for a in CATEGORIES:
+        for b in CATEGORIES:
+            if a == b:
+                matrix[a, b] = 1.0
+            elif a in _ANCESTORS[b] or b in _ANCESTORS[a]:
+                matrix[a, b] = PARENT_CREDIT
+    return matrix
+
+
+def normalize_type(text: str) -> str:
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def _lookup(word: str) -> int:
+    code = _SYNONYMS.get(word)
+    if code is None and len(word) > 3 and word.endswith("s"):
+        code = _SYNONYMS.get(word[:-1])
+    return code or UNKNOWN
+
+
+def category_code(text: str) -> int:
+    """
+    Category of a free-text type. "power bank" is tried as "powerbank" first,
+    then words from the right, since the head noun usually comes last
+    ("water bottle", "id card").
+    """
+    words = _WORD.findall((text or "").lower())
+    if not words:
+        return UNKNOWN
+    code = _lookup("".join(words))
+    for word in reversed(words):
+        if code:
+            break
+        code = _lookup(word)
+    return code
+
+
+def categories_in_text(text: str) -> Set[int]:
+    """Every category named anywhere in a description."""
+    return {code for code in map(_lookup, _WORD.findall((text or "").lower())) if code}
+
+
+def item_type_code(item_type: str, desc: str = "") -> int:
+    """Code stored on an item: its type, or the only category its description names."""
+    code = category_code(item_type)
+    if not code:
+        named = categories_in_text(desc)
+        if len(named) == 1:
+            code = named.pop()
+    return code
+
+
+def category_name(code: int) -> Optional[str]:
+    category = CATEGORIES.get(code)
+    return category[0] if category else None
+
+
+def parent_code(code: int) -> Optional[int]:
+    category = CATEGORIES.get(code)
+    return category[1] if category else None
+
+
+def ancestors(code: int) -> List[int]:
+    """The code itself followed by its parents up to the root."""
+    return list(_ANCESTORS.get(code, ()))
+
+
+def root_code(code: int) -> int:
+    return _ANCESTORS[code][-1] if code in _ANCESTORS else UNKNOWN
+
+
+def is_within(code: int, ancestor: int) -> bool:
+    """True if code is ancestor itself or one of its descendants."""
+    return ancestor in _ANCESTORS.get(code, ())
+
+
+def type_credit(code_a: int, code_b: int, text_a: str = "", text_b: str = "") -> float:
+    """
+    1.0 for the same category, PARENT_CREDIT when one is the other's ancestor.
+    Types outside the taxonomy only match the same normalised spelling.
+    """
+    if code_a == UNKNOWN or code_b == UNKNOWN:
+        return 1.0 if code_a == code_b and normalize_type(text_a) == normalize_type(text_b) else 0.0
+    return float(credit_matrix()[code_a, code_b])
+
+
+def type_credit_matrix(codes_a: Iterable[int], codes_b: Iterable[int]) -> np.ndarray:
+    """Pairwise type_credit for known codes, shape (len(a), len(b)); unknown codes score 0."""
+    return credit_matrix()[np.ix_(np.asarray(list(codes_a), dtype=np.intp), np.asarray(list(codes_b), dtype=np.intp))]
+
+
+def type_key(code: int, text: str = ""):
+    """
+    Blocking key for candidate generation: the root category, so parents and
+    children land together, or the normalised text for off-taxonomy types.
+    """
+    return root_code(code) if code else normalize_type(text)
@@ -0,0 +1,62 @@
+"""
+Shared description tokenizer.
+
+Lowercases, splits on anything that is not a letter or digit, drops
+stopwords and applies a light plural stemmer ("keys" -> "key",
+"batteries" -> "battery"). Items store the result as `desc_tokens` at write
+time; bump TOKENIZER_VERSION whenever the output changes so the backfill
+job re-tokenizes stored documents.
+"""
+from typing import Iterable, List
+import re
+
+TOKENIZER_VERSION = 1
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are around as at be been before behind
+being below beside between both but by can could did do does doing down during each
+few for from had has have having he her here hers him his how i if in inside into is it
+its itself just me more most my near next no nor not of off on once only or other our
+ours out outside over own please same she should so some such than that the their them
+then there these they this those through to too under until up very was we were what
+when where which while who whom why will with would you your yours
+lost found left missing someone somebody anyone today yesterday
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def stem(word: str) -> str:
+    """S-stemmer: strips plural endings only, so stems stay readable."""
+    if len(word) <= 3 or not word.endswith("s"):
+        return word
+    if word.endswith("ies") and not word.endswith(("eies", "aies")):
+        return word[:-3] + "y"
+    if word.endswith("es") and not word.endswith(("aes", "ees", "oes")):
+        # "glasses" -> "glass", "boxes" -> "box", but "shoes" -> "shoe"
+        if word.endswith(("sses", "xes", "ches", "shes", "zes")):
+            return word[:-2]
+        return word[:-1]
+    if word.endswith(("us", "ss", "is")):
+        return word
+    return word[:-1]
+
+
+def tokenize(text: str) -> List[str]:
+    """Distinct normalised tokens of text, in order of first appearance."""
+    seen = {}
+    for word in _WORD.findall((text or "").lower()):
+        if word in STOPWORDS:
+            continue
+        token = stem(word)
+        if token and token not in STOPWORDS:
+            seen.setdefault(token, None)
+    return list(seen)
+
+
+def tokenize_all(texts: Iterable[str]) -> List[str]:
+    seen = {}
+    for text in texts:
+        for token in tokenize(text):
+            seen.setdefault(token, None)
+    return list(seen)
@@ -0,0 +1,93 @@
+"""
+Bounded top-k selection and keyset cursors for ranked result pages.
+
+A cursor is the (score, key) of the last result served; the next page is
+everything ranked strictly after it, so pages never overlap or skip. Scores
+that depend on the time (recency decay) also carry the as_of time the first
+page was scored at, so later pages rank on the same scale.
+"""
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Tuple
+import heapq
+
+
+class Cursor(NamedTuple):
+    score: float
+    key: str
+    as_of: Optional[datetime] = None
+
+
+class _Entry:
+    __slots__ = ("score", "key", "payload")
+
+    def __init__(self, score: float, key: str, payload: Any):
+        self.score = score
+        self.key = key
+        self.payload = payload
+
+    def __lt__(self, other: "_Entry") -> bool:
+        # "Worse" sorts first: lower score, then the later key on ties
+        if self.score != other.score:
+            return self.score < other.score
+        return self.key > other.key
+
+
+class TopK:
+    """
+    Bounded min-heap keeping the k best (score, key) entries. Ranking is score
+    descending, then key ascending, so pages built from it are stable.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.heap: List[_Entry] = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def floor(self, default: float) -> float:
+        """Score a new entry has to reach to be kept (the current k-th best once full)."""
+        if len(self.heap) < self.k:
+            return default
+        return max(self.heap[0].score, default)
+
+    def push(self, score: float, key: str, payload: Any = None) -> bool:
+        entry = _Entry(score, key, payload)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+            return True
+        if self.heap[0] < entry:
+            heapq.heapreplace(self.heap, entry)
+            return True
+        return False
+
+    def sorted(self) -> List[Tuple[float, str, Any]]:
+        """Best first."""
+        return [(e.score, e.key, e.payload) for e in sorted(self.heap, reverse=True)]
+
+
+def encode_cursor(score: float, key: str, as_of: Optional[datetime] = None) -> str:
+    if as_of is None:
+        return f"{score:.2f}:{key}"
+    return f"{score:.2f}:{int(as_of.timestamp())}:{key}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """Parse a cursor from encode_cursor; raises ValueError if it is malformed."""
+    if not cursor:
+        return None
+    parts = cursor.split(":", 2)
+    if len(parts) < 2 or not parts[-1]:
+        raise ValueError("Invalid cursor")
+    if len(parts) == 2:
+        return Cursor(float(parts[0]), parts[1])
+    try:
+        as_of = datetime.fromtimestamp(int(parts[1]))
+    except (OverflowError, OSError) as e:
+        raise ValueError("Invalid cursor") from e
+    return Cursor(float(parts[0]), parts[2], as_of)
+
+
+def ranks_after(score: float, key: str, cursor: Tuple[float, str]) -> bool:
+    """True if (score, key) comes after the cursor position in TopK order."""
+    return score < cursor[0] or (score == cursor[0] and key > cursor[1])
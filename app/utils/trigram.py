@@ -0,0 +1,141 @@
+"""
+Character-trigram index over a vocabulary of description tokens, used to
+expand a misspelt keyword ("wallett") into the stored terms it most likely
+means ("wallet").
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Shorter terms have too few trigrams to tell a typo from a different word
+MIN_TERM_LENGTH = 4
+# Trigram overlap only pre-filters candidates; the edit distance decides
+MIN_JACCARD = 0.25
+MAX_EXPANSIONS = 3
+CACHE_SIZE = 10000
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance counting a swap of adjacent letters as one edit ("bottel"),
+    or limit + 1 as soon as it must exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def max_edits(term: str) -> int:
+    return 1 if len(term) <= 5 else 2
+
+
+class TrigramIndex:
+    """
+    trigram -> terms postings plus an LRU cache of expansions. A term can
+    only enter or leave the expansion of a query sharing one of its
+    trigrams, so a vocabulary change evicts just those cached queries.
+
+    The postings may sit on top of a read-only base (anything with
+    `gram_terms(gram) -> List[str]`, e.g. a memory-mapped snapshot); terms
+    are then only added here if the base lacks them, and `live` tells which
+    base terms are still in use.
+    """
+
+    def __init__(self, base=None, live: Optional[Callable[[str], bool]] = None):
+        self.base = base
+        self.live = live
+        self.postings: Dict[str, Set[str]] = {}
+        self.cache: "OrderedDict[str, List[Tuple[str, float]]]" = OrderedDict()
+        # trigram -> cached queries containing it
+        self.cached_by_gram: Dict[str, Set[str]] = {}
+
+    def add(self, term: str):
+        if len(term) < MIN_TERM_LENGTH:
+            return
+        for gram in trigrams(term):
+            self.postings.setdefault(gram, set()).add(term)
+        self.invalidate(term)
+
+    def remove(self, term: str):
+        if len(term) < MIN_TERM_LENGTH:
+            return
+        for gram in trigrams(term):
+            terms = self.postings.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self.postings[gram]
+        self.invalidate(term)
+
+    def invalidate(self, term: str):
+        """Evict the cached expansions term could enter or leave."""
+        for gram in trigrams(term):
+            for query in list(self.cached_by_gram.get(gram, ())):
+                self._evict(query)
+
+    def _evict(self, query: str):
+        self.cache.pop(query, None)
+        for gram in trigrams(query):
+            queries = self.cached_by_gram.get(gram)
+            if queries is not None:
+                queries.discard(query)
+                if not queries:
+                    del self.cached_by_gram[gram]
+
+    def expand(self, term: str) -> List[Tuple[str, float]]:
+        """
+        Vocabulary terms at the smallest edit distance from term (within a
+        bound), as (term, trigram Jaccard), most similar first. The term
+        itself is never included.
+        """
+        if len(term) < MIN_TERM_LENGTH:
+            return []
+        cached = self.cache.get(term)
+        if cached is not None:
+            self.cache.move_to_end(term)
+            return cached
+
+        grams = trigrams(term)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self.postings.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+            if self.base is not None:
+                for candidate in self.base.gram_terms(gram):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+
+        limit = max_edits(term)
+        scored = []
+        for candidate, count in shared.items():
+            if candidate == term or (self.live is not None and not self.live(candidate)):
+                continue
+            jaccard = count / (len(grams) + len(trigrams(candidate)) - count)
+            if jaccard < MIN_JACCARD:
+                continue
+            distance = bounded_edit_distance(term, candidate, limit)
+            if distance <= limit:
+                scored.append((distance, -jaccard, candidate))
+        scored.sort()
+        # Only the closest spellings: "wallett" means "wallet", not also "ballet"
+        found = [(c, -j) for d, j, c in scored if d == scored[0][0]][:MAX_EXPANSIONS]
+
+        self.cache[term] = found
+        for gram in grams:
+            self.cached_by_gram.setdefault(gram, set()).add(term)
+        if len(self.cache) > CACHE_SIZE:
+            self._evict(next(iter(self.cache)))
+        return found
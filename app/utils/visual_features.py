@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from app.utils.lazy import lazy_module
+
+cv = lazy_module("cv2")
+np = lazy_module("numpy")
+
+# Hue histogram weighted by saturation (so "blue" and "navy" land in the same
+# bins), saturation and value marginals, then the 7 Hu moments
+HUE_BINS = 18
+SAT_BINS = 4
+VAL_BINS = 4
+HIST_PARTS = ((0, HUE_BINS, 0.6), (HUE_BINS, HUE_BINS + SAT_BINS, 0.2),
+              (HUE_BINS + SAT_BINS, HUE_BINS + SAT_BINS + VAL_BINS, 0.2))
+HIST_DIM = HUE_BINS + SAT_BINS + VAL_BINS
+HU_DIM = 7
+FEATURE_DIM = HIST_DIM + HU_DIM
+
+# Bhattacharyya coefficient between two unrelated photos rarely drops below this
+COLOR_FLOOR = 0.3
+COLOR_WEIGHT = 0.8
+SHAPE_WEIGHT = 0.2
+
+
+def _sqrt_normalise(hist: np.ndarray) -> np.ndarray:
+    # sqrt of an L1-normalised histogram has unit L2 norm, so a dot product
+    # between two of them is their Bhattacharyya coefficient
+    return np.sqrt(hist / max(float(hist.sum()), 1e-12))
+
+
+def extract_features(rgb_img) -> np.ndarray:
+    """Compact float32 descriptor: sqrt-normalised HSV histograms + log-scaled Hu moments."""
+    hsv = cv.cvtColor(rgb_img, cv.COLOR_RGB2HSV).reshape(-1, 3).astype(np.float32)
+    h, s, v = hsv[:, 0], hsv[:, 1] / 255.0, hsv[:, 2] / 255.0
+
+    hue, _ = np.histogram(h, bins=HUE_BINS, range=(0, 180), weights=s * v)
+    # spread each bin into its neighbours (hue is circular) to soften bin edges
+    hue = 0.5 * hue + 0.25 * np.roll(hue, 1) + 0.25 * np.roll(hue, -1)
+    sat, _ = np.histogram(s, bins=SAT_BINS, range=(0, 1))
+    val, _ = np.histogram(v, bins=VAL_BINS, range=(0, 1))
+    if hue.sum() == 0:
+        hue = np.ones(HUE_BINS)  # greyscale image: no hue preference
+
+    gray = cv.cvtColor(rgb_img, cv.COLOR_RGB2GRAY)
+    hu = cv.HuMoments(cv.moments(gray)).flatten()
+    hu = -np.sign(hu) * np.log10(np.abs(hu) + 1e-30)
+    hu = np.clip(hu, -30, 30) / 30.0
+
+    return np.concatenate([
+        _sqrt_normalise(hue.astype(np.float64)),
+        _sqrt_normalise(sat.astype(np.float64)),
+        _sqrt_normalise(val.astype(np.float64)),
+        hu
+    ]).astype(np.float32)
+
+
+def pack_features(vec: np.ndarray) -> bytes:
+    return np.asarray(vec, dtype=np.float32).tobytes()
+
+
+def unpack_features(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def stack_features(blobs_per_item: list) -> np.ndarray:
+    """
+    Build an (n_items, FEATURE_DIM) matrix with one row per item, averaging the
+    item's image descriptors. Items without images get a row of NaN.
+    """
+    matrix = np.full((len(blobs_per_item), FEATURE_DIM), np.nan, dtype=np.float32)
+    for row, blobs in enumerate(blobs_per_item):
+        vecs = [unpack_features(b) for b in blobs if b and len(b) == FEATURE_DIM * 4]
+        if vecs:
+            matrix[row] = np.mean(vecs, axis=0)
+    return matrix
+
+
+def has_features(matrix: np.ndarray) -> np.ndarray:
+    """Per row of a stack_features matrix, whether the item has any image descriptor."""
+    return ~np.isnan(matrix).any(axis=1)
+
+
+def visual_similarity(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Similarity in [0, 1] between one descriptor and every row of matrix in a
+    single vectorised pass. Rows without features score 0.
+    """
+    if matrix.size == 0 or query is None or np.isnan(query).any():
+        return np.zeros(len(matrix), dtype=np.float32)
+
+    color = np.zeros(len(matrix), dtype=np.float32)
+    for lo, hi, weight in HIST_PARTS:
+        part_q = query[lo:hi] / max(np.linalg.norm(query[lo:hi]), 1e-12)
+        parts = matrix[:, lo:hi]
+        parts = parts / np.maximum(np.linalg.norm(parts, axis=1, keepdims=True), 1e-12)
+        color += weight * (parts @ part_q)
+    color = np.clip((color - COLOR_FLOOR) / (1.0 - COLOR_FLOOR), 0.0, 1.0)
+
+    shape_dist = np.abs(matrix[:, HIST_DIM:] - query[HIST_DIM:]).mean(axis=1)
+    shape = np.exp(-10.0 * shape_dist)
+
+    sim = COLOR_WEIGHT * color + SHAPE_WEIGHT * shape
+    return np.nan_to_num(sim, nan=0.0).astype(np.float32)
+
+
+def visual_similarity_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise visual_similarity between every row of a and every row of b, shape (len(a), len(b))."""
+    if a.size == 0 or b.size == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+
+    color = np.zeros((len(a), len(b)), dtype=np.float32)
+    for lo, hi, weight in HIST_PARTS:
+        pa = a[:, lo:hi] / np.maximum(np.linalg.norm(a[:, lo:hi], axis=1, keepdims=True), 1e-12)
+        pb = b[:, lo:hi] / np.maximum(np.linalg.norm(b[:, lo:hi], axis=1, keepdims=True), 1e-12)
+        color += weight * (pa @ pb.T)
+    color = np.clip((color - COLOR_FLOOR) / (1.0 - COLOR_FLOOR), 0.0, 1.0)
+
+    # accumulate one moment at a time so no (len(a), len(b), HU_DIM) temporary is built
+    shape_dist = np.zeros((len(a), len(b)), dtype=np.float32)
+    for k in range(HIST_DIM, FEATURE_DIM):
+        shape_dist += np.abs(a[:, k, None] - b[None, :, k])
+    shape = np.exp(-10.0 * shape_dist / HU_DIM)
+
+    sim = COLOR_WEIGHT * color + SHAPE_WEIGHT * shape
+    return np.nan_to_num(sim, nan=0.0).astype(np.float32)
@@ -0,0 +1,4 @@
+"""
+Local performance tooling: a seeded synthetic catalog (bench.catalog) and
+benchmarks that run against it (bench.matching).
+"""
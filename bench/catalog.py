@@ -0,0 +1,299 @@
+"""
+Seeded synthetic catalog: users, lost/found items, images, claims and
+conversations, at any scale.
+
+    python -m bench.catalog --items 100000 [--seed 1] [--db bench_100000] [--drop]
+
+The same seed always produces the same documents (dates are relative to
+the end date, today by default). A share of lost items gets a "twin": a
+found post of the same thing a few days later, with a reworded
+description, sometimes a typo, and a photo of the same object.
+Most twins are claimed by the lost item's owner, which gives
+app.jobs.evaluate its ground truth, and every claim gets a conversation.
+Photos are small synthetic pixel buffers run through the production
+image pipeline, so items carry real dHashes and visual features.
+
+Documents are written with unordered bulk inserts, bypassing the change
+log; services build their indexes from the collections on first use.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import asyncio
+import logging
+import random
+import uuid
+
+import cv2 as cv
+import numpy as np
+from passlib.hash import bcrypt
+
+from app.core.config import settings
+from app.models.claim import ClaimModel
+from app.models.image import Image
+from app.models.item import ItemCreation
+from app.models.user import UserModel
+from app.schemas.message import Conversation, Message, MessageStatus
+from app.utils.image_processing import img_signals_from_bytes
+from app.utils.taxonomy import CATEGORIES, item_type_code
+from app.utils.text import TOKENIZER_VERSION, tokenize
+
+logger = logging.getLogger(__name__)
+
+COLOURS = ["black", "white", "red", "blue", "green", "yellow", "grey", "silver", "pink", "brown", "orange", "purple"]
+DETAILS = ["cracked", "scratched", "new", "old", "small", "big", "leather", "plastic", "steel", "striped",
+           "sticker", "dented", "faded", "shiny", "torn", "engraved", "matte", "transparent"]
+BRANDS = ["sony", "samsung", "apple", "boat", "nike", "adidas", "casio", "titan", "milton", "wildcraft",
+          "parker", "hp", "dell", "lenovo", "puma", "fossil", "skybags", "classmate"]
+PLACES = ["library", "canteen", "gym", "hostel", "lab", "auditorium", "parking", "ground", "cafe", "bus stop",
+          "lecture hall", "admin block", "pool", "reading room", "mess", "gate"]
+OFF_TAXONOMY = ["Others", "Misc", "Stuff"]
+CLAIM_TEXTS = ["It is mine, it has my name inside.", "I lost it last week near there.",
+               "The lock screen has my photo.", "There is a scratch on the back I can describe."]
+CHAT_TEXTS = ["Hi, I think you found my item.", "Can you describe it?", "Sure, it has a sticker on it.",
+              "Okay, where can we meet?", "Near the library at 5?", "Thanks a lot!"]
+
+# Leaf categories carry the item types; roots only appear through their synonyms
+_LEAVES = [code for code, (_, parent, _) in CATEGORIES.items()
+           if parent is not None or not any(p == code for _, p, _ in CATEGORIES.values())]
+
+
+@dataclass
+class CatalogSpec:
+    items: int = 1000
+    seed: int = 1
+    users: int = 0  # 0 = one user per five items
+    days: int = 730  # created_at spread, ending now
+    twin_rate: float = 0.3  # share of lost items that get a found twin
+    claim_rate: float = 0.6  # share of twins claimed by the lost item's owner
+    returned_rate: float = 0.7  # share of those claims approved and handed over
+    image_rate: float = 0.5  # share of items with a photo
+    typo_rate: float = 0.1  # share of twin descriptions with a misspelt word
+    end: Optional[datetime] = None  # newest created_at; default: today at midnight
+
+    @property
+    def user_count(self) -> int:
+        return self.users or max(10, self.items // 5)
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _typo(rng: random.Random, word: str) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+class _Generator:
+    def __init__(self, spec: CatalogSpec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.np_rng = np.random.default_rng(spec.seed)
+        # Midnight, so runs on the same day produce identical documents
+        self.now = spec.end or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.user_ids = [f"{20000000 + i}" for i in range(spec.user_count)]
+        # Every synthetic user logs in with "benchmark"; a fixed salt keeps the hash reproducible
+        self.password_hash = bcrypt.using(salt="benchmarkbenchmarkbene").hash("benchmark")
+
+    def users(self) -> Iterator[Tuple[str, dict]]:
+        start = self.now - timedelta(days=self.spec.days)
+        for i, user_id in enumerate(self.user_ids):
+            yield "users", UserModel(
+                user_id=user_id, username=f"user{i}", email=f"{user_id}@example.edu",
+                hashed_password=self.password_hash,
+                acc_created=start + timedelta(seconds=self.rng.randrange(self.spec.days * 86400)),
+            ).to_dict()
+
+    def _describe(self) -> dict:
+        rng = self.rng
+        code = rng.choice(_LEAVES)
+        name, _, synonyms = CATEGORIES[code]
+        return {
+            "code": code,
+            "type": rng.choice(OFF_TAXONOMY) if rng.random() < 0.05 else rng.choice([name.title()] + synonyms),
+            "noun": rng.choice(synonyms),
+            "colour": rng.choice(COLOURS),
+            "brand": rng.choice(BRANDS) if rng.random() < 0.4 else None,
+            "details": rng.sample(DETAILS, rng.randint(0, 2)),
+            "place": rng.choice(PLACES),
+            "pixels": (self.np_rng.integers(0, 256, 3), self.np_rng.integers(0, 256, 3)),
+        }
+
+    def _reword(self, thing: dict) -> dict:
+        """The same object as described by someone else."""
+        rng = self.rng
+        twin = dict(thing)
+        _, _, synonyms = CATEGORIES[thing["code"]]
+        if rng.random() < 0.3:
+            twin["noun"] = rng.choice(synonyms)
+        if rng.random() < 0.5:
+            twin["details"] = rng.sample(DETAILS, rng.randint(0, 2))
+        if rng.random() < 0.3:
+            twin["brand"] = None
+        if rng.random() < 0.3:
+            twin["place"] = rng.choice(PLACES)
+        if rng.random() < 0.5:
+            twin["type"] = rng.choice([CATEGORIES[thing["code"]][0].title()] + synonyms)
+        return twin
+
+    def _desc(self, thing: dict, typo: bool = False) -> str:
+        words = [thing["colour"], *([thing["brand"]] if thing["brand"] else []), *thing["details"], thing["noun"]]
+        if typo:
+            i = self.rng.randrange(len(words))
+            words[i] = _typo(self.rng, words[i])
+        return f"{' '.join(words)} near the {thing['place']}"
+
+    def _photo(self, thing: dict) -> Dict[str, object]:
+        # Two-colour gradient with noise: twins share colours, so their features are close
+        a, b = thing["pixels"]
+        ramp = np.linspace(0.0, 1.0, 48)[None, :, None]
+        img = (a * (1 - ramp) + b * ramp) * np.ones((48, 48, 3))
+        img = np.clip(img + self.np_rng.normal(0, 12, img.shape), 0, 255).astype(np.uint8)
+        return img_signals_from_bytes(cv.imencode(".png", img)[1].tobytes())
+
+    def _item(self, thing: dict, post_type: str, user_id: str, created_at: datetime,
+              typo: bool = False) -> Tuple[dict, List[dict]]:
+        item_id = _uuid(self.rng)
+        images = []
+        if self.rng.random() < self.spec.image_rate:
+            signals = self._photo(thing)
+            images.append(Image(item_id=item_id, url=f"https://example.invalid/{item_id}.webp",
+                                date_uploaded=created_at, phash=signals["phash"], features=signals["features"]))
+        desc = self._desc(thing, typo)
+        doc = ItemCreation(user_id=user_id, desc=desc, post_type=post_type, type=thing["type"]) \
+            .to_model(item_id, images, created_at, type_code=item_type_code(thing["type"], desc)).to_dict()
+        doc.update(desc_tokens=tokenize(desc), tokens_version=TOKENIZER_VERSION, updated_at=created_at)
+        return doc, [image.to_model().to_dict() for image in images]
+
+    def _conversation(self, claimant: str, finder: str, item_id: str, at: datetime) -> Iterator[Tuple[str, dict]]:
+        conversation = Conversation(participant_ids={claimant, finder}, conversation_id=_uuid(self.rng),
+                                    item_id=item_id, created_at=at)
+        for i in range(self.rng.randint(2, len(CHAT_TEXTS))):
+            sender, receiver = (claimant, finder) if i % 2 == 0 else (finder, claimant)
+            at = at + timedelta(minutes=self.rng.randint(1, 240))
+            message = Message(sender_id=sender, receiver_id=receiver, content=CHAT_TEXTS[i],
+                              message_id=_uuid(self.rng), conversation_id=conversation.conversation_id,
+                              item_id=item_id, status=MessageStatus.READ, created_at=at, read_at=at)
+            conversation.update_last_message(message.content, at)
+            yield "messages", message.to_dict()
+        conversation.updated_at = conversation.last_message_at
+        yield "conversations", conversation.to_dict()
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        spec, rng = self.spec, self.rng
+        produced = 0
+        while produced < spec.items:
+            thing = self._describe()
+            post_type = rng.choice(["lost", "found"])
+            owner = rng.choice(self.user_ids)
+            created_at = self.now - timedelta(seconds=rng.randrange(spec.days * 86400))
+            doc, images = self._item(thing, post_type, owner, created_at)
+            produced += 1
+
+            twin = None
+            if post_type == "lost" and produced < spec.items and rng.random() < spec.twin_rate:
+                finder = rng.choice(self.user_ids)
+                if finder == owner:
+                    finder = self.user_ids[(self.user_ids.index(owner) + 1) % len(self.user_ids)]
+                found_at = min(created_at + timedelta(hours=rng.randint(1, 14 * 24)), self.now)
+                twin, twin_images = self._item(self._reword(thing), "found", finder, found_at,
+                                               typo=rng.random() < spec.typo_rate)
+                images += twin_images
+                produced += 1
+
+            claim = None
+            if twin and rng.random() < spec.claim_rate:
+                submitted_at = twin["created_at"] + timedelta(hours=rng.randint(1, 72))
+                returned = rng.random() < spec.returned_rate
+                claim = ClaimModel(
+                    claim_id=_uuid(rng), item_id=twin["item_id"], user_id=owner,
+                    justification=rng.choice(CLAIM_TEXTS), submitted_at=submitted_at,
+                    status="APPROVE" if returned else rng.choice(["PENDING", "REJECT"]),
+                    handoff_pin=f"{rng.randint(1000, 9999)}" if returned else None, is_returned=returned,
+                ).to_dict()
+                if returned:
+                    doc["is_claimed"] = twin["is_claimed"] = True
+
+            yield "items", doc
+            if twin:
+                yield "items", twin
+            for image in images:
+                yield "images", image
+            if claim:
+                yield "claims", claim
+                yield from self._conversation(owner, twin["user_id"], twin["item_id"], claim["submitted_at"])
+
+
+def generate(spec: CatalogSpec) -> Iterator[Tuple[str, dict]]:
+    """(collection, document) pairs for the whole catalog, streamed."""
+    generator = _Generator(spec)
+    yield from generator.users()
+    yield from generator.items()
+
+
+async def load(db, documents: Iterator[Tuple[str, dict]], batch_size: int = 1000) -> Dict[str, int]:
+    """Bulk-insert streamed documents, batch_size per collection at a time."""
+    buffers: Dict[str, List[dict]] = {}
+    counts: Dict[str, int] = {}
+
+    async def flush(collection: str):
+        batch = buffers.pop(collection, [])
+        if batch:
+            await db[collection].insert_many(batch, ordered=False)
+            counts[collection] = counts.get(collection, 0) + len(batch)
+
+    for collection, doc in documents:
+        buffers.setdefault(collection, []).append(doc)
+        if len(buffers[collection]) >= batch_size:
+            await flush(collection)
+            if collection == "items" and counts["items"] % (batch_size * 50) == 0:
+                logger.info(f"Loaded {counts['items']} items")
+    for collection in list(buffers):
+        await flush(collection)
+    return counts
+
+
+async def drop(db, collections=("users", "items", "images", "claims", "conversations", "messages",
+                                "matches", "changes", "counters")):
+    for collection in collections:
+        await db[collection].drop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a seeded synthetic catalog into MongoDB.")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=0, help="default: one per five items")
+    parser.add_argument("--days", type=int, default=730, help="spread of created_at")
+    parser.add_argument("--image-rate", type=float, default=0.5)
+    parser.add_argument("--db", help="database to load into (default: DB_NAME)")
+    parser.add_argument("--drop", action="store_true", help="drop the catalog collections first")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from app.core.database import connect_to_mongo, close_mongo_connection, get_db
+
+    async def run():
+        if args.db:
+            settings.DB_NAME = args.db
+        await connect_to_mongo()
+        try:
+            if args.drop:
+                await drop(get_db())
+            spec = CatalogSpec(items=args.items, seed=args.seed, users=args.users, days=args.days,
+                               image_rate=args.image_rate)
+            counts = await load(get_db(), generate(spec), args.batch_size)
+            logger.info(f"Catalog loaded into {settings.DB_NAME}: {counts}")
+        finally:
+            await close_mongo_connection()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,403 @@
+"""
+End-to-end load generator for a running app.
+
+    python -m bench.load --base-url http://localhost:8000 [--rate 20] [--duration 60]
+                         [--users 50] [--mix browse=35,view=25,search=15,chat=15,post=5,claim=5]
+                         [--max-concurrency 200] [--seed 1] [--out report.json]
+
+Run it against local stand-ins, never production: `docker compose up db
+minio` starts MongoDB and MinIO, and the app is pointed at them with
+MONGO_URI=mongodb://localhost:27017 and R2_ENDPOINT=http://localhost:9000
+(the bucket named by R2_BUCKET_NAME must exist). A pool of --users
+accounts is registered (or logged into) first; access tokens are
+refreshed on 401 as the frontend does.
+
+Scenarios start as an open-loop Poisson process at --rate per second, each
+one picked by weight from --mix:
+
+    browse  list /items/ pages, revalidating with If-None-Match
+    view    list one page, then open an item
+    search  POST /search/ and /matches/, GET /search/categories
+    chat    send a message, then poll the conversation every 3 s
+    post    POST /items/ with a multipart photo
+    claim   one user claims another's item, the owner lists and reviews it
+
+Latency is reported twice per endpoint. "service" is send to response.
+"latency" is corrected for coordinated omission: requests that fire on a
+schedule (the first request of a scenario, and each 3 s poll) are measured
+from when they were due, so a stalled server is charged for the requests
+that queued behind it. Requests that follow a user's reaction to a
+response are measured from when they were sent. Errors are transport
+failures and statuses >= 400 (304 counts as success).
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import math
+import random
+import sys
+import time
+
+import cv2 as cv
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PASSWORD = "benchmark"
+POLL_INTERVAL = 3.0
+POLLS_PER_CHAT = 5
+DEFAULT_MIX = "browse=35,view=25,search=15,chat=15,post=5,claim=5"
+TYPES = ["Phone", "Wallet", "Bottle", "Keys", "Backpack", "Umbrella", "Watch", "Earphones", "ID card", "Book"]
+WORDS = ["black", "blue", "red", "leather", "steel", "small", "cracked", "sticker", "library", "canteen", "gym"]
+
+# Histogram bucket upper bounds in ms: 2% apart from 0.1 ms to 2 minutes
+BUCKETS = [0.1 * 1.02 ** i for i in range(int(math.log(1_200_000) / math.log(1.02)) + 2)]
+
+
+class Histogram:
+    """Log-bucketed latency histogram (2% resolution), mergeable and cheap to record into."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0
+        self.max = 0.0
+
+    def record(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKETS, ms)] += 1
+        self.total += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, p: float) -> float:
+        if not self.total:
+            return 0.0
+        rank = math.ceil(self.total * p / 100.0)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKETS[i] if i < len(BUCKETS) else self.max, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {f"p{p:g}": self.percentile(p) for p in (50, 90, 99, 99.9)} | {"max": self.max}
+
+    def buckets(self) -> List[List[float]]:
+        """Non-empty [upper bound ms, count] pairs."""
+        return [[BUCKETS[i] if i < len(BUCKETS) else self.max, c] for i, c in enumerate(self.counts) if c]
+
+
+@dataclass
+class EndpointStats:
+    latency: Histogram = field(default_factory=Histogram)
+    service: Histogram = field(default_factory=Histogram)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    @property
+    def requests(self) -> int:
+        return self.service.total
+
+
+class Recorder:
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.scenarios: Dict[str, int] = {}
+        self.started = time.monotonic()
+
+    def record(self, name: str, due: float, sent: float, done: float, status: Optional[int]):
+        stats = self.endpoints.setdefault(name, EndpointStats())
+        stats.service.record((done - sent) * 1000.0)
+        stats.latency.record((done - min(due, sent)) * 1000.0)
+        key = str(status) if status is not None else "error"
+        stats.statuses[key] = stats.statuses.get(key, 0) + 1
+        if status is None or status >= 400:
+            stats.errors += 1
+
+    def report(self, elapsed: float) -> dict:
+        return {
+            "elapsed_s": elapsed,
+            "scenarios": self.scenarios,
+            "endpoints": {
+                name: {
+                    "requests": s.requests,
+                    "rps": s.requests / elapsed if elapsed else 0.0,
+                    "error_rate": s.errors / s.requests if s.requests else 0.0,
+                    "statuses": s.statuses,
+                    "latency_ms": s.latency.summary(),
+                    "service_ms": s.service.summary(),
+                    "latency_histogram": s.latency.buckets(),
+                }
+                for name, s in sorted(self.endpoints.items())
+            },
+        }
+
+
+class VirtualUser:
+    """One account: its tokens, and the items it has posted during the run."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, user_id: str):
+        self.client = client
+        self.recorder = recorder
+        self.user_id = user_id
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.items: List[str] = []
+        self.etags: Dict[str, str] = {}
+
+    async def login(self):
+        await self.client.post("/auth/register", json={
+            "user_id": self.user_id, "username": self.user_id, "passwd": PASSWORD,
+            "email": f"{self.user_id}@example.edu",
+        })  # 4xx when the account already exists
+        response = await self.client.post("/auth/login", data={"username": self.user_id, "password": PASSWORD})
+        response.raise_for_status()
+        body = response.json()
+        self.access_token, self.refresh_token = body["access_token"], body["refresh_token"]
+
+    async def _refresh(self) -> bool:
+        response = await self.client.post("/auth/refresh", params={"refresh_token": self.refresh_token})
+        if response.status_code != 200:
+            return False
+        self.access_token = response.json()["access_token"]
+        return True
+
+    async def request(self, method: str, url: str, name: str, due: Optional[float] = None,
+                      revalidate: bool = False, **kwargs) -> Optional[httpx.Response]:
+        """Send one request and record it under name; due is when a scheduled request should have fired."""
+        headers = kwargs.pop("headers", {})
+        if revalidate and url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        response = None
+        sent = time.monotonic()
+        try:
+            for attempt in range(2):
+                headers["Authorization"] = f"Bearer {self.access_token}"
+                response = await self.client.request(method, url, headers=headers, **kwargs)
+                if response.status_code != 401 or attempt or not await self._refresh():
+                    break
+        except httpx.HTTPError as e:
+            logger.debug(f"{name} failed: {e!r}")
+        done = time.monotonic()
+        self.recorder.record(name, due if due is not None else sent, sent, done,
+                             response.status_code if response is not None else None)
+        if response is not None and "etag" in response.headers:
+            self.etags[url] = response.headers["etag"]
+        return response
+
+
+def _json(response: Optional[httpx.Response]):
+    if response is None or response.status_code >= 300 or not response.content:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+class Scenarios:
+    def __init__(self, users: List[VirtualUser], rng: random.Random, photo: bytes):
+        self.users = users
+        self.rng = rng
+        self.photo = photo
+        self.item_ids: List[str] = []
+
+    def _user(self, other_than: Optional[VirtualUser] = None) -> VirtualUser:
+        user = self.rng.choice(self.users)
+        if user is other_than:
+            user = self.users[(self.users.index(user) + 1) % len(self.users)]
+        return user
+
+    async def _think(self):
+        await asyncio.sleep(self.rng.expovariate(1.0))
+
+    def _remember(self, body):
+        if body:
+            for item in body.get("item_list", [])[:50]:
+                if item["item_id"] not in self.item_ids:
+                    self.item_ids.append(item["item_id"])
+            del self.item_ids[:-1000]
+
+    async def browse(self, due: float):
+        user = self._user()
+        for page in range(self.rng.randint(1, 3)):
+            url = f"/items/?limit=20&offset={20 * page}"
+            self._remember(_json(await user.request("GET", url, "GET /items/", due if page == 0 else None,
+                                                    revalidate=True)))
+            await self._think()
+
+    async def view(self, due: float):
+        user = self._user()
+        self._remember(_json(await user.request("GET", "/items/?limit=20&offset=0", "GET /items/", due,
+                                                revalidate=True)))
+        if self.item_ids:
+            await self._think()
+            item_id = self.rng.choice(self.item_ids)
+            await user.request("GET", f"/items/{item_id}", "GET /items/{item_id}", revalidate=True)
+
+    async def search(self, due: float):
+        user = self._user()
+        words = self.rng.sample(WORDS, 2)
+        await user.request("POST", "/search/", "POST /search/", due,
+                           json={"query": words[0], "item_type": self.rng.choice(TYPES)})
+        await self._think()
+        await user.request("POST", "/matches/", "POST /matches/", json={
+            "search_type": self.rng.choice(TYPES), "keywords": words, "location": self.rng.choice(WORDS),
+            "post_type": self.rng.choice(["lost", "found"]),
+        })
+        await user.request("GET", "/search/categories", "GET /search/categories")
+
+    async def chat(self, due: float):
+        sender = self._user()
+        receiver = self._user(other_than=sender)
+        body = _json(await sender.request("POST", "/messages/send", "POST /messages/send", due, json={
+            "receiver_id": receiver.user_id, "content": "Hi, is this yours?",
+            "item_id": self.rng.choice(self.item_ids) if self.item_ids else None,
+        }))
+        await sender.request("GET", "/messages/conversations", "GET /messages/conversations", revalidate=True)
+        if not body:
+            return
+        # The chat window polls on a fixed timer, whatever the server is doing
+        url = f"/messages/conversations/{body['conversation_id']}"
+        started = time.monotonic()
+        for poll in range(1, POLLS_PER_CHAT + 1):
+            tick = started + poll * POLL_INTERVAL
+            await asyncio.sleep(max(0.0, tick - time.monotonic()))
+            await receiver.request("GET", url, "GET /messages/conversations/{id}", tick, revalidate=True)
+
+    async def post(self, due: float, user: Optional[VirtualUser] = None) -> Optional[str]:
+        user = user or self._user()
+        item = {
+            "user_id": user.user_id,
+            "desc": " ".join(self.rng.sample(WORDS, 4)),
+            "post_type": self.rng.choice(["lost", "found"]),
+            "type": self.rng.choice(TYPES),
+        }
+        body = _json(await user.request(
+            "POST", "/items/", "POST /items/", due,
+            data={"item_json": json.dumps(item)},
+            files=[("image_files", ("photo.png", self.photo, "image/png"))],
+        ))
+        if body:
+            user.items.append(body["item_id"])
+            return body["item_id"]
+        return None
+
+    async def claim(self, due: float):
+        owners = [u for u in self.users if u.items]
+        owner = self.rng.choice(owners) if owners else self._user()
+        item_id = owner.items.pop(0) if owner.items else await self.post(due, owner)
+        if item_id is None:
+            return
+        claimant = self._user(other_than=owner)
+        body = _json(await claimant.request("POST", "/claims/", "POST /claims/", due if owners else None, json={
+            "item_id": item_id, "user_id": claimant.user_id, "justification": "It has my name inside.",
+        }))
+        if not body:
+            return
+        await self._think()
+        await owner.request("GET", f"/claims/item/{item_id}", "GET /claims/item/{item_id}")
+        action = "APPROVE" if self.rng.random() < 0.3 else "REJECT"
+        await owner.request("POST", f"/claims/{body['claim_id']}/review/{action}", "POST /claims/{id}/review")
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("browse", "view", "search", "chat", "post", "claim"):
+            raise ValueError(f"Unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def synthetic_photo(seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(0.0, 1.0, 200)[None, :, None]
+    a, b = rng.integers(0, 256, 3), rng.integers(0, 256, 3)
+    img = np.clip((a * (1 - ramp) + b * ramp) * np.ones((200, 200, 3)) + rng.normal(0, 10, (200, 200, 3)), 0, 255)
+    return cv.imencode(".png", img.astype(np.uint8))[1].tobytes()
+
+
+async def run(base_url: str, rate: float, duration: float, n_users: int, mix: Dict[str, float],
+              max_concurrency: int, seed: int, timeout: float) -> dict:
+    rng = random.Random(seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        users = [VirtualUser(client, recorder, f"load{seed}_{i}") for i in range(n_users)]
+        await asyncio.gather(*(u.login() for u in users))
+        logger.info(f"{len(users)} users logged in; running {duration:.0f}s at {rate}/s")
+
+        scenarios = Scenarios(users, rng, synthetic_photo(seed))
+        names, weights = list(mix), list(mix.values())
+        slots = asyncio.Semaphore(max_concurrency)
+        tasks = set()
+
+        async def start(name: str, due: float):
+            # Waiting for a slot is queueing the server caused; it is charged to the first request
+            async with slots:
+                try:
+                    await getattr(scenarios, name)(due)
+                except Exception as e:
+                    logger.warning(f"Scenario {name} aborted: {e!r}")
+
+        recorder.started = began = time.monotonic()
+        due = began
+        while True:
+            due += rng.expovariate(rate)
+            if due - began >= duration:
+                break
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            name = rng.choices(names, weights)[0]
+            recorder.scenarios[name] = recorder.scenarios.get(name, 0) + 1
+            task = asyncio.create_task(start(name, due))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+        return recorder.report(time.monotonic() - began)
+
+
+def _summary(report: dict) -> str:
+    lines = [f"{'endpoint':<34} {'reqs':>7} {'rps':>7} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8} "
+             f"{'max':>8} {'svc p99':>8}"]
+    for name, e in report["endpoints"].items():
+        lat = e["latency_ms"]
+        lines.append(f"{name:<34} {e['requests']:>7} {e['rps']:>7.1f} {100 * e['error_rate']:>6.1f} "
+                     f"{lat['p50']:>8.1f} {lat['p90']:>8.1f} {lat['p99']:>8.1f} {lat['max']:>8.1f} "
+                     f"{e['service_ms']['p99']:>8.1f}")
+    lines.append("latency in ms, corrected for coordinated omission; svc = send to response")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive a running app with a weighted mix of user scenarios.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=20.0, help="scenario starts per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of arrivals")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,...")
+    parser.add_argument("--max-concurrency", type=int, default=200, help="scenarios in flight at most")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the JSON report (with histograms) here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.base_url, args.rate, args.duration, args.users, parse_mix(args.mix),
+                             args.max_concurrency, args.seed, args.timeout))
+    report.update(base_url=args.base_url, rate=args.rate, mix=args.mix, seed=args.seed)
+    sys.stdout.write(_summary(report) + "\n")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
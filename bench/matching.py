@@ -0,0 +1,181 @@
+"""
+Matching and search benchmarks across catalog sizes.
+
+    python -m bench.matching [--sizes 1000,10000,100000] [--queries 200] [--seed 1]
+                             [--db-prefix bench] [--regenerate] [--out report.json]
+
+Each size gets its own database (`<prefix>_<size>`), loaded with
+bench.catalog on first use and reused afterwards. For every size the suite
+times find_potential_matches, run_automated_matching and search_items over
+the same seeded sample of items, and reports per-operation throughput,
+p50/p99 latency and the peak traced allocation of a call, plus the
+process's peak RSS and the term index build time. Sizes run in ascending
+order, so the RSS column is a memory curve. Match notifications are
+dropped; matches found by run_automated_matching are written as usual.
+"""
+from typing import Awaitable, Callable, Dict, List
+import argparse
+import asyncio
+import json
+import logging
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.database import connect_to_mongo, close_mongo_connection, get_db
+from app.models.match import MatchSearchRequest
+from app.models.search import SearchRequest
+from app.repositories.change_repository import ChangeRepo
+from app.repositories.image_repository import ImageRepo
+from app.repositories.item_repository import ItemRepo
+from app.repositories.match_repository import MatchRepo
+from app.services.item_service import ItemService
+from app.services.match_service import MatchService
+from app.services.search_service import SearchService
+from app.services.term_index import get_term_index, reset_term_index
+from bench.catalog import CatalogSpec, drop, generate, load
+
+logger = logging.getLogger(__name__)
+
+# Calls traced for the allocation peak; tracing is too slow for the timed pass
+TRACED_CALLS = 5
+
+
+class _NullNotifier:
+    async def notify_match_found(self, *args, **kwargs):
+        return None
+
+
+async def _time(op: Callable[[dict], Awaitable], samples: List[dict], warmup: int = 3) -> dict:
+    for doc in samples[:warmup]:
+        await op(doc)
+
+    latencies = []
+    started = time.perf_counter()
+    for doc in samples:
+        call_started = time.perf_counter()
+        await op(doc)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        for doc in samples[:TRACED_CALLS]:
+            await op(doc)
+        alloc_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "calls": len(samples),
+        "throughput_per_s": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "alloc_peak_kb": alloc_peak / 1024,
+    }
+
+
+async def _sample(db, n: int, seed: int) -> List[dict]:
+    projection = {"_id": 0, "item_id": 1, "type": 1, "desc": 1, "post_type": 1}
+    docs = await db["items"].find({"is_claimed": {"$ne": True}}, projection) \
+        .sort("item_id", 1).limit(n * 20).to_list(length=n * 20)
+    return random.Random(seed).sample(docs, min(n, len(docs)))
+
+
+def _match_request(doc: dict) -> MatchSearchRequest:
+    words = doc["desc"].split(" near the ")
+    return MatchSearchRequest(
+        search_type=doc["type"],
+        keywords=words[0].split(),
+        location=words[1] if len(words) > 1 else "",
+        post_type=doc["post_type"],
+    )
+
+
+async def bench_size(size: int, queries: int, seed: int, db_prefix: str, regenerate: bool) -> Dict:
+    settings.DB_NAME = f"{db_prefix}_{size}"
+    await connect_to_mongo()
+    try:
+        db = get_db()
+        result = {"size": size, "db": settings.DB_NAME, "load_s": None}
+        if regenerate or await db["items"].count_documents({}) != size:
+            await drop(db)
+            started = time.perf_counter()
+            counts = await load(db, generate(CatalogSpec(items=size, seed=seed)))
+            result["load_s"] = time.perf_counter() - started
+            logger.info(f"Loaded {settings.DB_NAME} in {result['load_s']:.1f}s: {counts}")
+
+        change_repo, image_repo = ChangeRepo(), ImageRepo()
+        item_repo = ItemRepo(change_repo)
+        item_service = ItemService(None, item_repo, image_repo)
+        match_service = MatchService(item_service, MatchRepo(change_repo), _NullNotifier(), item_repo, change_repo,
+                                     image_repo)
+        search_service = SearchService(item_service, item_repo, change_repo)
+
+        reset_term_index()
+        started = time.perf_counter()
+        index = await get_term_index(item_repo, change_repo)
+        result["index_build_s"] = time.perf_counter() - started
+        result["index_items"] = len(index.items)
+
+        samples = await _sample(db, queries, seed)
+        result["find_potential_matches"] = await _time(
+            lambda doc: match_service.find_potential_matches(_match_request(doc)), samples)
+        result["run_automated_matching"] = await _time(
+            lambda doc: match_service.run_automated_matching(doc["item_id"]), samples)
+        result["search_items"] = await _time(
+            lambda doc: search_service.search_items(SearchRequest(query=doc["desc"].split()[0], item_type=doc["type"])),
+            samples)
+        # Linux reports kilobytes
+        result["rss_peak_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return result
+    finally:
+        await close_mongo_connection()
+
+
+def _summary(results: List[Dict]) -> str:
+    ops = ["find_potential_matches", "run_automated_matching", "search_items"]
+    lines = [f"{'size':>9} {'operation':<24} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'alloc KB':>9} {'RSS MB':>8}"]
+    for r in results:
+        for op in ops:
+            m = r[op]
+            lines.append(f"{r['size']:>9} {op:<24} {m['throughput_per_s']:>9.1f} {m['p50_ms']:>9.2f} "
+                         f"{m['p99_ms']:>9.2f} {m['alloc_peak_kb']:>9.0f} {r['rss_peak_mb']:>8.0f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark matching and search across catalog sizes.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated item counts")
+    parser.add_argument("--queries", type=int, default=200, help="calls per operation and size")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db-prefix", default="bench")
+    parser.add_argument("--regenerate", action="store_true", help="reload catalogs that already exist")
+    parser.add_argument("--out", help="write the JSON report here as well")
+    args = parser.parse_args()
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+
+    async def run():
+        results = []
+        for size in sizes:
+            results.append(await bench_size(size, args.queries, args.seed, args.db_prefix, args.regenerate))
+            logger.info(f"Finished size {size}")
+        return results
+
+    results = asyncio.run(run())
+    sys.stdout.write(_summary(results) + "\n")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"seed": args.seed, "queries": args.queries, "results": results}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
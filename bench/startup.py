@@ -0,0 +1,130 @@
+"""
+Worker start-up import profile.
+
+    python -m bench.startup [--module app.main] [--runs 5] [--top 15]
+                            [--budget-ms 1200] [--deferred cv2,numpy,PIL,boto3,botocore]
+                            [--out report.json]
+
+Imports --module in a fresh interpreter with `-X importtime` --runs times
+and reports the fastest run: the total, the self time summed per top-level
+package, and the slowest first-party modules including what they pull in.
+Run it with the same environment the app gets (the settings are read at
+import).
+
+It exits non-zero when the import takes longer than --budget-ms, or when a
+--deferred module is imported at all; these are loaded on first use
+(app.utils.lazy) and the report names the import chain that pulled one in.
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional
+import argparse
+import json
+import subprocess
+import sys
+
+DEFAULT_DEFERRED = "cv2,numpy,PIL,boto3,botocore"
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """`-X importtime` lines as {name, self_us, cumulative_us, level, chain}, in output order."""
+    rows, pending = [], []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        field = parts[2][1:]
+        name = field.lstrip()
+        rows.append({"name": name, "self_us": int(parts[0]), "cumulative_us": int(parts[1]),
+                     "level": (len(field) - len(name)) // 2})
+    # A module is printed after everything it imported, one level deeper, so
+    # walking backwards the importer of a row is the next shallower row seen
+    for row in reversed(rows):
+        while pending and pending[-1]["level"] >= row["level"]:
+            pending.pop()
+        row["chain"] = [p["name"] for p in pending]
+        pending.append(row)
+    return rows
+
+
+def profile_once(module: str) -> List[dict]:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    if proc.returncode:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"import {module} failed")
+    return parse_importtime(proc.stderr)
+
+
+def summarize(rows: List[dict], module: str, top: int, deferred: List[str]) -> dict:
+    target = next((r for r in reversed(rows) if r["name"] == module), None)
+    by_package: Dict[str, int] = defaultdict(int)
+    for r in rows:
+        by_package[r["name"].split(".")[0]] += r["self_us"]
+    first_party = module.split(".")[0]
+    # The outermost import of each deferred package is the one to move
+    outermost: Dict[str, dict] = {}
+    for r in rows:
+        package = r["name"].split(".")[0]
+        if package in deferred and (package not in outermost or r["level"] < outermost[package]["level"]):
+            outermost[package] = r
+    return {
+        "module": module,
+        "total_ms": (target["cumulative_us"] if target else sum(r["self_us"] for r in rows)) / 1000,
+        "modules": len(rows),
+        "packages": [{"package": name, "self_ms": us / 1000}
+                     for name, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]],
+        "first_party": [{"module": r["name"], "cumulative_ms": r["cumulative_us"] / 1000}
+                        for r in sorted((r for r in rows if r["name"].split(".")[0] == first_party
+                                         and r["name"] != module), key=lambda r: -r["cumulative_us"])[:top]],
+        "deferred_loaded": [{"module": r["name"], "ms": r["cumulative_us"] / 1000, "via": r["chain"]}
+                            for r in outermost.values()],
+    }
+
+
+def print_report(report: dict, budget_ms: Optional[float]):
+    budget = f" (budget {budget_ms:.0f} ms)" if budget_ms else ""
+    print(f"import {report['module']}: {report['total_ms']:.0f} ms, {report['modules']} modules{budget}\n")
+    print(f"{'package':<32} {'self ms':>9}")
+    for p in report["packages"]:
+        print(f"{p['package']:<32} {p['self_ms']:>9.1f}")
+    print(f"\n{'first-party module':<48} {'cumul ms':>9}")
+    for m in report["first_party"]:
+        print(f"{m['module']:<48} {m['cumulative_ms']:>9.1f}")
+    for d in report["deferred_loaded"]:
+        print(f"\nloaded eagerly: {d['module']} ({d['ms']:.1f} ms) via {' <- '.join(d['via']) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the imports of a worker's start-up.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5, help="the fastest run is reported")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=1200.0, help="0 disables the check")
+    parser.add_argument("--deferred", default=DEFAULT_DEFERRED, help="packages that must not load at import")
+    parser.add_argument("--out", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    deferred = [d for d in args.deferred.split(",") if d]
+    reports = [summarize(profile_once(args.module), args.module, args.top, deferred)
+               for _ in range(max(1, args.runs))]
+    report = min(reports, key=lambda r: r["total_ms"])
+    report["runs_ms"] = [round(r["total_ms"], 1) for r in reports]
+    print_report(report, args.budget_ms)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    if args.budget_ms and report["total_ms"] > args.budget_ms:
+        print(f"\nFAIL: {report['total_ms']:.0f} ms over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if report["deferred_loaded"]:
+        print("\nFAIL: deferred packages imported at start-up")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
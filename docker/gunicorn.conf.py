@@ -0,0 +1,14 @@
+# Gunicorn settings for the container: uvicorn workers behind one master
+import os
+
+from prometheus_client import multiprocess
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges, so /metrics does not keep adding them up
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,13 @@
+import apiClient from './apiClient';
+
+/**
+ * Fetches everything that changed for the current user since `cursor`.
+ * Call without a cursor first to get the starting point, then keep
+ * passing back the returned `cursor`. If `reset` is true the cursor is
+ * too old and the full lists must be fetched again.
+ */
+export const syncChanges = async (cursor) => {
+  // Calls GET /sync/?since={cursor}
+  const params = cursor === undefined || cursor === null ? {} : { since: cursor };
+  return apiClient.get('/sync/', { params });
+};